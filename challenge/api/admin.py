@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Task, User
+from .models import OutboxEmail, Task, User
 
 
 class TaskAdmin(admin.ModelAdmin):
@@ -9,5 +9,11 @@ class TaskAdmin(admin.ModelAdmin):
     list_filter = ["completed", "created"]
 
 
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["pk", "recipient", "subject", "status", "attempts", "created", "sent"]
+    list_filter = ["status", "created"]
+
+
 admin.site.register(Task, TaskAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
 admin.site.register(User)
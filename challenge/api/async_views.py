@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.status import (
+    HTTP_201_CREATED,
+    HTTP_204_NO_CONTENT,
+    HTTP_412_PRECONDITION_FAILED,
+    HTTP_501_NOT_IMPLEMENTED,
+)
+
+from .authentication import ClaimsJWTAuthentication
+from .cache import task_cache
+from .events import apublish_task_event, get_broker
+from .filters import TaskFilter
+from .metrics import timer
+from .models import Task
+from .pagination import TaskCursorPagination
+from .renderers import FastJSONRenderer
+from .search import TaskSearchFilter, get_search_backend
+from .serializers import TaskSerializer
+from .views import TaskViewSet
+
+logger = logging.getLogger(__name__)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncTaskView(View):
+    """
+    Base of the asynchronous task views, served by the ASGI application.
+    They accept the same requests and return the same responses as
+    TaskViewSet, but the database is queried with the async ORM, so one
+    worker can serve many clients at once while it waits for them.
+    The authentication, parsing, filters and serializers of DRF don't query
+    the database, so they are reused as they are.
+
+    Atributes:
+        filter_backends (list): Filters of the task list, as in TaskViewSet.
+        filterset_class (django_filters.FilterSet): Filters of the task fields.
+        search_fields (list): Fields of the icontains search.
+        ordering_fields (list): Fields the list can be ordered by.
+    """
+
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, OrderingFilter]
+    filterset_class = TaskFilter
+    search_fields = ["description", "title"]
+    ordering_fields = ["created"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(
+            request,
+            parsers=[JSONParser()],
+            authenticators=[ClaimsJWTAuthentication()],
+        )
+        self.paginator = TaskCursorPagination()
+        try:
+            if not self.request.user.is_authenticated:
+                raise NotAuthenticated
+            return await super().dispatch(self.request, *args, **kwargs)
+        except APIException as exc:
+            detail = (
+                exc.detail
+                if isinstance(exc.detail, (list, dict))
+                else {"detail": exc.detail}
+            )
+            headers = {}
+            if isinstance(exc, NotAuthenticated):
+                headers["WWW-Authenticate"] = 'Bearer realm="api"'
+            return self.render(detail, exc.status_code, headers)
+
+    @staticmethod
+    def render(data, status: int = 200, headers: dict = None) -> HttpResponse:
+        with timer("render"):
+            content = b"" if data is None else FastJSONRenderer().render(data)
+        return HttpResponse(
+            content,
+            status=status,
+            headers=headers,
+            content_type=None if data is None else "application/json",
+        )
+
+    def get_queryset(self):
+        if not self.request.user.is_superuser:
+            return Task.objects.filter(user=self.request.user.pk)
+        return Task.objects.all()
+
+    async def filter_queryset(self, queryset):
+        if self.request.query_params.get(TaskSearchFilter.search_param):
+            # The first call can look up the search table, so it must not
+            # run in the event loop. The result is cached for the next ones.
+            await sync_to_async(get_search_backend)()
+        with timer("filter"):
+            for backend in self.filter_backends:
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    async def get_object(self, pk) -> Task:
+        try:
+            return await self.get_queryset().aget(pk=int(pk))
+        except (ValueError, Task.DoesNotExist):
+            raise NotFound
+
+    async def invalidate_cache(self) -> None:
+        if not task_cache.timeout:
+            return
+        user = self.request.user
+        await task_cache.abump(None if user.is_superuser else user.pk)
+
+
+class AsyncTaskListView(AsyncTaskView):
+    """
+    Asynchronous version of the task list and create actions.
+    """
+
+    async def get(self, request):
+        queryset = await self.filter_queryset(self.get_queryset())
+        queryset = TaskViewSet.get_values_queryset(queryset)
+        page = await self.paginator.apaginate_queryset(queryset, request, self)
+        if page is not None:
+            etag = TaskViewSet.get_page_etag(request, page, self.paginator.has_next)
+            not_modified = get_conditional_response(request._request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return not_modified
+            return self.render(
+                {
+                    "next": self.paginator.get_next_link(),
+                    "results": TaskSerializer.serialize_values(page),
+                },
+                headers={"ETag": etag},
+            )
+
+        tasks = [task async for task in queryset]
+        etag = TaskViewSet.get_list_etag(
+            request,
+            {
+                "updated": max((task["updated"] for task in tasks), default=None),
+                "count": len(tasks),
+            },
+        )
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+        return self.render(
+            TaskSerializer.serialize_values(tasks), headers={"ETag": etag}
+        )
+
+    async def post(self, request):
+        logger.info(
+            "AsyncTaskListView post -> Task created by %s", request.user.username
+        )
+        serializer = TaskSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        task = await Task.objects.acreate(
+            user_id=request.user.pk, **serializer.validated_data
+        )
+        await self.invalidate_cache()
+        data = TaskSerializer(task).data
+        await apublish_task_event(task.user_id, "created", data)
+        return self.render(data, HTTP_201_CREATED)
+
+
+class AsyncTaskDetailView(AsyncTaskView):
+    """
+    Asynchronous version of the task retrieve, update and destroy actions.
+    """
+
+    async def get(self, request, pk):
+        task = await self.get_object(pk)
+        headers = TaskViewSet.get_task_headers(task)
+        not_modified = get_conditional_response(
+            request._request,
+            etag=task.etag,
+            last_modified=int(task.updated.timestamp()),
+        )
+        if not_modified is not None:
+            for name, value in headers.items():
+                not_modified[name] = value
+            return not_modified
+        return self.render(TaskSerializer(task).data, headers=headers)
+
+    async def put(self, request, pk, partial: bool = False):
+        task = await self.get_object(pk)
+        serializer = TaskSerializer(task, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        for field, value in serializer.validated_data.items():
+            setattr(task, field, value)
+        await task.asave()
+        await self.invalidate_cache()
+        data = TaskSerializer(task).data
+        await apublish_task_event(task.user_id, "updated", data)
+        return self.render(data, headers=TaskViewSet.get_task_headers(task))
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+    async def delete(self, request, pk):
+        logger.info(
+            "AsyncTaskDetailView delete -> Task %s deleted by %s",
+            pk,
+            request.user.username,
+        )
+        try:
+            queryset = self.get_queryset().filter(pk=int(pk))
+        except ValueError:
+            raise NotFound
+        # The owner is only unknown for a superuser.
+        user_pk = request.user.pk
+        if request.user.is_superuser:
+            user_pk = await queryset.values_list("user_id", flat=True).afirst()
+        deleted, _ = await queryset.adelete()
+        if not deleted:
+            raise NotFound
+        await self.invalidate_cache()
+        await apublish_task_event(user_pk, "deleted", {"pk": int(pk)})
+        return self.render(None, HTTP_204_NO_CONTENT)
+
+
+class AsyncTaskCompleteView(AsyncTaskView):
+    """
+    Asynchronous version of the complete and incomplete actions.
+
+    Atributes:
+        completed (bool): Determines if the view marks the task as complete or
+            as incomplete.
+    """
+
+    completed = True
+
+    async def put(self, request, pk):
+        try:
+            queryset = self.get_queryset().filter(pk=int(pk))
+        except ValueError:
+            raise NotFound
+        versions = TaskViewSet.get_if_match_versions(request)
+        if versions is not None:
+            queryset = queryset.filter(version__in=versions)
+
+        if versions == ():
+            tasks = []
+        elif self.completed:
+            tasks = await queryset.acomplete()
+        else:
+            tasks = await queryset.aincomplete()
+        if not tasks:
+            if (
+                versions is not None
+                and await self.get_queryset().filter(pk=pk).aexists()
+            ):
+                return self.render(
+                    {"detail": "La tarea fue modificada."},
+                    HTTP_412_PRECONDITION_FAILED,
+                )
+            raise NotFound
+        await self.invalidate_cache()
+        data = TaskSerializer(tasks[0]).data
+        await apublish_task_event(tasks[0].user_id, "updated", data)
+        return self.render(data, headers=TaskViewSet.get_task_headers(tasks[0]))
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk)
+
+
+class AsyncTaskEventsView(AsyncTaskView):
+    """
+    Stream of the events of the tasks of the user, as server-sent events
+    (text/event-stream), so the clients learn about the changes made from
+    other devices without polling the task list. Each event has the type
+    of the change (created, updated, deleted or changed) and its data in
+    JSON. The idle clients only take a subscription in the broker and a
+    waiting coroutine, so a worker holds thousands of them.
+    The stream ends when the access token expires, then the client
+    reconnects with a new one and reads what it missed from the changes
+    feed. It's only served by the ASGI application.
+
+    Atributes:
+        keepalive (int): Seconds between the comments sent to an idle client,
+            so the proxies don't close the connection.
+    """
+
+    keepalive = 15
+
+    async def get(self, request):
+        if not isinstance(request._request, ASGIRequest):
+            return self.render(
+                {"detail": "Los eventos solo se sirven con la aplicación ASGI."},
+                HTTP_501_NOT_IMPLEMENTED,
+            )
+        logger.info(
+            "AsyncTaskEventsView get -> Events of %s subscribed", request.user.username
+        )
+        return StreamingHttpResponse(
+            self.stream(request.user.pk, request.auth["exp"]),
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def stream(self, user_pk, expires: float):
+        """
+        Yields the events of the user as they are published, until the
+        token expires or the client falls behind.
+
+        Args:
+            user_pk (int): Primary key of the user.
+            expires (float): Timestamp of the expiration of the token.
+        """
+
+        broker = get_broker()
+        subscription = await broker.asubscribe(user_pk)
+        try:
+            yield b": connected\n\n"
+            while (timeout := min(self.keepalive, expires - time.time())) > 0:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield (
+                    f"event: {event['type']}\n".encode()
+                    + b"data: "
+                    + FastJSONRenderer().render(event)
+                    + b"\n\n"
+                )
+        finally:
+            broker.unsubscribe(subscription)
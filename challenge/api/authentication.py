@@ -0,0 +1,111 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from .metrics import timer
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimsUser(TokenUser):
+    """
+    User backed by the claims of the access token, so the authentication
+    doesn't need to query the database. The claims that TokenSerializer adds
+    (pk, username, email, is_staff and is_superuser) are read from the token,
+    any other attribute loads the full user the first time it is needed.
+
+    Atributes:
+        cache_prefix (str): Prefix of the cache keys of the full users.
+    """
+
+    cache_prefix = "api:user:"
+
+    def __str__(self) -> str:
+        return f"Username: {self.username}, Email: {self.email}"
+
+    @cached_property
+    def email(self) -> str:
+        return self.token.get("email", "")
+
+    @cached_property
+    def user(self):
+        """
+        Returns the full user of the token. It is read from the cache when
+        TOKEN_USER_CACHE_TIMEOUT is set, for that many seconds.
+        """
+
+        timeout = getattr(settings, "TOKEN_USER_CACHE_TIMEOUT", 0)
+        if not timeout:
+            return get_user_model().objects.get(pk=self.pk)
+
+        key = f"{self.cache_prefix}{self.pk}"
+        user = cache.get(key)
+        if user is None:
+            user = get_user_model().objects.get(pk=self.pk)
+            cache.set(key, user, timeout)
+        return user
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        logger.info("ClaimsUser __getattr__ -> User %s loaded for %s.", self.pk, attr)
+        return getattr(self.user, attr)
+
+    @classmethod
+    def forget(cls, pk) -> None:
+        """
+        Removes the full user from the cache.
+
+        Args:
+            pk (int): Primary key of the user.
+        """
+
+        if getattr(settings, "TOKEN_USER_CACHE_TIMEOUT", 0):
+            cache.delete(f"{cls.cache_prefix}{pk}")
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that returns a ClaimsUser instead of querying the
+    user of every request. As the user isn't read, an inactive or deleted user
+    keeps access until the access token expires.
+    """
+
+    def authenticate(self, request):
+        with timer("auth"):
+            return super().authenticate(request)
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """
+    Schema of ClaimsJWTAuthentication, the same "jwtAuth" bearer scheme of
+    simplejwt, which drf-spectacular can't resolve for a subclass of its
+    stateless authentication.
+    """
+
+    target_class = ClaimsJWTAuthentication
+
+
+def forget_user(sender, instance, **kwargs) -> None:
+    """
+    Signal receiver that keeps the cache of the full users up to date.
+    """
+
+    ClaimsUser.forget(instance.pk)
+
+
+def connect_signals() -> None:
+    user_model = get_user_model()
+    post_save.connect(forget_user, sender=user_model, dispatch_uid="forget_user_save")
+    post_delete.connect(
+        forget_user, sender=user_model, dispatch_uid="forget_user_delete"
+    )
@@ -0,0 +1,196 @@
+import logging
+import time
+from functools import wraps
+from hashlib import md5
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCache:
+    """
+    Cache of the task responses of each user.
+    Every user has a version counter that is part of the keys of its cached
+    responses, so increasing it after a write makes all of them unreachable
+    at once, without deleting them. The writes of a superuser can change the
+    tasks of any user, so they increase a global version instead.
+
+    Atributes:
+        alias (str): Alias of the cache in the CACHES setting.
+        prefix (str): Prefix of all the keys.
+        hits (int): Responses served from the cache by this process.
+        misses (int): Responses built by this process because they weren't
+            cached.
+    """
+
+    prefix = "api:task"
+
+    def __init__(self, alias: str = "default") -> None:
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, "TASK_CACHE_TIMEOUT", 0)
+
+    def version_key(self, user_pk=None) -> str:
+        return f"{self.prefix}:version:{'all' if user_pk is None else user_pk}"
+
+    def get_versions(self, user_pk) -> tuple:
+        """
+        Returns the global version and the version of the user.
+        A missing version starts at the current time, so it never repeats a
+        version of the entries that could still be cached.
+        """
+
+        keys = [self.version_key(), self.version_key(user_pk)]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                self.cache.add(key, time.time_ns(), None)
+                versions[key] = self.cache.get(key)
+        return tuple(versions[key] for key in keys)
+
+    def bump(self, user_pk=None) -> None:
+        """
+        Increases the version of a user, or the global version if user_pk is
+        None, so that its cached responses are never served again.
+
+        Args:
+            user_pk (int): Primary key of the user whose tasks changed.
+        """
+
+        key = self.version_key(user_pk)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), None)
+
+    async def abump(self, user_pk=None) -> None:
+        """
+        Asynchronous version of bump.
+        """
+
+        key = self.version_key(user_pk)
+        try:
+            await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aadd(key, time.time_ns(), None)
+
+    @staticmethod
+    def normalize_params(query_params) -> str:
+        """
+        Returns the query parameters sorted and without the empty ones, which
+        the filters ignore like the missing ones.
+        """
+
+        return urlencode(
+            sorted(
+                (name, sorted(value for value in values if value))
+                for name, values in query_params.lists()
+            ),
+            doseq=True,
+        )
+
+    def get_key(self, request, view) -> str:
+        """
+        Returns the key of the response of the request, from the user, the
+        versions, the action and the normalized query parameters.
+        """
+
+        params = self.normalize_params(request.query_params)
+        versions = ":".join(str(v) for v in self.get_versions(request.user.pk))
+        lookup = view.kwargs.get(view.lookup_url_kwarg or view.lookup_field, "")
+        return (
+            f"{self.prefix}:{request.user.pk}:{versions}:{view.action}:{lookup}:"
+            f"{md5(params.encode()).hexdigest()}"
+        )
+
+    def get(self, key: str) -> Response | None:
+        cached = self.cache.get(key)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if cached is None:
+            return None
+        data, headers = cached
+        return Response(data, headers={**headers, "X-Cache": "HIT"})
+
+    def set(self, key: str, response: Response) -> None:
+        self.cache.set(key, (response.data, dict(response.headers)), self.timeout)
+        response["X-Cache"] = "MISS"
+
+
+task_cache = TaskCache()
+
+
+def cached_response(handler):
+    """
+    Decorator for the list and retrieve actions of a TaskCacheMixin view that
+    serves their responses from task_cache.
+    """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs) -> Response:
+        if not self.is_cacheable(request):
+            return handler(self, request, *args, **kwargs)
+
+        key = task_cache.get_key(request, self)
+        response = task_cache.get(key)
+        if response is not None:
+            # The validators of the cached response answer the conditional
+            # requests without querying the database.
+            not_modified = get_conditional_response(
+                request._request,
+                etag=response.get("ETag"),
+                last_modified=parse_http_date_safe(response.get("Last-Modified")),
+            )
+            return not_modified or response
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            task_cache.set(key, response)
+        return response
+
+    return wrapper
+
+
+class TaskCacheMixin:
+    """
+    ViewSet mixin that invalidates the cached task responses of the user
+    after every successful write. Superusers see the tasks of all users, so
+    their reads aren't cached and their writes invalidate every user. Without
+    a TASK_CACHE_TIMEOUT nothing is cached, so nothing is invalidated either.
+    """
+
+    def is_cacheable(self, request) -> bool:
+        return bool(task_cache.timeout) and not request.user.is_superuser
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+            and task_cache.timeout
+        ):
+            logger.info(
+                "TaskCacheMixin finalize_response -> Cache of user %s invalidated.",
+                request.user.pk,
+            )
+            task_cache.bump(None if request.user.is_superuser else request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+from functools import partial
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Events of the tasks of a user, for one client of the event stream.
+    The events wait in a bounded queue until the client reads them. A client
+    that falls behind by more than max_size events is closed, instead of
+    holding the events in memory, and catches up with the changes feed.
+
+    Atributes:
+        user_pk (int): Primary key of the user.
+        loop (asyncio.AbstractEventLoop): Event loop of the client.
+        queue (asyncio.Queue): Events not read yet. None closes the stream.
+    """
+
+    max_size = 100
+
+    def __init__(self, user_pk) -> None:
+        self.user_pk = user_pk
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.max_size + 1)
+
+    def put(self, event: dict | None) -> None:
+        """
+        Adds an event to the queue. Must run in the event loop of the client.
+        """
+
+        if self.queue.full():
+            return
+        if self.queue.qsize() == self.max_size:
+            logger.warning(
+                "Subscription put -> Events of user %s dropped.", self.user_pk
+            )
+            event = None
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict | None:
+        return await self.queue.get()
+
+
+class BaseBroker:
+    """
+    Broker of the events of the tasks: the views publish the changes of the
+    tasks of a user and every subscription of the user receives them.
+    """
+
+    def subscribe(self, user_pk) -> Subscription:
+        """
+        Returns a new subscription to the events of a user. Must be called
+        from the event loop that reads it.
+        """
+
+        raise NotImplementedError
+
+    async def asubscribe(self, user_pk) -> Subscription:
+        """
+        Asynchronous version of subscribe.
+        """
+
+        return self.subscribe(user_pk)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+    def publish(self, user_pk, event: dict) -> None:
+        """
+        Sends an event to the subscriptions of a user. It can be called from
+        any thread.
+        """
+
+        raise NotImplementedError
+
+    async def apublish(self, user_pk, event: dict) -> None:
+        """
+        Asynchronous version of publish.
+        """
+
+        await sync_to_async(self.publish)(user_pk, event)
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Broker that delivers the events to the subscriptions of the same
+    process. It's enough when a single process serves the event stream and
+    the writes, otherwise see PostgresBroker.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions = {}
+        self._lock = Lock()
+
+    def subscribe(self, user_pk) -> Subscription:
+        subscription = Subscription(user_pk)
+        with self._lock:
+            self.subscriptions.setdefault(user_pk, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self.subscriptions.get(subscription.user_pk, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_pk, None)
+
+    def publish(self, user_pk, event: dict) -> None:
+        with self._lock:
+            subscriptions = list(self.subscriptions.get(user_pk, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The event loop of the subscription was closed.
+                self.unsubscribe(subscription)
+
+    async def apublish(self, user_pk, event: dict) -> None:
+        self.publish(user_pk, event)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Broker that fans the events out to the processes of every node through
+    the NOTIFY and LISTEN commands of PostgreSQL, so the event stream can be
+    served by several workers. Each event loop with subscriptions listens on
+    a connection of its own, opened in a thread from its first subscription
+    and closed after its last one, and delivers the notifications to its
+    subscriptions. The payload of a notification is limited to 8000 bytes,
+    so the data of a larger event is left out and the client reads the task
+    from the changes feed.
+
+    Atributes:
+        channel (str): Channel of the notifications.
+        using (str): Alias of the database.
+        max_payload (int): Maximum size of a notification.
+    """
+
+    channel = "api_task_events"
+    using = "default"
+    max_payload = 7999
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Listening connection and number of subscriptions of each loop.
+        self._listeners = {}
+
+    def publish(self, user_pk, event: dict) -> None:
+        payload = json.dumps({"user": user_pk, "event": event}, default=str)
+        if len(payload.encode()) > self.max_payload:
+            event = {key: value for key, value in event.items() if key != "data"}
+            payload = json.dumps({"user": user_pk, "event": event}, default=str)
+        self.notify(payload)
+
+    async def apublish(self, user_pk, event: dict) -> None:
+        # The notification is sent with a database cursor, which can't be
+        # used from the event loop.
+        await sync_to_async(self.publish)(user_pk, event)
+
+    def notify(self, payload: str) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def subscribe(self, user_pk) -> Subscription:
+        """
+        Subscribes and starts listening in the loop if it isn't yet. It
+        blocks the loop while it connects, so asubscribe is preferred.
+        """
+
+        loop = asyncio.get_running_loop()
+        if loop not in self._listeners:
+            self.listen(loop, self.connect())
+        return self.add_subscription(user_pk, loop)
+
+    async def asubscribe(self, user_pk) -> Subscription:
+        loop = asyncio.get_running_loop()
+        if loop not in self._listeners:
+            connection = await sync_to_async(self.connect, thread_sensitive=False)()
+            if loop in self._listeners:
+                # Another subscription of the loop connected in the meantime.
+                connection.close()
+            else:
+                self.listen(loop, connection)
+        return self.add_subscription(user_pk, loop)
+
+    def add_subscription(self, user_pk, loop) -> Subscription:
+        subscription = super().subscribe(user_pk)
+        with self._lock:
+            self._listeners[loop][1] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        super().unsubscribe(subscription)
+        loop = subscription.loop
+        with self._lock:
+            listener = self._listeners.get(loop)
+            if listener is None:
+                return
+            listener[1] -= 1
+            if listener[1] > 0:
+                return
+            del self._listeners[loop]
+        connection = listener[0]
+        if not loop.is_closed():
+            loop.remove_reader(connection.fileno())
+        connection.close()
+
+    def connect(self):
+        """
+        Returns a new connection that listens to the channel.
+        """
+
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        wrapper = connections[self.using]
+        connection = psycopg2.connect(**wrapper.get_connection_params())
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def listen(self, loop, connection) -> None:
+        """
+        Delivers the notifications of the connection in the loop.
+        """
+
+        loop.add_reader(connection.fileno(), self.receive, loop, connection)
+        with self._lock:
+            self._listeners[loop] = [connection, 0]
+
+    def receive(self, loop, connection) -> None:
+        """
+        Delivers the notifications received by the connection of a loop to
+        the subscriptions of the loop.
+        """
+
+        connection.poll()
+        while connection.notifies:
+            notify = connection.notifies.pop(0)
+            try:
+                message = json.loads(notify.payload)
+            except ValueError:
+                logger.warning("PostgresBroker receive -> Invalid notification.")
+                continue
+            with self._lock:
+                subscriptions = [
+                    subscription
+                    for subscription in self.subscriptions.get(message["user"], ())
+                    if subscription.loop is loop
+                ]
+            for subscription in subscriptions:
+                subscription.put(message["event"])
+
+
+_brokers = {}
+
+
+def get_broker() -> BaseBroker:
+    """
+    Returns the broker of the process, of the class set in
+    TASK_EVENTS_BROKER or InProcessBroker by default.
+    """
+
+    path = getattr(settings, "TASK_EVENTS_BROKER", None) or (
+        "api.events.InProcessBroker"
+    )
+    broker = _brokers.get(path)
+    if broker is None:
+        broker = _brokers.setdefault(path, import_string(path)())
+    return broker
+
+
+def get_task_event(event_type: str, data=None) -> dict:
+    """
+    Returns an event of the tasks of a user.
+
+    Args:
+        event_type (str): created, updated or deleted, or changed when many
+            tasks changed and the client should read the changes feed.
+        data (dict): Representation of the task, or its pk if it was deleted.
+    """
+
+    event = {"type": event_type}
+    if data is not None:
+        event["data"] = data
+    return event
+
+
+def publish_task_event(user_pk, event_type: str, data=None) -> None:
+    """
+    Publishes an event of the tasks of a user (see get_task_event) when the
+    current transaction is committed, so the clients never see a change
+    that was rolled back.
+
+    Args:
+        user_pk (int): Primary key of the owner of the tasks.
+    """
+
+    event = get_task_event(event_type, data)
+    transaction.on_commit(partial(get_broker().publish, user_pk, event))
+
+
+async def apublish_task_event(user_pk, event_type: str, data=None) -> None:
+    """
+    Asynchronous version of publish_task_event, for the asynchronous views,
+    which run in autocommit mode.
+    """
+
+    await get_broker().apublish(user_pk, get_task_event(event_type, data))
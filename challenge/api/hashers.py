@@ -0,0 +1,197 @@
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+
+from .metrics import hash_seconds, timer
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(APIException):
+    """
+    The hashing pool is full: the request is rejected before its hash waits
+    longer than the client would.
+
+    Atributes:
+        wait (int): Estimated seconds until the pool has room, sent in the
+            Retry-After header.
+    """
+
+    status_code = 503
+    default_detail = "El servidor está ocupado, intente de nuevo en unos segundos."
+    default_code = "hashing_busy"
+
+    def __init__(self, wait: int = None) -> None:
+        super().__init__()
+        self.wait = wait
+
+
+class HashingPool:
+    """
+    Bounded pool of threads that computes the password hashes.
+    hashlib releases the GIL while it computes PBKDF2 and scrypt, so the
+    threads run on the cores in parallel, but never more hashes at once than
+    workers: a burst of sign ins waits in the queue instead of taking every
+    core from the other requests. When workers + queue_size hashes are
+    already in the pool, the next one is rejected with HashingBusy (503).
+    The pool belongs to the process, so with several worker processes the
+    workers of all of them should add up to the cores.
+
+    Atributes:
+        workers (int): Threads of the pool, HASHING_WORKERS or the cores.
+        queue_size (int): Hashes that can wait for a thread,
+            HASHING_QUEUE_SIZE.
+        pending (int): Hashes waiting or being computed.
+        running (int): Hashes being computed.
+        completed (int): Hashes computed by the pool.
+        rejected (int): Hashes rejected because the pool was full.
+        average (float): Moving average of the seconds of a hash.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None) -> None:
+        self.workers = (
+            workers or getattr(settings, "HASHING_WORKERS", 0) or os.cpu_count() or 1
+        )
+        self.queue_size = (
+            queue_size
+            if queue_size is not None
+            else getattr(settings, "HASHING_QUEUE_SIZE", 4 * self.workers)
+        )
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.average = 0.0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # The threads don't survive a fork, like the one of the preloaded
+        # gunicorn workers, so each process starts its own.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        self.workers,
+                        thread_name_prefix="hashing",
+                        initializer=self._start_worker,
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return self.pending - self.running
+
+    def _start_worker(self) -> None:
+        self._local.worker = True
+
+    def run(self, function, *args, **kwargs):
+        """
+        Calls the function in a thread of the pool and returns its result,
+        or raises HashingBusy if the pool is full.
+        """
+
+        if getattr(self._local, "worker", False):
+            return function(*args, **kwargs)
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                # Time until the hashes ahead are computed.
+                wait = max(math.ceil(self.pending * self.average / self.workers), 1)
+                logger.warning(
+                    "HashingPool run -> Hash rejected, %s hashes pending.",
+                    self.pending,
+                )
+                raise HashingBusy(wait)
+            self.pending += 1
+
+        submitted = time.perf_counter()
+        try:
+            with timer("hash"):
+                return self.executor.submit(
+                    self._call, submitted, function, args, kwargs
+                ).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _call(self, submitted: float, function, args, kwargs):
+        start = time.perf_counter()
+        hash_seconds.observe(("wait",), start - submitted)
+        with self._lock:
+            self.running += 1
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            hash_seconds.observe(("compute",), seconds)
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.average = (
+                    seconds
+                    if not self.average
+                    else (0.9 * self.average + 0.1 * seconds)
+                )
+
+
+hashing_pool = HashingPool()
+
+
+class PooledHasherMixin:
+    """
+    Password hasher mixin that computes the hashes in the hashing pool. The
+    verification of a password and the hardening of the runtime hash it
+    with encode too, so every hash of the process goes through the pool.
+    """
+
+    def encode(self, password, salt, *args, **kwargs):
+        return hashing_pool.run(super().encode, password, salt, *args, **kwargs)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 with SHA256, the default hasher of Django, in the hashing pool.
+    """
+
+
+class ScryptPasswordHasher(PooledHasherMixin, hashers.ScryptPasswordHasher):
+    """
+    scrypt in the hashing pool. It's memory-hard: each hash takes
+    128 * block_size * work_factor bytes (16 MiB by default), which makes
+    guessing passwords with GPUs much more expensive than with PBKDF2. The
+    pool also bounds the memory, to workers times that. The parameters come
+    from the SCRYPT_* settings, and changing them rehashes each password on
+    the next sign in of the user.
+    """
+
+    @property
+    def work_factor(self) -> int:
+        return getattr(settings, "SCRYPT_WORK_FACTOR", 2**14)
+
+    @property
+    def block_size(self) -> int:
+        return getattr(settings, "SCRYPT_BLOCK_SIZE", 8)
+
+    @property
+    def parallelism(self) -> int:
+        return getattr(settings, "SCRYPT_PARALLELISM", 1)
+
+    @property
+    def maxmem(self) -> int:
+        # Twice the memory of a hash with the current parameters, so the
+        # hashes made before the work factor or the block size was halved
+        # once can still be verified. Lowering them more than that fails to
+        # verify the older hashes until their users reset the password.
+        return 2 * 128 * self.block_size * (self.work_factor + self.parallelism)
@@ -0,0 +1,238 @@
+"""
+Logging pipeline of the project.
+
+In the "sync" mode the records are written by the thread that logs them, to
+the console and, for the django logger, to info.log. In the "async" mode the
+records are put, without formatting them, in a bounded queue and a
+background thread formats them as JSON lines and writes them, so a request
+only pays for creating the record. The records can be sampled per logger
+before they reach the queue.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through only a fraction of the records of each logger. The rate of
+    a logger is the one of its closest configured ancestor, and warnings and
+    errors are never dropped.
+
+    Atributes:
+        rates (dict): Fraction of the records kept for each logger name.
+        min_level (int): Level from which every record is kept.
+    """
+
+    def __init__(self, rates: dict = None, min_level: int = logging.WARNING) -> None:
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in (rates or {}).items()}
+        self.min_level = min_level
+        self._cache = {}
+
+    def get_rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                candidate = ".".join(parts[:i])
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+            else:
+                rate = self.rates.get("", 1.0)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.min_level:
+            return True
+        rate = self.get_rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a JSON object in a single line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Handler that puts the records in a bounded queue, from which a
+    background thread passes them to the handlers named in the LOGGING
+    setting. The message is formatted by that thread, so the arguments of
+    the log calls must not be changed after logging them.
+    When the queue is full the record is dropped instead of waiting.
+
+    Atributes:
+        handlers (list): Names of the handlers that write the records.
+        queue_size (int): Maximum number of records waiting to be written.
+        dropped (int): Records dropped because the queue was full.
+    """
+
+    def __init__(self, handlers: list, queue_size: int = 10000) -> None:
+        super().__init__(queue.Queue(queue_size))
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Starts the writer thread of this process. A process forked after the
+        thread started, like a gunicorn worker of a preloaded application,
+        doesn't inherit it, so it starts its own with a new queue.
+        """
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self.queue = queue.Queue(self.queue_size)
+            # The handlers are configured by name after this one, so they are
+            # looked up on the first record.
+            targets = [logging._handlers[name] for name in self.handlers]
+            self.listener = QueueListener(
+                self.queue, *targets, respect_handler_level=True
+            )
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """
+        Writes the records in the queue and stops the writer thread.
+        """
+
+        with self._lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler, the message is left to the writer thread.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def close(self) -> None:
+        self.stop()
+        super().close()
+
+
+def parse_rates(value: str) -> dict:
+    """
+    Returns the sampling rates of a "logger=rate,logger=rate" string.
+    """
+
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def get_logging_config(
+    mode: str = "sync",
+    level: str = "INFO",
+    sample_rates: dict = None,
+    filename: str = "info.log",
+    stream=None,
+) -> dict:
+    """
+    Returns the LOGGING setting of a mode of the pipeline.
+
+    Args:
+        mode (str): "sync" or "async".
+        level (str): Minimum level of the records that are created.
+        sample_rates (dict): Fraction of the records kept for each logger,
+            only used in the async mode.
+        filename (str): File of the records of the django logger.
+        stream: Stream of the console handler, sys.stderr if empty.
+    """
+
+    console = {"class": "logging.StreamHandler"}
+    if stream is not None:
+        console["stream"] = stream
+    file = {"level": "INFO", "class": "logging.FileHandler", "filename": filename}
+
+    if mode != "async":
+        return {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "handlers": {"console": console, "file": file},
+            "root": {"handlers": ["console"], "level": level},
+            "loggers": {
+                "django": {
+                    "handlers": ["console", "file"],
+                    "level": level,
+                    "propagate": True,
+                },
+            },
+        }
+
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {"json": {"()": "api.log.JSONFormatter"}},
+        "filters": {
+            "sampling": {"()": "api.log.SamplingFilter", "rates": sample_rates or {}},
+        },
+        "handlers": {
+            "console": {**console, "formatter": "json"},
+            "file": {**file, "formatter": "json", "delay": True},
+            "queue": {
+                "()": "api.log.AsyncHandler",
+                "handlers": ["console"],
+                "filters": ["sampling"],
+            },
+            "django_queue": {
+                "()": "api.log.AsyncHandler",
+                "handlers": ["file"],
+                "filters": ["sampling"],
+            },
+        },
+        "root": {"handlers": ["queue"], "level": level},
+        "loggers": {
+            "django": {
+                "handlers": ["django_queue"],
+                "level": level,
+                "propagate": True,
+            },
+        },
+    }
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = "Deletes the tombstones of the tasks deleted before the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.TASK_TOMBSTONE_RETENTION,
+            help="Days that the tombstones are kept, TASK_TOMBSTONE_RETENTION "
+            "by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Maximum number of tombstones deleted by each query.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = TaskTombstone.objects.filter(deleted__lt=cutoff)
+        total = 0
+        # Short deletes don't lock the table for the writes of the requests.
+        while pks := list(
+            expired.values_list("pk", flat=True)[: options["batch_size"]]
+        ):
+            total += TaskTombstone.objects.filter(pk__in=pks).delete()[0]
+        self.stdout.write(f"{total} tombstones deleted.")
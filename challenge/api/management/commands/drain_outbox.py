@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import OutboxDrainer
+
+
+class Command(BaseCommand):
+    help = "Sends the pending emails of the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and send the new emails as they are enqueued.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait for new emails when running with --loop.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of emails sent through each SMTP connection.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Attempts before an email is marked as failed.",
+        )
+
+    def handle(self, *args, **options):
+        drainer = OutboxDrainer(
+            batch_size=options["batch_size"], max_attempts=options["max_attempts"]
+        )
+        while True:
+            totals = drainer.drain()
+            if totals["sent"] or totals["failed"]:
+                self.stdout.write(
+                    f"{totals['sent']} emails sent, {totals['failed']} failed."
+                )
+            if not options["loop"]:
+                return
+            close_old_connections()
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import User
+from api.seed import DISTRIBUTIONS, Seeder
+
+
+class Command(BaseCommand):
+    help = "Generates users and tasks for benchmarks and capacity planning."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--tasks", type=int, default=1000, help="Total number of tasks."
+        )
+        parser.add_argument(
+            "--distribution",
+            choices=DISTRIBUTIONS,
+            default="skewed",
+            help="How the tasks are spread among the users.",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=3,
+            help="Exponent of the skewed distribution.",
+        )
+        parser.add_argument(
+            "--completed",
+            type=float,
+            default=0.3,
+            help="Fraction of completed tasks.",
+        )
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=365,
+            help="Days before now along which the tasks were created.",
+        )
+        parser.add_argument(
+            "--description-words",
+            default="3:12",
+            help="Minimum and maximum words of the descriptions, as MIN:MAX.",
+        )
+        parser.add_argument("--prefix", default="seed", help="Prefix of the usernames.")
+        parser.add_argument(
+            "--password", default="seed1234", help="Password of every user."
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--seed", type=int, help="Seed of the random data, to reproduce it."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            minimum, maximum = (
+                int(words) for words in options["description_words"].split(":")
+            )
+        except ValueError:
+            raise CommandError("--description-words must be MIN:MAX.")
+        if not 0 < minimum <= maximum:
+            raise CommandError("--description-words must be MIN:MAX, with 0 < MIN.")
+        if options["tasks"] and not options["users"]:
+            raise CommandError("The tasks need at least one user.")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(
+                f"There are users with the prefix {options['prefix']!r} already, "
+                "use another --prefix."
+            )
+
+        seeder = Seeder(
+            prefix=options["prefix"],
+            password=options["password"],
+            distribution=options["distribution"],
+            skew=options["skew"],
+            completed=options["completed"],
+            days=options["days"],
+            description_words=(minimum, maximum),
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+        )
+        start = time.perf_counter()
+        seeder.seed(options["users"], options["tasks"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{options['users']} users and {options['tasks']} tasks created in "
+            f"{elapsed:.1f} s."
+        )
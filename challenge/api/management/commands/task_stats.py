@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.stats import get_stats_backend, verify_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the task counters of every user and verifies them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Only compare the counters with the tasks, without rebuilding them.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Maximum number of differences shown of each kind.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_stats_backend()
+        if backend is None:
+            raise CommandError(
+                "The database doesn't maintain the counters, the statistics "
+                "are counted from the tasks."
+            )
+        if not options["verify_only"]:
+            start = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(
+                f"Counters rebuilt in {time.perf_counter() - start:.1f} s."
+            )
+
+        differences = verify_stats(options["limit"])
+        if any(differences.values()):
+            for kind, rows in differences.items():
+                for row in rows:
+                    self.stderr.write(f"{kind}: {row}")
+            raise CommandError("The counters don't match the tasks.")
+        self.stdout.write("The counters match the tasks.")
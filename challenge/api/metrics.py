@@ -0,0 +1,322 @@
+"""
+Per-request performance instrumentation.
+
+When METRICS_ENABLED is set, ServerTimingMiddleware records the total time,
+the number and time of the database queries and the time of the phases
+measured with timer() (authentication, filters, serialization, rendering
+and password hashing) of each request. They are sent in the Server-Timing header and
+collected in histograms per view and action, which metrics_view exposes in
+the Prometheus text format. The histograms belong to the process, so each
+worker of a multi-process server exposes its own.
+When the setting is off the middleware removes itself and timer() only
+reads a context variable.
+"""
+
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+# Timings of the request being served in the current context.
+current_timings = ContextVar("current_timings", default=None)
+
+PHASES = ["auth", "filter", "serialize", "render"]
+
+
+class RequestTimings:
+    """
+    Timings of a request.
+
+    Atributes:
+        start (float): perf_counter of the start of the request.
+        phases (dict): Seconds spent in each measured phase.
+        queries (int): Number of database queries.
+        db (float): Seconds spent in the database queries.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.db = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def header(self, total: float) -> str:
+        metrics = [
+            f"total;dur={total * 1000:.2f}",
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+        ]
+        metrics.extend(
+            f"{phase};dur={seconds * 1000:.2f}"
+            for phase, seconds in self.phases.items()
+            if seconds
+        )
+        return ", ".join(metrics)
+
+
+@contextmanager
+def timer(phase: str):
+    """
+    Adds the time of the block to a phase of the current request, if it is
+    being measured.
+    """
+
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds the queries to the current request.
+    """
+
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - start
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that adds the serialization time to the current request.
+    """
+
+    @property
+    def data(self):
+        with timer("serialize"):
+            return super().data
+
+
+class Histogram:
+    """
+    Prometheus histogram with labels.
+
+    Atributes:
+        name (str): Name of the metric.
+        help (str): Description of the metric.
+        labels (tuple): Names of the labels.
+        buckets (tuple): Upper bounds of the buckets.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self._lock = Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {
+                labels: (list(b), c, s) for labels, (b, c, s) in self.series.items()
+            }
+        for labels, (buckets, count, total) in sorted(series.items()):
+            label = ",".join(
+                f'{name}="{escape(value)}"' for name, value in zip(self.labels, labels)
+            )
+            cumulative = 0
+            for bound, observations in zip(self.buckets, buckets):
+                cumulative += observations
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+        return lines
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+request_seconds = Histogram(
+    "api_request_duration_seconds",
+    "Total time of the requests.",
+    ("view", "action", "method", "status"),
+    SECONDS,
+)
+phase_seconds = Histogram(
+    "api_request_phase_seconds",
+    "Time of each phase of the requests.",
+    ("view", "action", "phase"),
+    SECONDS,
+)
+request_queries = Histogram(
+    "api_request_queries",
+    "Database queries of the requests.",
+    ("view", "action"),
+    (0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+hash_seconds = Histogram(
+    "api_password_hash_seconds",
+    "Time of the password hashes waiting for a thread of the pool and computing.",
+    ("phase",),
+    SECONDS,
+)
+
+
+def get_view_labels(request) -> tuple:
+    """
+    Returns the names of the view and the action that served the request.
+    """
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved", request.method.lower()
+    func = match.func
+    view = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    name = view.__name__ if view is not None else match.view_name
+    actions = getattr(func, "actions", None) or {}
+    return name, actions.get(request.method.lower(), request.method.lower())
+
+
+class ServerTimingMiddleware:
+    """
+    Measures each request, adds the Server-Timing header to its response and
+    collects its timings in the histograms.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Runs in the thread of the view, which has its own connections.
+        for alias in connections:
+            connection = connections[alias]
+            if record_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(record_query)
+
+    def process_template_response(self, request, response):
+        # The DRF responses are rendered after the view returns them.
+        start = time.perf_counter()
+        timings = current_timings.get()
+
+        def rendered(response):
+            timings.add("render", time.perf_counter() - start)
+
+        if timings is not None:
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def finish(request, response, timings: RequestTimings):
+        total = time.perf_counter() - timings.start
+        response["Server-Timing"] = timings.header(total)
+        view, action = get_view_labels(request)
+        request_seconds.observe(
+            (view, action, request.method, str(response.status_code)), total
+        )
+        request_queries.observe((view, action), timings.queries)
+        phase_seconds.observe((view, action, "db"), timings.db)
+        for phase, seconds in timings.phases.items():
+            phase_seconds.observe((view, action, phase), seconds)
+        return response
+
+
+def render_metrics() -> str:
+    from .cache import task_cache
+    from .hashers import hashing_pool
+
+    lines = []
+    for histogram in (request_seconds, phase_seconds, request_queries, hash_seconds):
+        lines.extend(histogram.render())
+    lines.extend(
+        [
+            "# HELP api_task_cache_requests_total Responses looked up in the task cache.",
+            "# TYPE api_task_cache_requests_total counter",
+            f'api_task_cache_requests_total{{result="hit"}} {task_cache.hits}',
+            f'api_task_cache_requests_total{{result="miss"}} {task_cache.misses}',
+            "# HELP api_password_hash_queue_depth Hashes waiting for a thread.",
+            "# TYPE api_password_hash_queue_depth gauge",
+            f"api_password_hash_queue_depth {hashing_pool.queued}",
+            "# HELP api_password_hash_running Password hashes being computed.",
+            "# TYPE api_password_hash_running gauge",
+            f"api_password_hash_running {hashing_pool.running}",
+            "# HELP api_password_hash_workers Threads of the hashing pool.",
+            "# TYPE api_password_hash_workers gauge",
+            f"api_password_hash_workers {hashing_pool.workers}",
+            "# HELP api_password_hashes_total Password hashes sent to the pool.",
+            "# TYPE api_password_hashes_total counter",
+            f'api_password_hashes_total{{result="completed"}} {hashing_pool.completed}',
+            f'api_password_hashes_total{{result="rejected"}} {hashing_pool.rejected}',
+        ]
+    )
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request) -> HttpResponse:
+    """
+    Returns the metrics of this process in the Prometheus text format. It is
+    only available from the INTERNAL_IPS and when METRICS_ENABLED is set.
+    """
+
+    if not getattr(settings, "METRICS_ENABLED", False) or request.META.get(
+        "REMOTE_ADDR"
+    ) not in getattr(settings, "INTERNAL_IPS", []):
+        raise Http404
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
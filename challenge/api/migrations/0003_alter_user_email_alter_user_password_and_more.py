@@ -4,6 +4,19 @@ import django.core.validators
 from django.db import migrations, models
 
 
+class AlterUnlimitedCharField(migrations.AlterField):
+    # Only PostgreSQL can create a CharField without max_length, the other
+    # databases keep the previous column until 0010 sets max_length. It runs
+    # after the other fields, because SQLite rebuilds the table to alter them.
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.features.supports_unlimited_charfield:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.features.supports_unlimited_charfield:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -16,14 +29,14 @@ class Migration(migrations.Migration):
             name='email',
             field=models.EmailField(db_index=True, error_messages={'invalid': 'Email inválido.', 'unique': 'Email en uso.'}, max_length=254, unique=True, validators=[django.core.validators.EmailValidator()]),
         ),
-        migrations.AlterField(
-            model_name='user',
-            name='password',
-            field=models.CharField(error_messages={'invalid': 'Contraseña inválida.'}, validators=[django.core.validators.RegexValidator(regex='^(?=.*.)(?=.*\\d).{8,}$')]),
-        ),
         migrations.AlterField(
             model_name='user',
             name='username',
             field=models.CharField(db_index=True, editable=False, error_messages={'invalid': 'Nombre de usuario inválido.', 'max_length': 'Nombre de usuario demasiado largo.', 'unique': 'Nombre de usuario en uso.'}, max_length=25, unique=True),
         ),
+        AlterUnlimitedCharField(
+            model_name='user',
+            name='password',
+            field=models.CharField(error_messages={'invalid': 'Contraseña inválida.'}, validators=[django.core.validators.RegexValidator(regex='^(?=.*.)(?=.*\\d).{8,}$')]),
+        ),
     ]
@@ -0,0 +1,102 @@
+from django.db import OperationalError, migrations
+
+# The SQL is a copy of the one of api.search when the search was added, so
+# later changes of the search backends don't change this migration.
+
+POSTGRES_INSTALL = [
+    '''
+    ALTER TABLE "api_task" ADD COLUMN "search_vector" tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce("title", '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce("description", '')), 'B')
+    ) STORED
+    ''',
+    'CREATE INDEX "api_task_search_idx" ON "api_task" USING GIN ("search_vector")',
+]
+
+POSTGRES_UNINSTALL = [
+    'ALTER TABLE "api_task" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+SQLITE_TABLE = '''
+    CREATE VIRTUAL TABLE "api_task_fts" USING fts5(
+        title, description, content='api_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+'''
+
+SQLITE_INSERT = '''
+    INSERT INTO "api_task_fts"("rowid", "title", "description")
+    VALUES (new."id", new."title", new."description");
+'''
+
+SQLITE_DELETE = '''
+    INSERT INTO "api_task_fts"("api_task_fts", "rowid", "title", "description")
+    VALUES ('delete', old."id", old."title", old."description");
+'''
+
+SQLITE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_insert"
+    AFTER INSERT ON "api_task" BEGIN {SQLITE_INSERT} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_delete"
+    AFTER DELETE ON "api_task" BEGIN {SQLITE_DELETE} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_update"
+    AFTER UPDATE OF "title", "description" ON "api_task"
+    BEGIN {SQLITE_DELETE} {SQLITE_INSERT} END
+    ''',
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS "api_task_fts_insert"',
+    'DROP TRIGGER IF EXISTS "api_task_fts_delete"',
+    'DROP TRIGGER IF EXISTS "api_task_fts_update"',
+    'DROP TABLE IF EXISTS "api_task_fts"',
+]
+
+
+def install_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRES_INSTALL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_TABLE)
+        except OperationalError:
+            # SQLite was built without FTS5, the icontains search is used.
+            return
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+        schema_editor.execute(
+            'INSERT INTO "api_task_fts"("api_task_fts", "rank") '
+            "VALUES('rank', 'bm25(2.0, 1.0)')"
+        )
+        schema_editor.execute(
+            'INSERT INTO "api_task_fts"("api_task_fts") VALUES(\'rebuild\')'
+        )
+
+
+def uninstall_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRES_UNINSTALL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_UNINSTALL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
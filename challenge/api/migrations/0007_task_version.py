@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-17 23:35
+
+from django.db import migrations, models
+
+# Copy of the SQLite search triggers of 0006_task_search.
+
+SQLITE_INSERT = '''
+    INSERT INTO "api_task_fts"("rowid", "title", "description")
+    VALUES (new."id", new."title", new."description");
+'''
+
+SQLITE_DELETE = '''
+    INSERT INTO "api_task_fts"("api_task_fts", "rowid", "title", "description")
+    VALUES ('delete', old."id", old."title", old."description");
+'''
+
+SQLITE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_insert"
+    AFTER INSERT ON "api_task" BEGIN {SQLITE_INSERT} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_delete"
+    AFTER DELETE ON "api_task" BEGIN {SQLITE_DELETE} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_fts_update"
+    AFTER UPDATE OF "title", "description" ON "api_task"
+    BEGIN {SQLITE_DELETE} {SQLITE_INSERT} END
+    ''',
+]
+
+
+def install_search_triggers(apps, schema_editor):
+    # SQLite drops the triggers of the tasks table when it rebuilds it.
+    connection = schema_editor.connection
+    if (
+        connection.vendor == 'sqlite'
+        and 'api_task_fts' in connection.introspection.table_names()
+    ):
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_task_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        # SQLite rebuilds the table to add the column.
+        migrations.RunPython(install_search_triggers, migrations.RunPython.noop),
+    ]
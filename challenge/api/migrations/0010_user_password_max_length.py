@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 23:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class AlterLimitedCharField(migrations.AlterField):
+    # Going back restores the CharField without max_length of 0003, which
+    # only PostgreSQL can create, the other databases keep the column.
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.features.supports_unlimited_charfield:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_outboxemail'),
+    ]
+
+    operations = [
+        AlterLimitedCharField(
+            model_name='user',
+            name='password',
+            field=models.CharField(error_messages={'invalid': 'Contraseña inválida.'}, max_length=128, validators=[django.core.validators.RegexValidator(regex='^(?=.*.)(?=.*\\d).{8,}$')]),
+        ),
+    ]
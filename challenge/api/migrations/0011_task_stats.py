@@ -0,0 +1,184 @@
+# Generated by Django 5.0.2 on 2026-10-18 00:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# The SQL is a copy of the one of api.stats when the counters were added, so
+# later changes of the stats backends don't change this migration.
+
+POSTGRES_FUNCTION = '''
+CREATE OR REPLACE FUNCTION "api_task_stats"() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    UPDATE "api_taskstats" SET "total" = "total" - 1,
+      "completed" = "completed" - old."completed"::int
+      WHERE "user_id" = old."user_id";
+    UPDATE "api_taskdaystats" SET "created" = "created" - 1
+      WHERE "user_id" = old."user_id"
+      AND "day" = ((old."created" AT TIME ZONE 'UTC')::date);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO "api_taskstats" ("user_id", "total", "completed")
+      VALUES (new."user_id", 1, new."completed"::int)
+      ON CONFLICT ("user_id") DO UPDATE SET
+      "total" = "api_taskstats"."total" + 1,
+      "completed" = "api_taskstats"."completed" + excluded."completed";
+    INSERT INTO "api_taskdaystats" ("user_id", "day", "created")
+      VALUES (new."user_id", ((new."created" AT TIME ZONE 'UTC')::date), 1)
+      ON CONFLICT ("user_id", "day") DO UPDATE SET
+      "created" = "api_taskdaystats"."created" + 1;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+'''
+
+POSTGRES_TRIGGERS = [
+    '''
+    CREATE TRIGGER "api_task_stats_insert" AFTER INSERT ON "api_task"
+    FOR EACH ROW EXECUTE FUNCTION "api_task_stats"()
+    ''',
+    '''
+    CREATE TRIGGER "api_task_stats_delete" AFTER DELETE ON "api_task"
+    FOR EACH ROW EXECUTE FUNCTION "api_task_stats"()
+    ''',
+    '''
+    CREATE TRIGGER "api_task_stats_update"
+    AFTER UPDATE OF "user_id", "completed", "created" ON "api_task"
+    FOR EACH ROW WHEN (
+        old."user_id" IS DISTINCT FROM new."user_id"
+        OR old."completed" IS DISTINCT FROM new."completed"
+        OR old."created" IS DISTINCT FROM new."created"
+    ) EXECUTE FUNCTION "api_task_stats"()
+    ''',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS "api_task_stats_insert" ON "api_task"',
+    'DROP TRIGGER IF EXISTS "api_task_stats_delete" ON "api_task"',
+    'DROP TRIGGER IF EXISTS "api_task_stats_update" ON "api_task"',
+    'DROP FUNCTION IF EXISTS "api_task_stats"()',
+]
+
+SQLITE_REMOVE = '''
+    UPDATE "api_taskstats" SET "total" = "total" - 1,
+      "completed" = "completed" - old."completed"
+      WHERE "user_id" = old."user_id";
+    UPDATE "api_taskdaystats" SET "created" = "created" - 1
+      WHERE "user_id" = old."user_id" AND "day" = date(old."created");
+'''
+
+SQLITE_ADD = '''
+    INSERT INTO "api_taskstats" ("user_id", "total", "completed")
+      VALUES (new."user_id", 1, new."completed")
+      ON CONFLICT ("user_id") DO UPDATE SET "total" = "total" + 1,
+      "completed" = "completed" + excluded."completed";
+    INSERT INTO "api_taskdaystats" ("user_id", "day", "created")
+      VALUES (new."user_id", date(new."created"), 1)
+      ON CONFLICT ("user_id", "day") DO UPDATE SET "created" = "created" + 1;
+'''
+
+SQLITE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_stats_insert"
+    AFTER INSERT ON "api_task" BEGIN {SQLITE_ADD} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_stats_delete"
+    AFTER DELETE ON "api_task" BEGIN {SQLITE_REMOVE} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS "api_task_stats_update"
+    AFTER UPDATE OF "user_id", "completed", "created" ON "api_task"
+    WHEN old."user_id" IS NOT new."user_id"
+      OR old."completed" IS NOT new."completed"
+      OR old."created" IS NOT new."created"
+    BEGIN {SQLITE_REMOVE} {SQLITE_ADD} END
+    ''',
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS "api_task_stats_insert"',
+    'DROP TRIGGER IF EXISTS "api_task_stats_delete"',
+    'DROP TRIGGER IF EXISTS "api_task_stats_update"',
+]
+
+
+def get_rebuild(day):
+    # Counts the existing tasks.
+    return [
+        '''
+        INSERT INTO "api_taskstats" ("user_id", "total", "completed")
+        SELECT "user_id", COUNT(*), SUM(CASE WHEN "completed" THEN 1 ELSE 0 END)
+        FROM "api_task" GROUP BY "user_id"
+        ''',
+        f'''
+        INSERT INTO "api_taskdaystats" ("user_id", "day", "created")
+        SELECT "user_id", {day}, COUNT(*) FROM "api_task"
+        GROUP BY "user_id", {day}
+        ''',
+    ]
+
+
+def install_stats(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FUNCTION)
+        for sql in POSTGRES_TRIGGERS:
+            schema_editor.execute(sql)
+        # The writes of other transactions wait until the tasks are counted.
+        schema_editor.execute('LOCK TABLE "api_task" IN SHARE MODE')
+        statements = get_rebuild('(("created" AT TIME ZONE \'UTC\')::date)')
+    elif vendor == 'sqlite':
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+        statements = get_rebuild('date("created")')
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def uninstall_stats(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_UNINSTALL
+    elif vendor == 'sqlite':
+        statements = SQLITE_UNINSTALL
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_user_password_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskdaystats',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='api_taskdaystats_user_day'),
+        ),
+        migrations.RunPython(install_stats, uninstall_stats),
+    ]
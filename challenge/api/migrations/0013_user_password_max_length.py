@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 01:18
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_task_tombstone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(error_messages={'invalid': 'Contraseña inválida.'}, max_length=256, validators=[django.core.validators.RegexValidator(regex='^(?=.*.)(?=.*\\d).{8,}$')]),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-18 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_user_password_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSearchIndex',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='api.task')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_task_fts',
+                'managed': False,
+            },
+        ),
+    ]
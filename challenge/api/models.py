@@ -1,17 +1,35 @@
 import logging
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser
+from django.db import connections, router, transaction
 from django.db.models import (
     CASCADE,
+    DO_NOTHING,
+    BigIntegerField,
     BooleanField,
     CharField,
+    DateField,
     DateTimeField,
+    F,
+    FloatField,
     ForeignKey,
+    Index,
     Model,
+    OneToOneField,
+    PositiveIntegerField,
+    PositiveSmallIntegerField,
+    Q,
+    QuerySet,
     TextField,
     EmailField,
+    UniqueConstraint,
 )
+from django.db.models.expressions import Combinable
+from django.db.models.sql import UpdateQuery
+from django.core.exceptions import EmptyResultSet
 from django.core.validators import validate_email, RegexValidator
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +60,10 @@ class User(AbstractUser):
         validators=[validate_email],
         error_messages={"unique": "Email en uso.", "invalid": "Email inválido."}
     )
+    # The scrypt hashes are 128 characters with the default parameters and
+    # longer with larger ones (see api.hashers).
     password = CharField(
+        max_length=256,
         validators=[RegexValidator(regex=r"^(?=.*.)(?=.*\d).{8,}$")],
         error_messages={"invalid": "Contraseña inválida."}
     )
@@ -52,7 +73,7 @@ class User(AbstractUser):
         Returns the user's email.
         """
 
-        logger.info(f"UserModel get_email -> User {self.username}")
+        logger.debug("UserModel get_email -> User %s", self.username)
         return self.email
 
     def get_password(self) -> str:
@@ -60,13 +81,121 @@ class User(AbstractUser):
         Returns the user's hashed password
         """
 
-        logger.info(f"UserModel get_password -> User {self.username}")
+        logger.debug("UserModel get_password -> User %s", self.username)
         return self.password
 
     def __str__(self) -> str:
         return f"Username: {self.username}, Email: {self.email}"
 
 
+class TaskQuerySet(QuerySet):
+    """
+    QuerySet for the Task model.
+    """
+
+    def update_returning(self, **kwargs) -> list:
+        """
+        Updates the tasks like update and returns them with their new values.
+        Where the database supports it, it takes a single
+        "UPDATE ... RETURNING" query.
+
+        Args:
+            kwargs: Fields to update and their new values or expressions.
+        """
+
+        connection = connections[self.db]
+        if not (
+            connection.vendor == "postgresql"
+            or connection.vendor == "sqlite"
+            and connection.features.can_return_columns_from_insert
+        ):
+            pks = list(self.values_list("pk", flat=True))
+            self.update(**kwargs)
+            return list(self.model._base_manager.using(self.db).filter(pk__in=pks))
+
+        query = self.query.chain(UpdateQuery)
+        query.add_update_values(kwargs)
+        query.annotations = {}
+        try:
+            sql, params = query.get_compiler(self.db).as_sql()
+        except EmptyResultSet:
+            # The filters can't match any task, like an empty __in or a pk
+            # out of the range of the column, so there is nothing to update.
+            return []
+        fields = self.model._meta.concrete_fields
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} RETURNING {columns}", params)
+            rows = cursor.fetchall()
+
+        converters = [
+            connection.ops.get_db_converters(field.cached_col)
+            + field.get_db_converters(connection)
+            for field in fields
+        ]
+        names = [field.attname for field in fields]
+        return [
+            self.model.from_db(
+                self.db,
+                names,
+                [
+                    self._convert(value, field, field_converters, connection)
+                    for value, field, field_converters in zip(row, fields, converters)
+                ],
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _convert(value, field, converters, connection):
+        for converter in converters:
+            value = converter(value, field.cached_col, connection)
+        return value
+
+    def delete(self) -> tuple:
+        """
+        Deletes the tasks and leaves a tombstone of each one for the changes
+        feed, in the same transaction.
+        """
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            now = timezone.now()
+            TaskTombstone.objects.using(self.db).bulk_create(
+                [
+                    TaskTombstone(pk=pk, user_id=user_id, deleted=now)
+                    for pk, user_id in self.values_list("pk", "user_id")
+                ]
+            )
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def complete(self) -> list:
+        """
+        Marks the tasks as complete with a single query and returns them.
+        """
+
+        return self.update_returning(
+            completed=True, version=F("version") + 1, updated=timezone.now()
+        )
+
+    def incomplete(self) -> list:
+        """
+        Marks the tasks as incomplete with a single query and returns them.
+        """
+
+        return self.update_returning(
+            completed=False, version=F("version") + 1, updated=timezone.now()
+        )
+
+    async def acomplete(self) -> list:
+        return await sync_to_async(self.complete)()
+
+    async def aincomplete(self) -> list:
+        return await sync_to_async(self.incomplete)()
+
+
 class Task(Model):
     """
     Entity/Model for the tasks
@@ -77,17 +206,95 @@ class Task(Model):
         title (str): Title of the task.
         user (django.contrib.auth.models.User): Task owner.
         created (datetime.datetime): Date and time of task creation.
+        updated (datetime.datetime): Date and time of the last change of the task.
+        version (int): Increases on every change of the task, for the ETag.
     """
 
     completed = BooleanField(default=False)
     description = TextField()
     title = CharField(max_length=100)
-    user = ForeignKey(User, on_delete=CASCADE)
+    # The composite indexes below start with the user, so the single column
+    # index of the foreign key would only slow down the writes.
+    user = ForeignKey(User, on_delete=CASCADE, db_index=False)
     created = DateTimeField(auto_now_add=True)
+    updated = DateTimeField(auto_now=True)
+    version = PositiveIntegerField(default=1)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # List of the user's tasks ordered by creation and the keyset
+            # pagination over (created, pk).
+            Index(fields=["user", "created", "id"], name="api_task_user_created_idx"),
+            # Last change of the user's tasks, for the ETag of the list.
+            Index(fields=["user", "updated"], name="api_task_user_updated_idx"),
+            # Filter by completed, optionally with a range of creation dates.
+            Index(
+                fields=["user", "completed", "created", "id"],
+                name="api_task_user_completed_idx",
+            ),
+            # Pending tasks, the most requested filter. Backends without
+            # partial indexes skip it and use the previous one.
+            Index(
+                fields=["user", "created", "id"],
+                condition=Q(completed=False),
+                name="api_task_user_pending_idx",
+            ),
+            # Django filters booleans as "WHERE completed" instead of
+            # "completed = true" and SQLite can only use that condition
+            # through a partial index, so this one is the SQLite fallback of
+            # api_task_user_completed_idx.
+            Index(
+                fields=["user", "created", "id"],
+                condition=Q(completed=True),
+                name="api_task_user_done_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Title: {self.title}. {self.user.__str__()}"
 
+    @property
+    def etag(self) -> str:
+        """
+        Returns the entity tag of the current version of the task.
+        """
+
+        return f'"{self.version}"'
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Increases the version of the task when it is updated.
+        """
+
+        if not self._state.adding:
+            self.version = F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {
+                    *kwargs["update_fields"],
+                    "version",
+                    "updated",
+                }
+        super().save(*args, **kwargs)
+        if isinstance(self.version, Combinable):
+            self.refresh_from_db(fields=["version"])
+
+    def delete(self, using=None, keep_parents=False) -> tuple:
+        """
+        Deletes the task and leaves its tombstone for the changes feed, in
+        the same transaction.
+        """
+
+        using = using or router.db_for_write(Task, instance=self)
+        pk = self.pk
+        with transaction.atomic(using=using, savepoint=False):
+            deleted = super().delete(using, keep_parents)
+            TaskTombstone.objects.using(using).create(
+                pk=pk, user_id=self.user_id, deleted=timezone.now()
+            )
+        return deleted
+
     def complete(self, save: bool = True) -> None:
         """
         Marks the task as complete.
@@ -96,10 +303,11 @@ class Task(Model):
             save (bool): Determines if the task is saved in the database.
         """
 
-        logger.info(f"Task complete -> Task {self.pk} completed.")
+        logger.info("Task complete -> Task %s completed.", self.pk)
         self.completed = True
         if save:
-            self.save()
+            for task in Task.objects.filter(pk=self.pk).complete():
+                self.version = task.version
 
     def incomplete(self, save: bool = True) -> None:
         """
@@ -109,7 +317,162 @@ class Task(Model):
             save (bool): Determines if the task is saved in the database.
         """
 
-        logger.info(f"Task incomplete -> Task {self.pk} incomplete.")
+        logger.info("Task incomplete -> Task %s incomplete.", self.pk)
         self.completed = False
         if save:
-            self.save()
+            for task in Task.objects.filter(pk=self.pk).incomplete():
+                self.version = task.version
+
+
+class TaskSearchIndex(Model):
+    """
+    Entity/Model for the FTS5 table of the SQLite search backend (see
+    api.search). The table is created with raw SQL in the 0006_task_search
+    migration, so the model is unmanaged, and it's only read, joined to the
+    tasks to rank them.
+
+    Attributes:
+        task (api.models.Task): Indexed task, the rowid of the table.
+        rank (float): bm25 relevance of the task in the query that the
+            table is matched with, lower for the best matches.
+    """
+
+    task = OneToOneField(
+        Task,
+        on_delete=DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_index",
+    )
+    rank = FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "api_task_fts"
+
+
+class TaskStats(Model):
+    """
+    Entity/Model for the task counters of each user. Triggers on the tasks
+    table keep it up to date in the transaction of every write (see
+    api.stats), so reading the statistics doesn't count the tasks.
+
+    Attributes:
+        user (api.models.User): Owner of the tasks.
+        total (int): Number of tasks of the user.
+        completed (int): Number of completed tasks of the user.
+    """
+
+    user = OneToOneField(
+        User, on_delete=CASCADE, primary_key=True, related_name="task_stats"
+    )
+    total = PositiveIntegerField(default=0)
+    completed = PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.completed}/{self.total}"
+
+
+class TaskDayStats(Model):
+    """
+    Entity/Model for the number of tasks of each user created on each day
+    (UTC). Days without tasks don't have a row. Maintained like TaskStats.
+
+    Attributes:
+        user (api.models.User): Owner of the tasks.
+        day (datetime.date): Day the tasks were created.
+        created (int): Number of tasks created on the day.
+    """
+
+    user = ForeignKey(User, on_delete=CASCADE, db_index=False)
+    day = DateField()
+    created = PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index of the days of a user, in order.
+            UniqueConstraint(fields=["user", "day"], name="api_taskdaystats_user_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.day} ({self.created})"
+
+
+class TaskTombstone(Model):
+    """
+    Entity/Model for the deleted tasks, so that the changes feed can tell
+    the clients which tasks to remove. They are kept for
+    TASK_TOMBSTONE_RETENTION days, then the compact_tombstones command
+    deletes them.
+
+    Attributes:
+        id (int): Primary key of the deleted task.
+        user (api.models.User): Owner of the task.
+        deleted (datetime.datetime): Date and time the task was deleted.
+    """
+
+    id = BigIntegerField(primary_key=True)
+    user = ForeignKey(User, on_delete=CASCADE, db_index=False)
+    deleted = DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Tombstones of the user after the cursor of the changes feed,
+            # keyed like the tasks on (date, pk).
+            Index(fields=["user", "deleted", "id"], name="api_tombstone_user_idx"),
+            # Tombstones older than the retention window, for the compaction.
+            Index(fields=["deleted"], name="api_tombstone_deleted_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.pk}: {self.deleted}"
+
+
+class OutboxEmail(Model):
+    """
+    Entity/Model for the emails waiting to be sent by the drain_outbox
+    command, so that the requests don't wait for the SMTP server.
+
+    Attributes:
+        subject (str): Subject of the email.
+        body (str): Text of the email.
+        from_email (str): Sender of the email.
+        recipient (str): Address the email is sent to.
+        status (str): Delivery state: pending, sent or failed.
+        attempts (int): Number of failed deliveries.
+        next_attempt (datetime.datetime): Date and time from which the email
+            can be sent.
+        last_error (str): Error of the last failed delivery.
+        created (datetime.datetime): Date and time the email was enqueued.
+        sent (datetime.datetime): Date and time the email was delivered.
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    subject = CharField(max_length=255)
+    body = TextField()
+    from_email = CharField(max_length=254, blank=True)
+    recipient = EmailField()
+    status = CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    attempts = PositiveSmallIntegerField(default=0)
+    next_attempt = DateTimeField(default=timezone.now)
+    last_error = TextField(blank=True)
+    created = DateTimeField(auto_now_add=True)
+    sent = DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Emails ready to be sent, in order.
+            Index(
+                fields=["next_attempt", "id"],
+                condition=Q(status="pending"),
+                name="api_outbox_pending_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Subject: {self.subject}. Recipient: {self.recipient}. ({self.status})"
@@ -0,0 +1,155 @@
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject: str, body: str, recipient: str, from_email: str = None):
+    """
+    Saves an email in the outbox, to be sent by the drain_outbox command.
+
+    Args:
+        subject (str): Subject of the email.
+        body (str): Text of the email.
+        recipient (str): Address the email is sent to.
+        from_email (str): Sender of the email, DEFAULT_FROM_EMAIL if empty.
+    """
+
+    logger.info("Outbox enqueue_email -> Email to %s enqueued.", recipient)
+    return OutboxEmail.objects.create(
+        subject=subject, body=body, recipient=recipient, from_email=from_email or ""
+    )
+
+
+class OutboxDrainer:
+    """
+    Sends the pending emails of the outbox in batches, each one through a
+    single SMTP connection. A failed email is retried later, waiting twice as
+    long after each attempt, until it runs out of attempts.
+
+    Atributes:
+        batch_size (int): Maximum number of emails sent per batch.
+        max_attempts (int): Attempts before an email is marked as failed.
+        retry_delay (int): Seconds before the first retry.
+        max_retry_delay (int): Maximum seconds between retries.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_delay: int = 30,
+        max_retry_delay: int = 3600,
+        connection=None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connection = connection or get_connection()
+
+    def get_retry_delay(self, attempts: int) -> timedelta:
+        return timedelta(
+            seconds=min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+        )
+
+    def drain(self) -> dict:
+        """
+        Sends batches until there are no emails ready to be sent and returns
+        the number of sent and failed deliveries.
+        """
+
+        totals = {"sent": 0, "failed": 0}
+        while True:
+            result = self.send_batch()
+            totals["sent"] += result["sent"]
+            totals["failed"] += result["failed"]
+            if result["sent"] + result["failed"] < self.batch_size:
+                return totals
+
+    def send_batch(self) -> dict:
+        """
+        Sends the next batch of emails ready to be sent.
+        The emails are locked until their state is saved, and other workers
+        skip them instead of waiting.
+        """
+
+        result = {"sent": 0, "failed": 0}
+        with transaction.atomic():
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEmail.PENDING, next_attempt__lte=timezone.now())
+                .order_by("next_attempt", "id")[: self.batch_size]
+            )
+            if not emails:
+                return result
+
+            try:
+                self.connection.open()
+            except Exception as error:
+                # Each email tries to connect again and records the error.
+                logger.warning(
+                    "OutboxDrainer send_batch -> Connection failed: %s", error
+                )
+            try:
+                for email in emails:
+                    if self.send(email):
+                        result["sent"] += 1
+                    else:
+                        result["failed"] += 1
+            finally:
+                self.connection.close()
+
+            OutboxEmail.objects.bulk_update(
+                emails, ["status", "attempts", "next_attempt", "last_error", "sent"]
+            )
+        logger.info(
+            "OutboxDrainer send_batch -> %s sent, %s failed.",
+            result["sent"],
+            result["failed"],
+        )
+        return result
+
+    def send(self, email: OutboxEmail) -> bool:
+        """
+        Sends an email and records its new delivery state, without saving it.
+        """
+
+        message = EmailMessage(
+            email.subject,
+            email.body,
+            email.from_email or None,
+            [email.recipient],
+            connection=self.connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            email.attempts += 1
+            email.last_error = f"{type(error).__name__}: {error}"
+            if email.attempts >= self.max_attempts:
+                email.status = OutboxEmail.FAILED
+            else:
+                email.next_attempt = timezone.now() + self.get_retry_delay(
+                    email.attempts
+                )
+            logger.warning(
+                "OutboxDrainer send -> Email %s to %s failed: %s",
+                email.pk,
+                email.recipient,
+                email.last_error,
+            )
+            # The connection may be broken, the next email opens a new one.
+            self.connection.close()
+            return False
+
+        email.status = OutboxEmail.SENT
+        email.sent = timezone.now()
+        email.last_error = ""
+        return True
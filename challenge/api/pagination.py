@@ -0,0 +1,285 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset pagination for the tasks, keyed on (created, pk).
+    Each page is fetched with a "WHERE (created, pk) > (last_created, last_pk)"
+    condition instead of an OFFSET, so the cost of a page does not depend on
+    how deep the client has scrolled.
+    It is only applied when the client sends a cursor or a page size, so the
+    plain list response stays available for the existing clients.
+
+    Atributes:
+        cursor_query_param (str): Query parameter that holds the cursor.
+        page_size_query_param (str): Query parameter that holds the page size.
+        page_size (int): Default page size.
+        max_page_size (int): Maximum page size that a client can request.
+        ordering_field (str): Field used as the first key of the cursor.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 1000
+    ordering_field = "created"
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the page of the queryset that follows the cursor position, or
+        None if the client did not ask for pagination.
+        """
+
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.get_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Asynchronous version of paginate_queryset.
+        """
+
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.get_page([task async for task in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Returns the queryset of the page, with an extra row that tells whether
+        there is a next page, or None if the client did not ask for
+        pagination.
+        """
+
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.reverse = self.is_reverse(request, queryset, view)
+        position = self.decode_cursor(request)
+
+        if self.reverse:
+            queryset = queryset.order_by(f"-{self.ordering_field}", "-pk")
+        else:
+            queryset = queryset.order_by(self.ordering_field, "pk")
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(*position))
+        return queryset[: self.page_size + 1]
+
+    def get_page(self, results: list) -> list:
+        """
+        Returns the page from the rows of get_page_queryset.
+        """
+
+        self.has_next = len(results) > self.page_size
+        results = results[: self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor returned in the 'next' link of the previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def is_requested(self, request) -> bool:
+        """
+        Determines if the client asked for a paginated response.
+        """
+
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def is_reverse(self, request, queryset, view) -> bool:
+        """
+        Determines the direction of the pages from the ordering requested to
+        the OrderingFilter of the view, if any.
+        """
+
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0] == f"-{self.ordering_field}"
+        return False
+
+    def get_position(self, task) -> tuple:
+        """
+        Returns the (created, pk) key of a task, or of a row of values().
+        """
+
+        if isinstance(task, dict):
+            return task[self.ordering_field], task["pk"]
+        return getattr(task, self.ordering_field), task.pk
+
+    def get_position_filter(self, value, pk) -> Q:
+        """
+        Returns the condition that selects the rows after the position.
+        """
+
+        lookup = "lt" if self.reverse else "gt"
+        # The redundant lte/gte bound is what lets the database seek the index
+        # to the position instead of scanning it from the first row.
+        return Q(**{f"{self.ordering_field}__{lookup}e": value}) & (
+            Q(**{f"{self.ordering_field}__{lookup}": value})
+            | Q(**{f"pk__{lookup}": pk})
+        )
+
+    def decode_cursor(self, request) -> tuple | None:
+        """
+        Returns the position encoded in the cursor of the request.
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def encode_cursor(self, position: tuple) -> str:
+        value, pk = position
+        data = json.dumps([value.isoformat(), pk], separators=(",", ":"))
+        return urlsafe_b64encode(data.encode("ascii")).decode("ascii")
+
+    def get_next_link(self) -> str | None:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+
+class TaskChangesPagination(TaskCursorPagination):
+    """
+    Keyset pagination of the changes feed, keyed on (updated, pk) over the
+    tasks and the tombstones of the deleted ones, which keep the pk of the
+    task. Every page returns a cursor, also the last one, which is where
+    the next sync of the client starts.
+
+    Atributes:
+        cursor_query_param (str): Query parameter that holds the cursor.
+        ordering_field (str): Date of the last change of a task or of its
+            deletion.
+    """
+
+    cursor_query_param = "since"
+    ordering_field = "updated"
+    page_size = 500
+
+    def is_requested(self, request) -> bool:
+        return True
+
+    def decode_cursor(self, request) -> tuple | None:
+        position = super().decode_cursor(request)
+        if position is not None and timezone.is_naive(position[0]):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def is_reverse(self, request, queryset, view) -> bool:
+        return False
+
+    def paginate_changes(self, tasks, tombstones, request, view=None) -> list:
+        """
+        Returns the changes that follow the cursor position, ordered by
+        (updated, pk): rows of values() of the tasks and the tombstones.
+        Each queryset is read up to the page size, so a page takes two
+        index range scans.
+        """
+
+        tasks = self.get_page_queryset(tasks, request, view)
+        tombstones = self.get_page_queryset(tombstones, request, view)
+        page = self.get_page(sorted([*tasks, *tombstones], key=self.get_position))
+        if page:
+            self.next_position = self.get_position(page[-1])
+        else:
+            self.next_position = self.decode_cursor(request)
+        return page
+
+    def get_paginated_response(self, data):
+        position = self.next_position
+        return Response(
+            {
+                "cursor": self.encode_cursor(position) if position else None,
+                "has_more": self.has_next,
+                **data,
+            }
+        )
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters[0]["description"] = (
+            "Cursor returned by the previous sync. All the changes by default."
+        )
+        return parameters
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["cursor", "has_more", "results", "deleted"],
+            "properties": {
+                "cursor": {"type": "string", "nullable": True},
+                "has_more": {"type": "boolean"},
+                "results": schema,
+                "deleted": {"type": "array", "items": {"type": "integer"}},
+            },
+        }
@@ -0,0 +1,119 @@
+import codecs
+import csv
+import json
+from io import BytesIO
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import (
+    CSVRenderer,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    NDJSONRenderer,
+    orjson,
+)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser that decodes with orjson, with the same result as JSONParser.
+    The bodies in other encodings than UTF-8 and the ones orjson rejects,
+    like the ones with integers of more than 64 bits, are parsed again by
+    JSONParser, which also gives the error messages.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().parse(BytesIO(content), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parser of MessagePack bodies. The timestamps are decoded as dates.
+    """
+
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), timestamp=3)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser of newline delimited JSON for the streamed imports. The body
+    isn't read at once: the data is an iterator of (line, object) pairs,
+    read as it's consumed. The lines that aren't valid JSON give a
+    ParseError instead of the object, so the other lines can still be
+    used. The blank lines are skipped.
+    """
+
+    media_type = "application/x-ndjson"
+    renderer_class = NDJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        return self.iter_objects(stream, encoding)
+
+    @staticmethod
+    def iter_objects(stream, encoding: str):
+        utf8 = codecs.lookup(encoding).name == "utf-8"
+        loads = orjson.loads if orjson is not None and utf8 else json.loads
+        for line, content in enumerate(stream, 1):
+            if line == 1 and utf8:
+                content = content.removeprefix(codecs.BOM_UTF8)
+            if not content.strip():
+                continue
+            try:
+                yield line, loads(content if utf8 else content.decode(encoding))
+            except (ValueError, UnicodeDecodeError) as exc:
+                yield line, ParseError(f"JSON parse error - {exc}")
+
+
+class CSVParser(BaseParser):
+    """
+    Parser of CSV with a header row for the streamed imports. Like
+    NDJSONParser, the data is an iterator of (line, row) pairs, where the
+    line is the one the row starts on and the row is a dictionary by the
+    names of the header. A missing header, or an error that leaves the
+    rest of the file unreadable, like a bad encoding, is a ParseError when
+    it's found.
+    """
+
+    media_type = "text/csv"
+    renderer_class = CSVRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if codecs.lookup(encoding).name == "utf-8":
+            # The byte order mark written by spreadsheets isn't data.
+            encoding = "utf-8-sig"
+        return self.iter_rows(codecs.iterdecode(stream, encoding))
+
+    @staticmethod
+    def iter_rows(lines):
+        reader = csv.reader(lines)
+        try:
+            header = next(reader, None)
+            if not header:
+                raise ParseError("CSV parse error - Missing header row.")
+            line = reader.line_num + 1
+            for row in reader:
+                if row:
+                    yield line, dict(zip(header, row))
+                line = reader.line_num + 1
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError(f"CSV parse error - {exc}")
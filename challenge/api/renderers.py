@@ -0,0 +1,149 @@
+import csv
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that encodes with orjson, several times faster than the
+    json module, with the same bytes as JSONRenderer. The types orjson would
+    encode differently, like the dates, go through the encoder of DRF.
+    Indented or non compact output, the ASCII-only encoding and the data
+    that orjson can't encode, like integers of more than 64 bits, fall back
+    to JSONRenderer.
+    """
+
+    if orjson is not None:
+        options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, the output is kept a strict javascript subset.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer of the MessagePack binary format, smaller and faster to encode
+    and decode than JSON. The data is the same as in the JSON responses: the
+    types MessagePack doesn't have, like the dates or the decimals, are
+    converted by the encoder of DRF.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    encoder_class = JSONRenderer.encoder_class
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self.encoder_class().default)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer of newline delimited JSON, one object per line, for the
+    streamed exports. The responses that aren't streamed, like the errors,
+    are a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    json_renderer = FastJSONRenderer()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return self.json_renderer.render(data) + b"\n"
+
+    def stream(self, chunks, fields: list):
+        """
+        Yields the lines of the chunks of objects, one chunk at a time.
+
+        Args:
+            chunks (iterable): Lists of objects.
+            fields (list): Keys of the objects, in order.
+        """
+
+        render = self.json_renderer.render
+        for chunk in chunks:
+            yield b"".join(render(data) + b"\n" for data in chunk)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer of CSV with a header row, for the streamed exports. The
+    responses that aren't streamed, like the errors, have a row for each
+    key of the data.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    class Echo:
+        """
+        File-like object that returns what is written to it, so that the
+        csv writer gives back each line.
+        """
+
+        def write(self, value: str) -> str:
+            return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        writer = csv.writer(self.Echo())
+        if not isinstance(data, dict):
+            data = {"detail": data}
+        return "".join(
+            writer.writerow(
+                [key, " ".join(map(str, value)) if isinstance(value, list) else value]
+            )
+            for key, value in data.items()
+        ).encode(self.charset)
+
+    def stream(self, chunks, fields: list):
+        """
+        Yields the header and the rows of the chunks of objects, one chunk at
+        a time.
+
+        Args:
+            chunks (iterable): Lists of objects.
+            fields (list): Keys of the objects, in the order of the columns.
+        """
+
+        writer = csv.writer(self.Echo())
+        yield writer.writerow(fields).encode(self.charset)
+        for chunk in chunks:
+            yield "".join(
+                writer.writerow([data[field] for field in fields]) for data in chunk
+            ).encode(self.charset)
@@ -0,0 +1,307 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import BooleanField, F, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+TASK_TABLE = "api_task"
+
+
+class BaseSearchBackend:
+    """
+    Full-text search over the title and the description of the tasks.
+    The title weighs more than the description in the relevance ranking.
+
+    Atributes:
+        vendor (str): Database vendor supported by the backend.
+    """
+
+    vendor = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """
+        Determines if the backend can run on the current database.
+        """
+
+        return connection.vendor == cls.vendor
+
+    def search(self, queryset, terms: list[str]):
+        """
+        Filters the queryset by the tasks that match every term, as prefixes.
+        """
+
+        raise NotImplementedError
+
+    def rank(self, queryset, terms: list[str]):
+        """
+        Filters the queryset like search, annotates the relevance of each
+        task as search_rank and orders by it, best matches first.
+        """
+
+        raise NotImplementedError
+
+    @staticmethod
+    def install(schema_editor) -> None:
+        """
+        Creates the database objects that keep the search index up to date.
+        """
+
+    @staticmethod
+    def uninstall(schema_editor) -> None:
+        """
+        Drops the database objects created by install.
+        """
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Context manager for loading many tasks at once, which can defer the
+        updates of the index until the end of the block.
+        """
+
+        yield
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Search backend over a weighted tsvector column with a GIN index.
+    The column is generated by PostgreSQL, so every write (including
+    bulk_create, bulk_update and update) keeps it up to date.
+    """
+
+    vendor = "postgresql"
+
+    def get_query(self, terms: list[str]) -> str:
+        # Every term is a quoted lexeme so that the input can't inject
+        # tsquery operators.
+        return " & ".join(
+            "'%s':*" % term.replace("\\", "\\\\").replace("'", "''") for term in terms
+        )
+
+    def search(self, queryset, terms: list[str]):
+        return queryset.filter(
+            RawSQL(
+                f'"{TASK_TABLE}"."search_vector" @@ to_tsquery(\'simple\', %s)',
+                [self.get_query(terms)],
+                output_field=BooleanField(),
+            )
+        )
+
+    def rank(self, queryset, terms: list[str]):
+        return (
+            self.search(queryset, terms)
+            .annotate(
+                search_rank=RawSQL(
+                    f'ts_rank("{TASK_TABLE}"."search_vector", '
+                    "to_tsquery('simple', %s))",
+                    [self.get_query(terms)],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "pk")
+        )
+
+    @staticmethod
+    def install(schema_editor) -> None:
+        schema_editor.execute(
+            f'ALTER TABLE "{TASK_TABLE}" ADD COLUMN "search_vector" tsvector '
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(\"title\", '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(\"description\", '')), 'B')"
+            ") STORED"
+        )
+        schema_editor.execute(
+            f'CREATE INDEX "api_task_search_idx" ON "{TASK_TABLE}" '
+            'USING GIN ("search_vector")'
+        )
+
+    @staticmethod
+    def uninstall(schema_editor) -> None:
+        schema_editor.execute(
+            f'ALTER TABLE "{TASK_TABLE}" DROP COLUMN IF EXISTS "search_vector"'
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Search backend over an FTS5 table that indexes the tasks table as
+    external content. Triggers on the tasks table keep it up to date.
+    """
+
+    vendor = "sqlite"
+    fts_table = "api_task_fts"
+    _available = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        # SQLite builds without FTS5 skip the table in the migration.
+        if cls._available is None and super().is_available():
+            cls._available = cls.fts_table in connection.introspection.table_names()
+        return bool(cls._available)
+
+    def get_query(self, terms: list[str]) -> str:
+        # Every term is a quoted string so that the input can't inject FTS5
+        # operators.
+        return " ".join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def search(self, queryset, terms: list[str]):
+        # The subquery runs once, whatever index the planner uses to read the
+        # tasks of the user.
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT "rowid" FROM "{self.fts_table}" '
+                f'WHERE "{self.fts_table}" MATCH %s',
+                [self.get_query(terms)],
+            )
+        )
+
+    def rank(self, queryset, terms: list[str]):
+        # Joining the FTS table (TaskSearchIndex) lets SQLite read the
+        # matches, with their rank, straight from the full-text index. The
+        # rank is bm25 with the weights set in install, lower for the best
+        # matches.
+        return (
+            queryset.filter(search_index__isnull=False)
+            .filter(
+                RawSQL(
+                    f'"{self.fts_table}" MATCH %s',
+                    [self.get_query(terms)],
+                    output_field=BooleanField(),
+                )
+            )
+            .annotate(search_rank=-F("search_index__rank"))
+            .order_by("-search_rank", "pk")
+        )
+
+    @classmethod
+    def install(cls, schema_editor) -> None:
+        created = (
+            cls.fts_table not in schema_editor.connection.introspection.table_names()
+        )
+        if created:
+            try:
+                schema_editor.execute(
+                    f'CREATE VIRTUAL TABLE "{cls.fts_table}" USING fts5('
+                    f"title, description, content='{TASK_TABLE}', "
+                    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', "
+                    "prefix='2 3')"
+                )
+            except OperationalError:
+                # SQLite was built without FTS5, the icontains search is used.
+                return
+        cls.install_triggers(schema_editor)
+        if created:
+            schema_editor.execute(
+                f'INSERT INTO "{cls.fts_table}"("{cls.fts_table}", "rank") '
+                "VALUES('rank', 'bm25(2.0, 1.0)')"
+            )
+            schema_editor.execute(
+                f'INSERT INTO "{cls.fts_table}"("{cls.fts_table}") VALUES(\'rebuild\')'
+            )
+
+    @classmethod
+    def install_triggers(cls, schema_editor) -> None:
+        """
+        Creates the triggers that sync the FTS table. SQLite drops them when
+        a migration rebuilds the tasks table, so the migrations that alter it
+        must create them again.
+        """
+
+        if cls.fts_table not in schema_editor.connection.introspection.table_names():
+            return
+        for name, body in cls.get_triggers().items():
+            schema_editor.execute(f'CREATE TRIGGER IF NOT EXISTS "{name}" {body}')
+
+    @classmethod
+    def get_triggers(cls) -> dict:
+        insert = (
+            f'INSERT INTO "{cls.fts_table}"("rowid", "title", "description") '
+            'VALUES (new."id", new."title", new."description");'
+        )
+        delete = (
+            f'INSERT INTO "{cls.fts_table}"("{cls.fts_table}", "rowid", "title", '
+            '"description") VALUES (\'delete\', old."id", old."title", '
+            'old."description");'
+        )
+        return {
+            "api_task_fts_insert": f'AFTER INSERT ON "{TASK_TABLE}" BEGIN {insert} END',
+            "api_task_fts_delete": f'AFTER DELETE ON "{TASK_TABLE}" BEGIN {delete} END',
+            "api_task_fts_update": (
+                f'AFTER UPDATE OF "title", "description" ON "{TASK_TABLE}" '
+                f"BEGIN {delete} {insert} END"
+            ),
+        }
+
+    @contextmanager
+    def bulk_load(self):
+        # Indexing the new tasks one by one in the trigger takes longer than
+        # rebuilding the whole index once.
+        name = "api_task_fts_insert"
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TRIGGER IF NOT EXISTS "{name}" {self.get_triggers()[name]}'
+                )
+                cursor.execute(
+                    f'INSERT INTO "{self.fts_table}"("{self.fts_table}") '
+                    "VALUES('rebuild')"
+                )
+
+    @classmethod
+    def uninstall(cls, schema_editor) -> None:
+        for name in [
+            "api_task_fts_insert",
+            "api_task_fts_delete",
+            "api_task_fts_update",
+        ]:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{cls.fts_table}"')
+        cls._available = None
+
+
+SEARCH_BACKENDS = [PostgresSearchBackend, SQLiteSearchBackend]
+
+
+def get_search_backend() -> BaseSearchBackend | None:
+    """
+    Returns the search backend set in TASK_SEARCH_BACKEND or, by default, the
+    one of the current database. None means the icontains search of DRF.
+    """
+
+    path = getattr(settings, "TASK_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    for backend in SEARCH_BACKENDS:
+        if backend.is_available():
+            return backend()
+    return None
+
+
+class TaskSearchFilter(SearchFilter):
+    """
+    Search filter that keeps the "search" query parameter of DRF's
+    SearchFilter but runs it through the full-text search backend of the
+    database. The results are ordered by relevance unless the client asks for
+    an ordering or for a page, which is keyed on the creation date.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        backend = get_search_backend() if terms else None
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        paginator = getattr(view, "paginator", None)
+        if OrderingFilter.ordering_param in request.query_params or (
+            paginator is not None and paginator.is_requested(request)
+        ):
+            return backend.search(queryset, terms)
+        return backend.rank(queryset, terms)
@@ -0,0 +1,204 @@
+import io
+import random
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task, User
+from .search import BaseSearchBackend, get_search_backend
+from .stats import get_stats_backend
+
+WORDS = (
+    "comprar leche pan informe reunión llamar cliente enviar factura revisar "
+    "código desplegar servidor pagar alquiler turno médico gimnasio estudiar "
+    "examen preparar presentación limpiar cocina regar plantas reservar vuelo "
+    "hotel renovar pasaporte actualizar documentación corregir error escribir "
+    "tests planificar sprint responder correo organizar escritorio"
+).split()
+
+DISTRIBUTIONS = ["constant", "uniform", "skewed"]
+
+
+class Seeder:
+    """
+    Generates users and tasks for benchmarks and capacity planning.
+    The rows are generated and inserted in batches, so the memory doesn't
+    grow with the number of rows. The users share a password hashed once,
+    and the tasks are loaded with COPY on PostgreSQL and with a batched
+    INSERT (executemany) on the other databases. The tasks aren't created with
+    bulk_create because it would replace their creation dates with the
+    current time.
+
+    Atributes:
+        prefix (str): Prefix of the usernames, followed by a number.
+        password (str): Password of every user.
+        distribution (str): How the tasks are spread among the users.
+            "constant" gives each user the same number of tasks, "uniform"
+            gives each task to a random user and "skewed" gives most of
+            the tasks to a few users.
+        skew (float): Exponent of the skewed distribution, the higher the
+            fewer users have most of the tasks.
+        completed (float): Fraction of completed tasks.
+        days (float): Days before now along which the tasks were created.
+        description_words (tuple): Minimum and maximum number of words of
+            the descriptions.
+        batch_size (int): Rows generated and inserted at once.
+        seed (int): Seed of the random generator, for reproducible data.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "seed",
+        password: str = "seed1234",
+        distribution: str = "skewed",
+        skew: float = 3,
+        completed: float = 0.3,
+        days: float = 365,
+        description_words: tuple = (3, 12),
+        batch_size: int = 10000,
+        seed: int = None,
+    ) -> None:
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {distribution}")
+        self.prefix = prefix
+        self.password = password
+        self.distribution = distribution
+        self.skew = skew
+        self.completed = completed
+        self.days = days
+        self.description_words = description_words
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+
+    def seed(self, users: int, tasks: int) -> list[int]:
+        """
+        Creates the users and their tasks and returns the primary keys of
+        the users.
+        """
+
+        user_pks = self.create_users(users)
+        if tasks:
+            backend = get_search_backend() or BaseSearchBackend()
+            stats = get_stats_backend()
+            with backend.bulk_load(), stats.bulk_load() if stats else nullcontext():
+                self.create_tasks(user_pks, tasks)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return user_pks
+
+    def create_users(self, count: int) -> list[int]:
+        password = make_password(self.password)
+        pks = []
+        for start in range(0, count, self.batch_size):
+            usernames = [
+                f"{self.prefix}{i}"
+                for i in range(start, min(start + self.batch_size, count))
+            ]
+            users = User.objects.bulk_create(
+                User(username=name, email=f"{name}@example.com", password=password)
+                for name in usernames
+            )
+            if users and users[0].pk is None:
+                # The database doesn't return the primary keys of bulk_create.
+                users = User.objects.filter(username__in=usernames).only("pk")
+            pks.extend(user.pk for user in users)
+        return pks
+
+    def get_owner(self, user_pks: list[int], index: int) -> int:
+        if self.distribution == "constant":
+            return user_pks[index % len(user_pks)]
+        if self.distribution == "uniform":
+            return self.random.choice(user_pks)
+        return user_pks[int(len(user_pks) * self.random.random() ** self.skew)]
+
+    def generate_tasks(self, user_pks: list[int], start: int, count: int):
+        """
+        Yields the rows of count tasks, in the order of the columns of
+        create_tasks.
+        """
+
+        now = timezone.now()
+        seconds = self.days * 24 * 3600
+        words = self.description_words
+        for index in range(start, start + count):
+            created = now - timedelta(seconds=self.random.random() * seconds)
+            yield (
+                self.random.random() < self.completed,
+                " ".join(self.random.choices(WORDS, k=self.random.randint(*words))),
+                " ".join(self.random.choices(WORDS, k=self.random.randint(1, 4))),
+                self.get_owner(user_pks, index),
+                created,
+                created,
+                1,
+            )
+
+    def create_tasks(self, user_pks: list[int], count: int) -> None:
+        if not user_pks:
+            raise ValueError("There are no users to own the tasks.")
+        fields = ["completed", "description", "title", "user", "created"]
+        fields += ["updated", "version"]
+        table = connection.ops.quote_name(Task._meta.db_table)
+        columns = ", ".join(
+            connection.ops.quote_name(Task._meta.get_field(field).column)
+            for field in fields
+        )
+        for start in range(0, count, self.batch_size):
+            rows = self.generate_tasks(
+                user_pks, start, min(self.batch_size, count - start)
+            )
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    self.copy(f"COPY {table} ({columns}) FROM STDIN", rows)
+                else:
+                    self.insert(table, columns, len(fields), rows)
+
+    @staticmethod
+    def insert(table: str, columns: str, size: int, rows) -> None:
+        adapt = connection.ops.adapt_datetimefield_value
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * size)})",
+                [
+                    tuple(
+                        adapt(value) if isinstance(value, datetime) else value
+                        for value in row
+                    )
+                    for row in rows
+                ],
+            )
+
+    @staticmethod
+    def copy(sql: str, rows) -> None:
+        data = io.StringIO()
+        for row in rows:
+            data.write("\t".join(copy_value(value) for value in row) + "\n")
+        data.seek(0)
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, "copy"):
+                # psycopg 3.
+                with raw.copy(sql) as copy:
+                    copy.write(data.getvalue())
+            else:
+                raw.copy_expert(sql, data)
+
+
+def copy_value(value) -> str:
+    """
+    Returns a value in the text format of COPY.
+    """
+
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
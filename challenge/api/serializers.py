@@ -1,9 +1,25 @@
 import logging
+from datetime import datetime
 
 from django.contrib.auth.hashers import make_password
-from rest_framework.serializers import ModelSerializer
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.serializers import (
+    BooleanField,
+    CharField,
+    DateField,
+    DateTimeField,
+    IntegerField,
+    ListField,
+    ListSerializer,
+    ModelSerializer,
+    Serializer,
+)
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from .metrics import TimedSerializerMixin, timer
 from .models import Task, User
 
 logger = logging.getLogger(__name__)
@@ -25,9 +41,7 @@ class UserSerializer(ModelSerializer):
             validated_data (dict): Dictionary with the validated data.
         """
 
-        logger.info(
-            f'UserSerializer create -> User {validated_data["username"]}.'
-        )
+        logger.info("UserSerializer create -> User %s.", validated_data["username"])
         validated_data["password"] = make_password(validated_data["password"])
         return super().create(validated_data)
     
@@ -40,9 +54,7 @@ class UserSerializer(ModelSerializer):
             validated_data (dict): Dictionary with the validated data.
         """
 
-        logger.info(
-            f'UserSerializer update -> User {validated_data["email"]}.'
-        )
+        logger.info("UserSerializer update -> User %s.", validated_data["email"])
         validated_data["password"] = make_password(validated_data["password"])
         return super().update(instance, validated_data)
 
@@ -51,7 +63,236 @@ class UserSerializer(ModelSerializer):
         fields = ["pk", "password", "username", "email"]
 
 
-class TaskSerializer(ModelSerializer):
+class TaskListSerializer(TimedSerializerMixin, ListSerializer):
+    """
+    Serializer for lists of tasks. Creates and updates all the tasks of the
+    list with a single query.
+    """
+
+    def create(self, validated_data: list) -> list[Task]:
+        """
+        Creates the tasks with bulk_create.
+
+        Args:
+            validated_data (list): List of dictionaries with the validated data.
+        """
+
+        logger.info("TaskListSerializer create -> %s tasks.", len(validated_data))
+        return Task.objects.bulk_create(
+            [Task(**attrs) for attrs in validated_data]
+        )
+
+    def update(self, instance: list, validated_data: list) -> list[Task]:
+        """
+        Updates the tasks with bulk_update.
+
+        Args:
+            instance (list): Tasks to update, in the same order as the data.
+            validated_data (list): List of dictionaries with the validated data.
+        """
+
+        logger.info("TaskListSerializer update -> %s tasks.", len(validated_data))
+        now = timezone.now()
+        fields = set()
+        for task, attrs in zip(instance, validated_data):
+            for field, value in attrs.items():
+                setattr(task, field, value)
+                fields.add(field)
+            # The tasks are locked by the caller, so the version can't change.
+            task.version += 1
+            task.updated = now
+        if fields:
+            Task.objects.bulk_update(instance, sorted(fields | {"version", "updated"}))
+        return instance
+
+
+class TaskImportListSerializer(TaskListSerializer):
+    """
+    Serializer for a chunk of the tasks of an import. The invalid tasks
+    don't fail the chunk: they are left out of the validated data, which
+    the valid ones are created from, and their errors are kept by position.
+
+    Atributes:
+        row_errors (dict): Errors of the invalid tasks, by their position.
+    """
+
+    def to_internal_value(self, data: list) -> list[dict]:
+        self.row_errors = {}
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                if isinstance(item, ParseError):
+                    raise ValidationError(
+                        {api_settings.NON_FIELD_ERRORS_KEY: [item.detail]}
+                    )
+                validated.append(self.child.run_validation(item))
+            except ValidationError as exc:
+                self.row_errors[index] = exc.detail
+        return validated
+
+
+class ValuesSerializerMixin:
+    """
+    ModelSerializer mixin that also serializes the rows of values() of the
+    model fields in Meta.fields, with the same output as to_representation
+    but without building the model instances. Only the fields whose
+    representation differs from the value of the database, like the dates,
+    go through their to_representation.
+    """
+
+    @classmethod
+    def get_value_fields(cls) -> list[tuple]:
+        fields = cls.__dict__.get("_value_fields")
+        if fields is None:
+            fields = [
+                (name, field)
+                for name, field in cls().fields.items()
+                if not field.write_only
+                and not isinstance(field, (BooleanField, CharField, IntegerField))
+            ]
+            cls._value_fields = fields
+        return fields
+
+    @staticmethod
+    def get_value_converter(field):
+        """
+        Returns the function that gives the representation of the values of
+        a field. DateTimeField looks up the current timezone for every
+        value, so the dates in ISO 8601 are converted to the timezone looked
+        up once, with the same result.
+        """
+
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if (
+            not isinstance(field, DateTimeField)
+            or not isinstance(output_format, str)
+            or output_format.lower() != ISO_8601
+        ):
+            return field.to_representation
+        field_timezone = (
+            field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        )
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if not isinstance(value, datetime) or value.utcoffset() is None:
+                return field.to_representation(value)
+            try:
+                value = value.astimezone(field_timezone).isoformat()
+            except OverflowError:
+                return field.to_representation(value)
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+    @classmethod
+    def serialize_values(cls, rows, fields: list = None) -> list[dict]:
+        """
+        Returns the representation of the rows of values().
+
+        Args:
+            rows (list): Dictionaries with (at least) the fields to serialize.
+            fields (list): Fields to serialize, all the fields in Meta.fields
+                by default.
+        """
+
+        with timer("serialize"):
+            names = cls.Meta.fields if fields is None else fields
+            converters = [
+                (name, cls.get_value_converter(field))
+                for name, field in cls.get_value_fields()
+                if name in names
+            ]
+            results = []
+            for row in rows:
+                data = {name: row[name] for name in names}
+                for name, convert in converters:
+                    if data[name] is not None:
+                        data[name] = convert(data[name])
+                results.append(data)
+            return results
+
+
+class SparseFieldsSerializerMixin:
+    """
+    ModelSerializer mixin that limits the representation to some of the
+    fields in Meta.fields, chosen by the client with the fields and exclude
+    query parameters (comma separated).
+
+    Atributes:
+        fields_query_param (str): Query parameter with the fields to include.
+        exclude_query_param (str): Query parameter with the fields to leave
+            out.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def __init__(self, *args, fields: list = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_sparse_fields(cls, query_params) -> list | None:
+        """
+        Returns the fields requested with the query parameters, in the order
+        of Meta.fields, or None if the client didn't choose them.
+        Fails with the names that aren't fields of the serializer.
+        """
+
+        def get_names(param: str) -> list[str] | None:
+            if param not in query_params:
+                return None
+            return [
+                name.strip()
+                for value in query_params.getlist(param)
+                for name in value.split(",")
+                if name.strip()
+            ]
+
+        included = get_names(cls.fields_query_param)
+        excluded = get_names(cls.exclude_query_param)
+        if included is None and excluded is None:
+            return None
+
+        known = cls.Meta.fields
+        errors = {}
+        for param, names in [
+            (cls.fields_query_param, included),
+            (cls.exclude_query_param, excluded),
+        ]:
+            unknown = [name for name in names or [] if name not in known]
+            if unknown:
+                errors[param] = [
+                    f"Campos desconocidos: {', '.join(unknown)}. "
+                    f"Los campos válidos son: {', '.join(known)}."
+                ]
+        if errors:
+            raise ValidationError(errors)
+
+        fields = [
+            name
+            for name in known
+            if (not included or name in included) and name not in (excluded or [])
+        ]
+        if not fields:
+            raise ValidationError(
+                {cls.exclude_query_param: ["Debe quedar al menos un campo."]}
+            )
+        return fields
+
+
+class TaskSerializer(
+    SparseFieldsSerializerMixin,
+    ValuesSerializerMixin,
+    TimedSerializerMixin,
+    ModelSerializer,
+):
     """
     Serializer for the Task model. Serializes all fields except the user.
 
@@ -64,6 +305,60 @@ class TaskSerializer(ModelSerializer):
     class Meta:
         model = Task
         fields = ["pk", "completed", "description", "title", "created"]
+        list_serializer_class = TaskListSerializer
+
+
+class TaskBulkSerializer(Serializer):
+    """
+    Serializer for the primary keys of the tasks of a bulk action.
+
+    Attributes:
+        pks (list): Primary keys of the tasks.
+    """
+
+    pks = ListField(child=IntegerField(), allow_empty=False)
+
+    def __init__(self, *args, max_length: int = None, **kwargs) -> None:
+        """
+        Args:
+            max_length (int): Maximum number of primary keys.
+        """
+
+        super().__init__(*args, **kwargs)
+        if max_length is not None:
+            self.fields["pks"] = ListField(
+                child=IntegerField(), allow_empty=False, max_length=max_length
+            )
+
+
+class TaskDayStatsSerializer(Serializer):
+    """
+    Serializer for the number of tasks created on a day.
+
+    Attributes:
+        day (datetime.date): Day (UTC) the tasks were created.
+        created (int): Number of tasks created on the day.
+    """
+
+    day = DateField()
+    created = IntegerField()
+
+
+class TaskStatsSerializer(Serializer):
+    """
+    Serializer for the task statistics of a user.
+
+    Attributes:
+        total (int): Number of tasks.
+        completed (int): Number of completed tasks.
+        pending (int): Number of tasks not completed.
+        created_per_day (list): Tasks created on each day with tasks, in order.
+    """
+
+    total = IntegerField()
+    completed = IntegerField()
+    pending = IntegerField()
+    created_per_day = TaskDayStatsSerializer(many=True)
 
 
 class TokenSerializer(TokenObtainPairSerializer):
@@ -74,16 +369,18 @@ class TokenSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         """
-        Adds pk, username and email fields of the current user to the super
-        get_token method.
+        Adds pk, username, email, is_staff and is_superuser fields of the
+        current user to the super get_token method.
 
         Args:
             user (api.models.User): User to get the token for.
         """
 
-        logger.info(f"TokenSerializer get_token -> Token for user {user.username}.")
+        logger.info("TokenSerializer get_token -> Token for user %s.", user.username)
         token = super().get_token(user)
         token["pk"] = user.pk
         token["username"] = user.get_username()
         token["email"] = user.get_email()
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
         return token
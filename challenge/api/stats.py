@@ -0,0 +1,342 @@
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Task, TaskDayStats, TaskStats
+from .search import TASK_TABLE
+
+STATS_TABLE = TaskStats._meta.db_table
+
+DAY_STATS_TABLE = TaskDayStats._meta.db_table
+
+
+class BaseStatsBackend:
+    """
+    Triggers on the tasks table that keep TaskStats and TaskDayStats up to
+    date in the transaction of every write, whether it comes from save,
+    update, bulk_create, delete or a raw query. A change of the user, the
+    completion or the creation date of a task takes it out of the counters
+    of its old values and adds it to the ones of the new values.
+    The triggers only decrease the counters of existing rows, so deleting a
+    user, which deletes its counters and its tasks in any order, doesn't
+    leave counters behind.
+
+    Atributes:
+        vendor (str): Database vendor supported by the backend.
+        triggers (list): Names of the triggers.
+        day_expression (str): SQL of the day (UTC) of a creation date, for
+            a column reference.
+    """
+
+    vendor = None
+    day_expression = None
+    triggers = [
+        "api_task_stats_insert",
+        "api_task_stats_delete",
+        "api_task_stats_update",
+    ]
+
+    @classmethod
+    def get_triggers(cls) -> dict:
+        """
+        Returns the statements that create each trigger.
+        """
+
+        raise NotImplementedError
+
+    @classmethod
+    def install(cls, schema_editor) -> None:
+        cls.install_triggers(schema_editor)
+        cls.rebuild(schema_editor.connection)
+
+    @classmethod
+    def rebuild(cls, using=None) -> None:
+        """
+        Replaces the counters with the ones counted from the tasks, with a
+        single INSERT ... SELECT for each table.
+        """
+
+        using = using or connection
+        day = cls.day_expression.format(column='"created"')
+        with transaction.atomic(using=using.alias), using.cursor() as cursor:
+            cls.lock_tasks(cursor)
+            cursor.execute(f'DELETE FROM "{STATS_TABLE}"')
+            cursor.execute(
+                f'INSERT INTO "{STATS_TABLE}" ("user_id", "total", "completed") '
+                'SELECT "user_id", COUNT(*), '
+                'SUM(CASE WHEN "completed" THEN 1 ELSE 0 END) '
+                f'FROM "{TASK_TABLE}" GROUP BY "user_id"'
+            )
+            cursor.execute(f'DELETE FROM "{DAY_STATS_TABLE}"')
+            cursor.execute(
+                f'INSERT INTO "{DAY_STATS_TABLE}" ("user_id", "day", "created") '
+                f'SELECT "user_id", {day}, COUNT(*) FROM "{TASK_TABLE}" '
+                f'GROUP BY "user_id", {day}'
+            )
+
+    @staticmethod
+    def lock_tasks(cursor) -> None:
+        """
+        Makes the writes of other transactions wait until the end of the
+        rebuild, so none of them is lost between the count and the end.
+        SQLite already allows a single writer.
+        """
+
+    @classmethod
+    def install_triggers(cls, schema_editor) -> None:
+        """
+        Creates the triggers. SQLite drops them when a migration rebuilds the
+        tasks table, so the migrations that alter it must create them again.
+        """
+
+        for sql in cls.get_triggers().values():
+            schema_editor.execute(sql)
+
+    @classmethod
+    def uninstall(cls, schema_editor) -> None:
+        for name in cls.triggers:
+            schema_editor.execute(cls.get_drop_trigger(name))
+
+    @staticmethod
+    def get_drop_trigger(name: str) -> str:
+        return f'DROP TRIGGER IF EXISTS "{name}"'
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Context manager for loading many tasks at once. Updating the counters
+        row by row takes longer than rebuilding them once at the end.
+        """
+
+        name = "api_task_stats_insert"
+        with connection.cursor() as cursor:
+            cursor.execute(self.get_drop_trigger(name))
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(self.get_triggers()[name])
+            self.rebuild()
+
+
+class PostgresStatsBackend(BaseStatsBackend):
+    """
+    Stats backend with a PL/pgSQL trigger function.
+    """
+
+    vendor = "postgresql"
+    day_expression = "(({column} AT TIME ZONE 'UTC')::date)"
+    function = "api_task_stats"
+
+    @classmethod
+    def get_triggers(cls) -> dict:
+        trigger = f'ON "{TASK_TABLE}" FOR EACH ROW'
+        execute = f'EXECUTE FUNCTION "{cls.function}"()'
+        changed = " OR ".join(
+            f'old."{column}" IS DISTINCT FROM new."{column}"'
+            for column in ["user_id", "completed", "created"]
+        )
+        return {
+            "api_task_stats_insert": (
+                f'CREATE TRIGGER "api_task_stats_insert" AFTER INSERT {trigger} '
+                f"{execute}"
+            ),
+            "api_task_stats_delete": (
+                f'CREATE TRIGGER "api_task_stats_delete" AFTER DELETE {trigger} '
+                f"{execute}"
+            ),
+            "api_task_stats_update": (
+                'CREATE TRIGGER "api_task_stats_update" AFTER UPDATE OF '
+                f'"user_id", "completed", "created" {trigger} WHEN ({changed}) '
+                f"{execute}"
+            ),
+        }
+
+    @classmethod
+    def install_triggers(cls, schema_editor) -> None:
+        day = cls.day_expression.format(column='{row}."created"')
+        schema_editor.execute(
+            f'CREATE OR REPLACE FUNCTION "{cls.function}"() RETURNS trigger AS $$\n'
+            "BEGIN\n"
+            "  IF TG_OP IN ('DELETE', 'UPDATE') THEN\n"
+            f'    UPDATE "{STATS_TABLE}" SET "total" = "total" - 1, '
+            '"completed" = "completed" - old."completed"::int '
+            'WHERE "user_id" = old."user_id";\n'
+            f'    UPDATE "{DAY_STATS_TABLE}" SET "created" = "created" - 1 '
+            f'WHERE "user_id" = old."user_id" AND "day" = {day.format(row="old")};\n'
+            "  END IF;\n"
+            "  IF TG_OP IN ('INSERT', 'UPDATE') THEN\n"
+            f'    INSERT INTO "{STATS_TABLE}" ("user_id", "total", "completed") '
+            'VALUES (new."user_id", 1, new."completed"::int) '
+            'ON CONFLICT ("user_id") DO UPDATE SET '
+            f'"total" = "{STATS_TABLE}"."total" + 1, '
+            f'"completed" = "{STATS_TABLE}"."completed" + excluded."completed";\n'
+            f'    INSERT INTO "{DAY_STATS_TABLE}" ("user_id", "day", "created") '
+            f'VALUES (new."user_id", {day.format(row="new")}, 1) '
+            'ON CONFLICT ("user_id", "day") DO UPDATE SET '
+            f'"created" = "{DAY_STATS_TABLE}"."created" + 1;\n'
+            "  END IF;\n"
+            "  RETURN NULL;\n"
+            "END;\n"
+            "$$ LANGUAGE plpgsql"
+        )
+        for name in cls.triggers:
+            schema_editor.execute(cls.get_drop_trigger(name))
+        super().install_triggers(schema_editor)
+
+    @classmethod
+    def uninstall(cls, schema_editor) -> None:
+        super().uninstall(schema_editor)
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS "{cls.function}"()')
+
+    @staticmethod
+    def get_drop_trigger(name: str) -> str:
+        return f'DROP TRIGGER IF EXISTS "{name}" ON "{TASK_TABLE}"'
+
+    @staticmethod
+    def lock_tasks(cursor) -> None:
+        cursor.execute(f'LOCK TABLE "{TASK_TABLE}" IN SHARE MODE')
+
+
+class SQLiteStatsBackend(BaseStatsBackend):
+    """
+    Stats backend with SQLite triggers, whose bodies run the statements
+    directly.
+    """
+
+    vendor = "sqlite"
+    day_expression = "date({column})"
+
+    @classmethod
+    def get_triggers(cls) -> dict:
+        old_day = cls.day_expression.format(column='old."created"')
+        new_day = cls.day_expression.format(column='new."created"')
+        remove = (
+            f'UPDATE "{STATS_TABLE}" SET "total" = "total" - 1, '
+            '"completed" = "completed" - old."completed" '
+            'WHERE "user_id" = old."user_id"; '
+            f'UPDATE "{DAY_STATS_TABLE}" SET "created" = "created" - 1 '
+            f'WHERE "user_id" = old."user_id" AND "day" = {old_day};'
+        )
+        add = (
+            f'INSERT INTO "{STATS_TABLE}" ("user_id", "total", "completed") '
+            'VALUES (new."user_id", 1, new."completed") '
+            'ON CONFLICT ("user_id") DO UPDATE SET "total" = "total" + 1, '
+            '"completed" = "completed" + excluded."completed"; '
+            f'INSERT INTO "{DAY_STATS_TABLE}" ("user_id", "day", "created") '
+            f'VALUES (new."user_id", {new_day}, 1) '
+            'ON CONFLICT ("user_id", "day") DO UPDATE SET "created" = "created" + 1;'
+        )
+        changed = " OR ".join(
+            f'old."{column}" IS NOT new."{column}"'
+            for column in ["user_id", "completed", "created"]
+        )
+        create = "CREATE TRIGGER IF NOT EXISTS"
+        return {
+            "api_task_stats_insert": (
+                f'{create} "api_task_stats_insert" AFTER INSERT ON "{TASK_TABLE}" '
+                f"BEGIN {add} END"
+            ),
+            "api_task_stats_delete": (
+                f'{create} "api_task_stats_delete" AFTER DELETE ON "{TASK_TABLE}" '
+                f"BEGIN {remove} END"
+            ),
+            "api_task_stats_update": (
+                f'{create} "api_task_stats_update" AFTER UPDATE OF "user_id", '
+                f'"completed", "created" ON "{TASK_TABLE}" WHEN {changed} '
+                f"BEGIN {remove} {add} END"
+            ),
+        }
+
+
+STATS_BACKENDS = [PostgresStatsBackend, SQLiteStatsBackend]
+
+
+def get_stats_backend(using=None) -> BaseStatsBackend | None:
+    """
+    Returns the stats backend of the database, or None if its counters
+    aren't maintained and the statistics are counted from the tasks.
+    """
+
+    vendor = (using or connection).vendor
+    for backend in STATS_BACKENDS:
+        if backend.vendor == vendor:
+            return backend()
+    return None
+
+
+def get_expected_stats():
+    """
+    Returns the querysets that count the rows of TaskStats and TaskDayStats
+    from the tasks.
+    """
+
+    stats = (
+        Task.objects.values("user_id")
+        .annotate(total=Count("pk"), completed=Count("pk", filter=Q(completed=True)))
+        .order_by()
+    )
+    day_stats = (
+        Task.objects.annotate(day=TruncDate("created", tzinfo=dt_timezone.utc))
+        .values("user_id", "day")
+        .annotate(created=Count("pk"))
+        .order_by()
+    )
+    return stats, day_stats
+
+
+def verify_stats(limit: int = 20) -> dict:
+    """
+    Compares the counters with the ones counted from the tasks and returns
+    the rows that differ, up to limit of each kind. The rows with zero
+    tasks are the same as missing rows.
+    """
+
+    stats, day_stats = get_expected_stats()
+    actual = TaskStats.objects.filter(total__gt=0).values(
+        "user_id", "total", "completed"
+    )
+    actual_days = TaskDayStats.objects.filter(created__gt=0).values(
+        "user_id", "day", "created"
+    )
+    return {
+        "stats_expected": list(stats.difference(actual)[:limit]),
+        "stats_found": list(actual.difference(stats)[:limit]),
+        "day_stats_expected": list(day_stats.difference(actual_days)[:limit]),
+        "day_stats_found": list(actual_days.difference(day_stats)[:limit]),
+    }
+
+
+def get_task_stats(user_pk, days: int = None) -> dict:
+    """
+    Returns the number of tasks of a user, completed and pending, and the
+    number created on each day, from the counters. Only reads the
+    counters of the user, however many tasks it has.
+
+    Args:
+        user_pk (int): Primary key of the user.
+        days (int): Number of days before today to include in
+            created_per_day, all by default.
+    """
+
+    if get_stats_backend() is None:
+        stats, day_stats = get_expected_stats()
+        stats = stats.filter(user_id=user_pk)
+        day_stats = day_stats.filter(user_id=user_pk)
+    else:
+        stats = TaskStats.objects.filter(user_id=user_pk).values("total", "completed")
+        day_stats = TaskDayStats.objects.filter(user_id=user_pk, created__gt=0)
+    counters = next(iter(stats), {"total": 0, "completed": 0})
+    if days is not None:
+        since = timezone.now().astimezone(dt_timezone.utc).date()
+        day_stats = day_stats.filter(day__gt=since - timedelta(days=days))
+    return {
+        "total": counters["total"],
+        "completed": counters["completed"],
+        "pending": counters["total"] - counters["completed"],
+        "created_per_day": list(day_stats.values("day", "created").order_by("day")),
+    }
@@ -1,4 +1,88 @@
-from rest_framework.test import APITestCase
+import asyncio
+import csv
+import json
+import logging
+import logging.config
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import suppress
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import skipUnless
+
+import msgpack
+from asgiref.sync import sync_to_async
+from drf_spectacular.generators import SchemaGenerator
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.test import override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import (
+    APIRequestFactory,
+    APITestCase,
+    APITransactionTestCase,
+)
+
+from .authentication import ClaimsUser
+from .cache import task_cache
+from .events import PostgresBroker, get_broker
+from .hashers import HashingBusy, HashingPool, hashing_pool
+from .log import AsyncHandler, get_logging_config, parse_rates
+from .metrics import render_metrics
+from .models import OutboxEmail, Task, TaskStats, TaskTombstone, User
+from .outbox import OutboxDrainer, enqueue_email
+from .pagination import TaskChangesPagination
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .search import BaseSearchBackend, get_search_backend
+from .serializers import TaskSerializer, TokenSerializer
+from .stats import get_stats_backend, verify_stats
+from .throttle_rates import parse_rates as parse_throttle_rates
+from .throttling import IPTokenBucketThrottle
+from .views import TaskViewSet
+
+
+class AuthenticatedTestCase(APITestCase):
+    """
+    Test case whose client is authenticated with the access token of a "test"
+    user.
+
+    Atributes:
+        user (api.models.User): User of the requests.
+        token: Access token of the user.
+        headers (dict): Authorization header of the token, for the async
+            client.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="test", email="test@test.com", password="test1234"
+        )
+        self.token = TokenSerializer.get_token(self.user).access_token
+        self.headers = self.get_headers(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=self.headers["Authorization"])
+
+    @staticmethod
+    def get_headers(user) -> dict:
+        token = TokenSerializer.get_token(user).access_token
+        return {"Authorization": f"Bearer {token}"}
 
 
 class UserViewTestCase(APITestCase):
@@ -293,3 +377,1992 @@ class TaskViewTestCase(APITestCase):
         filter_not_found()
         unauthorized()
         not_exists()
+
+
+class TaskPaginationTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        # Create the tasks, two of them completed
+        self.tasks = [
+            Task.objects.create(
+                title=f"test{i}", description=f"test{i}", user=self.user
+            )
+            for i in range(5)
+        ]
+        Task.objects.filter(pk__in=[self.tasks[1].pk, self.tasks[3].pk]).update(
+            completed=True
+        )
+
+    def collect(self, url: str) -> list:
+        pks = []
+        while url:
+            result = self.client.get(url, format="json")
+            self.assertEqual(result.status_code, 200)
+            self.assertLessEqual(len(result.data["results"]), 2)
+            pks += [task["pk"] for task in result.data["results"]]
+            url = result.data["next"]
+        return pks
+
+    def test_unpaginated(self):
+        result = self.client.get("/api/task/", format="json")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.data), 5)
+
+    def test_pages(self):
+        pks = [task.pk for task in self.tasks]
+        self.assertEqual(self.collect("/api/task/?page_size=2"), pks)
+        self.assertEqual(
+            self.collect("/api/task/?page_size=2&ordering=-created"), pks[::-1]
+        )
+
+    def test_same_created(self):
+        # Ties on created are broken by the pk
+        Task.objects.update(created=self.tasks[0].created)
+        pks = [task.pk for task in self.tasks]
+        self.assertEqual(self.collect("/api/task/?page_size=2"), pks)
+
+    def test_filters(self):
+        self.assertEqual(
+            self.collect("/api/task/?page_size=2&completed=true"),
+            [self.tasks[1].pk, self.tasks[3].pk],
+        )
+        self.assertEqual(
+            self.collect(
+                "/api/task/?page_size=2&completed=false&ordering=-created"
+            ),
+            [self.tasks[4].pk, self.tasks[2].pk, self.tasks[0].pk],
+        )
+
+    def test_invalid_cursor(self):
+        result = self.client.get("/api/task/?cursor=invalid", format="json")
+        self.assertEqual(result.status_code, 404)
+
+
+class TaskIndexTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.bulk_create(
+            Task(title=f"test{i}", description=f"test{i}", user=self.user)
+            for i in range(20)
+        )
+
+    def explain(self, url: str) -> str:
+        """
+        Returns the query plan of the list query executed by the request.
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            result = self.client.get(url, format="json")
+        self.assertEqual(result.status_code, 200)
+        sql = context.captured_queries[-1]["sql"]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # The test tables are too small for the planner to prefer
+                # an index by itself.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(str(row) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, url: str, *indexes: str):
+        plan = self.explain(url)
+        self.assertTrue(any(index in plan for index in indexes), plan)
+        # The rows come ordered from the index, without a sort step.
+        self.assertNotIn("TEMP B-TREE", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_list(self):
+        self.assertUsesIndex("/api/task/?page_size=5", "api_task_user_created_idx")
+        self.assertUsesIndex(
+            "/api/task/?ordering=-created", "api_task_user_created_idx"
+        )
+
+    def test_filter(self):
+        self.assertUsesIndex(
+            "/api/task/?completed=true&page_size=5",
+            "api_task_user_completed_idx",
+            "api_task_user_done_idx",
+        )
+        self.assertUsesIndex(
+            "/api/task/?completed=false&ordering=-created&page_size=5",
+            "api_task_user_pending_idx",
+            "api_task_user_completed_idx",
+        )
+
+    def test_created_range(self):
+        self.assertUsesIndex(
+            "/api/task/?created_from=2020-01-01T00:00:00Z"
+            "&created_to=2100-01-01T00:00:00Z&page_size=5",
+            "api_task_user_created_idx",
+        )
+
+
+class TaskSearchTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.in_title = Task.objects.create(
+            title="Comprar pan", description="En la panadería", user=self.user
+        )
+        self.in_description = Task.objects.create(
+            title="Mandados", description="Comprar leche y pan", user=self.user
+        )
+        self.other = Task.objects.create(
+            title="Estudiar", description="Capítulo 3", user=self.user
+        )
+        other_user = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+        Task.objects.create(title="Comprar pan", description="-", user=other_user)
+
+    def search(self, query: str) -> list:
+        result = self.client.get("/api/task/", {"search": query}, format="json")
+        self.assertEqual(result.status_code, 200)
+        return [task["pk"] for task in result.data]
+
+    def test_found(self):
+        # Ranked by relevance, the title weighs more than the description
+        self.assertEqual(
+            self.search("pan"), [self.in_title.pk, self.in_description.pk]
+        )
+        self.assertEqual(self.search("estud"), [self.other.pk])
+        self.assertEqual(self.search("comprar leche"), [self.in_description.pk])
+
+    def test_not_found(self):
+        self.assertEqual(self.search("not_found"), [])
+        self.assertEqual(self.search("pan estudiar"), [])
+
+    def test_kept_up_to_date(self):
+        Task.objects.filter(pk=self.other.pk).update(title="Pan dulce")
+        self.assertIn(self.other.pk, self.search("dulce"))
+        self.in_title.delete()
+        self.assertEqual(self.search("panaderia"), [])
+        created = Task.objects.bulk_create(
+            [Task(title="Cuaderno", description="-", user=self.user)]
+        )
+        self.assertEqual(self.search("cuaderno"), [created[0].pk])
+
+    def test_export(self):
+        # The rank orders the rows but isn't exported
+        result = self.client.get("/api/task/export/", {"search": "pan"})
+        rows = [json.loads(line) for line in result.getvalue().splitlines()]
+        self.assertEqual(
+            [row["pk"] for row in rows], [self.in_title.pk, self.in_description.pk]
+        )
+        self.assertNotIn("search_rank", rows[0])
+
+    def test_ordering(self):
+        result = self.client.get(
+            "/api/task/", {"search": "pan", "ordering": "-created"}, format="json"
+        )
+        self.assertEqual(
+            [task["pk"] for task in result.data],
+            [self.in_description.pk, self.in_title.pk],
+        )
+
+
+class TaskBulkTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = Task.objects.bulk_create(
+            Task(title=f"test{i}", description=f"test{i}", user=self.user)
+            for i in range(3)
+        )
+        other_user = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+        self.other = Task.objects.create(title="-", description="-", user=other_user)
+
+    def test_create(self):
+        def response(data):
+            return self.client.post("/api/task/bulk/", data, format="json")
+
+        def ok():
+            data = [{"title": f"new{i}", "description": "-"} for i in range(10)]
+            # Inserted with a single query, inside a savepoint
+            with self.assertNumQueries(3):
+                result = response(data)
+            self.assertEqual(result.status_code, 201)
+            self.assertEqual(len(result.data), 10)
+            self.assertEqual(Task.objects.filter(user=self.user).count(), 13)
+
+        def invalid_item():
+            result = response([{"title": "new", "description": "-"}, {"title": "new"}])
+            self.assertEqual(result.status_code, 400)
+            self.assertEqual(result.data[0], {})
+            self.assertIn("description", result.data[1])
+            self.assertEqual(Task.objects.filter(user=self.user).count(), 13)
+
+        def empty_list():
+            result = response([])
+            self.assertEqual(result.status_code, 400)
+
+        ok()
+        invalid_item()
+        empty_list()
+
+    def test_update(self):
+        def response(data):
+            return self.client.patch("/api/task/bulk/", data, format="json")
+
+        def ok():
+            data = [{"pk": task.pk, "title": f"edited{task.pk}"} for task in self.tasks]
+            result = response(data)
+            self.assertEqual(result.status_code, 200)
+            for task in self.tasks:
+                task.refresh_from_db()
+                self.assertEqual(task.title, f"edited{task.pk}")
+                self.assertEqual(task.description, f"test{self.tasks.index(task)}")
+
+        def not_exists():
+            data = [
+                {"pk": self.tasks[0].pk, "title": "again"},
+                {"pk": self.other.pk, "title": "again"},
+                {"title": "again"},
+            ]
+            result = response(data)
+            self.assertEqual(result.status_code, 400)
+            self.assertEqual(result.data[0], {})
+            self.assertIn("pk", result.data[1])
+            self.assertIn("pk", result.data[2])
+            self.assertEqual(Task.objects.filter(title="again").count(), 0)
+
+        def invalid_pk():
+            for pk in [{"a": self.tasks[0].pk}, [self.tasks[0].pk], True]:
+                result = response([{"pk": pk, "title": "again"}])
+                self.assertEqual(result.status_code, 400)
+                self.assertEqual(result.data[0]["pk"], ["Tarea inexistente."])
+            self.assertEqual(Task.objects.filter(title="again").count(), 0)
+
+        ok()
+        not_exists()
+        invalid_pk()
+
+    def test_max_items(self):
+        pks = [task.pk for task in self.tasks]
+        max_items = TaskViewSet.bulk_max_items
+        TaskViewSet.bulk_max_items = 2
+        try:
+            result = self.client.put(
+                "/api/task/bulk/complete/", {"pks": pks}, format="json"
+            )
+            self.assertEqual(result.status_code, 400)
+            self.assertIn("pks", result.data)
+            result = self.client.patch(
+                "/api/task/bulk/", [{"pk": pk} for pk in pks], format="json"
+            )
+            self.assertEqual(result.status_code, 400)
+        finally:
+            TaskViewSet.bulk_max_items = max_items
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+
+    def test_complete(self):
+        pks = [self.tasks[0].pk, self.tasks[2].pk]
+
+        def ok():
+            # Checked and updated with a query each, inside a savepoint
+            with self.assertNumQueries(4):
+                result = self.client.put(
+                    "/api/task/bulk/complete/", {"pks": pks}, format="json"
+                )
+            self.assertEqual(result.status_code, 204)
+            self.assertEqual(
+                list(Task.objects.filter(completed=True).values_list("pk", flat=True)),
+                pks,
+            )
+
+        def incomplete():
+            result = self.client.put(
+                "/api/task/bulk/incomplete/", {"pks": pks}, format="json"
+            )
+            self.assertEqual(result.status_code, 204)
+            self.assertFalse(Task.objects.filter(completed=True).exists())
+
+        def not_exists():
+            result = self.client.put(
+                "/api/task/bulk/complete/",
+                {"pks": [self.tasks[1].pk, self.other.pk]},
+                format="json",
+            )
+            self.assertEqual(result.status_code, 400)
+            self.assertEqual(list(result.data["pks"]), [1])
+            self.assertFalse(Task.objects.filter(completed=True).exists())
+
+        ok()
+        incomplete()
+        not_exists()
+
+    def test_destroy(self):
+        def not_exists():
+            result = self.client.delete(
+                "/api/task/bulk/", {"pks": [self.tasks[0].pk, 0]}, format="json"
+            )
+            self.assertEqual(result.status_code, 400)
+            self.assertEqual(Task.objects.filter(user=self.user).count(), 3)
+
+        def ok():
+            result = self.client.delete(
+                "/api/task/bulk/",
+                {"pks": [task.pk for task in self.tasks]},
+                format="json",
+            )
+            self.assertEqual(result.status_code, 204)
+            self.assertFalse(Task.objects.filter(user=self.user).exists())
+            self.assertTrue(Task.objects.filter(pk=self.other.pk).exists())
+
+        not_exists()
+        ok()
+
+
+class TaskVersionTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(title="test", description="-", user=self.user)
+
+    def response(self, pk: int, action: str = "complete", etag: str = None):
+        headers = {"HTTP_IF_MATCH": etag} if etag is not None else {}
+        return self.client.put(f"/api/task/{pk}/{action}/", format="json", **headers)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            result = self.response(self.task.pk)
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.data["completed"])
+        self.assertEqual(result["ETag"], '"2"')
+
+    def test_if_match(self):
+        def ok():
+            result = self.response(self.task.pk, etag='"1"')
+            self.assertEqual(result.status_code, 200)
+            self.task.refresh_from_db()
+            self.assertTrue(self.task.completed)
+            self.assertEqual(self.task.version, 2)
+
+        def stale():
+            result = self.response(self.task.pk, "incomplete", etag='"1"')
+            self.assertEqual(result.status_code, 412)
+            self.task.refresh_from_db()
+            self.assertTrue(self.task.completed)
+
+        def any_version():
+            result = self.response(self.task.pk, "incomplete", etag="*")
+            self.assertEqual(result.status_code, 200)
+            self.assertFalse(result.data["completed"])
+
+        def not_exists():
+            result = self.response(0, etag='"1"')
+            self.assertEqual(result.status_code, 404)
+
+        def never_matches():
+            # Weak and invalid ETags are never a version of the task
+            for etag in ['W/"2"', '"abc"', "abc"]:
+                result = self.response(self.task.pk, etag=etag)
+                self.assertEqual(result.status_code, 412)
+            result = self.response(0, etag='W/"2"')
+            self.assertEqual(result.status_code, 404)
+
+        ok()
+        stale()
+        any_version()
+        not_exists()
+        never_matches()
+
+    def test_out_of_range(self):
+        pk = "9" * 23
+        self.assertEqual(self.client.get(f"/api/task/{pk}/").status_code, 404)
+        for etag in [None, '"1"']:
+            self.assertEqual(self.response(pk, etag=etag).status_code, 404)
+        self.assertEqual(Task.objects.filter(pk=int(pk)).complete(), [])
+
+    def test_retrieve_and_update(self):
+        result = self.client.get(f"/api/task/{self.task.pk}/")
+        self.assertEqual(result["ETag"], '"1"')
+        self.client.patch(f"/api/task/{self.task.pk}/", {"title": "edited"}, format="json")
+        result = self.client.get(f"/api/task/{self.task.pk}/")
+        self.assertEqual(result["ETag"], '"2"')
+        self.client.patch(
+            "/api/task/bulk/", [{"pk": self.task.pk, "title": "again"}], format="json"
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.version, 3)
+
+
+class ClaimsAuthenticationTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.create(title="test", description="-", user=self.user)
+
+    def test_without_user_query(self):
+        # Only the tasks are queried
+        with self.assertNumQueries(1):
+            result = self.client.get("/api/task/")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.data), 1)
+
+        result = self.client.post(
+            "/api/task/", {"title": "new", "description": "-"}, format="json"
+        )
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 2)
+
+    def test_superuser(self):
+        superuser = User.objects.create_superuser(
+            username="admin", email="admin@test.com", password="test1234"
+        )
+        token = TokenSerializer.get_token(superuser).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        result = self.client.get("/api/task/")
+        self.assertEqual(len(result.data), 1)
+
+    def test_lazy_user(self):
+        user = ClaimsUser(self.token)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.email, "test@test.com")
+            self.assertFalse(user.is_superuser)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+            self.assertEqual(user.last_name, self.user.last_name)
+
+    @override_settings(TOKEN_USER_CACHE_TIMEOUT=60)
+    def test_cache(self):
+        with self.assertNumQueries(1):
+            ClaimsUser(self.token).date_joined
+        with self.assertNumQueries(0):
+            ClaimsUser(self.token).date_joined
+        self.user.last_name = "edited"
+        self.user.save()
+        self.assertEqual(ClaimsUser(self.token).last_name, "edited")
+
+
+@override_settings(TASK_CACHE_TIMEOUT=60)
+class TaskCacheTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.task = Task.objects.create(title="test", description="-", user=self.user)
+
+    def test_hit(self):
+        hits = task_cache.hits
+        result = self.client.get("/api/task/", {"completed": "false"})
+        self.assertEqual(result["X-Cache"], "MISS")
+        # Same parameters in another order, and empty ones
+        with self.assertNumQueries(0):
+            result = self.client.get("/api/task/?search=&completed=false")
+            result = self.client.get("/api/task/", {"completed": "false", "search": ""})
+        self.assertEqual(result["X-Cache"], "HIT")
+        self.assertEqual(len(result.data), 1)
+        self.assertEqual(task_cache.hits, hits + 2)
+
+        result = self.client.get("/api/task/", {"completed": "true"})
+        self.assertEqual(result["X-Cache"], "MISS")
+        self.assertEqual(len(result.data), 0)
+
+    def test_invalidated_by_writes(self):
+        def get(url: str = "/api/task/"):
+            return self.client.get(url)
+
+        get()
+        self.client.post(
+            "/api/task/", {"title": "new", "description": "-"}, format="json"
+        )
+        self.assertEqual(len(get().data), 2)
+
+        get(f"/api/task/{self.task.pk}/")
+        self.client.put(f"/api/task/{self.task.pk}/complete/")
+        self.assertTrue(get(f"/api/task/{self.task.pk}/").data["completed"])
+        self.assertEqual(
+            {task["pk"]: task["completed"] for task in get().data}[self.task.pk], True
+        )
+
+        self.client.delete(f"/api/task/{self.task.pk}/")
+        self.assertEqual(len(get().data), 1)
+
+    def test_per_user(self):
+        self.client.get("/api/task/")
+        other = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+        self.client.force_authenticate(user=other)
+        result = self.client.get("/api/task/")
+        self.assertEqual(result["X-Cache"], "MISS")
+        self.assertEqual(len(result.data), 0)
+
+    def test_superuser_writes(self):
+        self.client.get("/api/task/")
+        superuser = User.objects.create_superuser(
+            username="admin", email="admin@test.com", password="test1234"
+        )
+        self.client.force_authenticate(user=superuser)
+        self.client.put(f"/api/task/{self.task.pk}/complete/")
+        self.client.force_authenticate(user=self.user)
+        self.assertTrue(self.client.get("/api/task/").data[0]["completed"])
+
+    @override_settings(TASK_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        # Without a timeout the writes don't touch the cache or log.
+        with self.assertNoLogs("api.cache", "INFO"):
+            self.client.put(f"/api/task/{self.task.pk}/complete/")
+        self.assertIsNone(cache.get(task_cache.version_key(self.user.pk)))
+        self.assertNotIn("X-Cache", self.client.get("/api/task/"))
+
+
+class TaskConditionalTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(title="test", description="-", user=self.user)
+        Task.objects.create(title="other", description="-", user=self.user)
+
+    def test_list(self):
+        etag = self.client.get("/api/task/")["ETag"]
+
+        # Only the validators are queried
+        with self.assertNumQueries(1):
+            result = self.client.get("/api/task/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result.content, b"")
+
+        self.client.put(f"/api/task/{self.task.pk}/complete/")
+        result = self.client.get("/api/task/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 200)
+        etag = result["ETag"]
+
+        self.client.delete(f"/api/task/{self.task.pk}/")
+        result = self.client.get("/api/task/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 200)
+
+    def test_filtered_list(self):
+        etag = self.client.get("/api/task/", {"search": "test"})["ETag"]
+        self.assertNotEqual(etag, self.client.get("/api/task/")["ETag"])
+        self.assertNotEqual(
+            etag, self.client.get("/api/task/", {"search": "other"})["ETag"]
+        )
+        result = self.client.get(
+            "/api/task/", {"search": "test"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(result.status_code, 304)
+
+        self.client.patch(
+            f"/api/task/{self.task.pk}/", {"title": "edited"}, format="json"
+        )
+        result = self.client.get(
+            "/api/task/", {"search": "test"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.data), 0)
+
+    def test_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.get("/api/task/", {"page_size": 1})
+        etag = result["ETag"]
+        # Only the page is read, the tasks aren't counted
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT(", queries[0]["sql"])
+
+        result = self.client.get(
+            "/api/task/", {"page_size": 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(result.status_code, 304)
+        self.assertNotEqual(
+            etag, self.client.get("/api/task/", {"page_size": 2})["ETag"]
+        )
+
+        self.client.patch(
+            f"/api/task/{self.task.pk}/", {"title": "edited"}, format="json"
+        )
+        result = self.client.get(
+            "/api/task/", {"page_size": 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data["results"][0]["title"], "edited")
+
+    def test_detail(self):
+        result = self.client.get(f"/api/task/{self.task.pk}/")
+        etag, last_modified = result["ETag"], result["Last-Modified"]
+
+        result = self.client.get(f"/api/task/{self.task.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result["ETag"], etag)
+        result = self.client.get(
+            f"/api/task/{self.task.pk}/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(result.status_code, 304)
+
+        self.client.put(f"/api/task/{self.task.pk}/complete/")
+        result = self.client.get(f"/api/task/{self.task.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.data["completed"])
+
+    @override_settings(TASK_CACHE_TIMEOUT=60)
+    def test_cached(self):
+        cache.clear()
+        etag = self.client.get("/api/task/")["ETag"]
+        with self.assertNumQueries(0):
+            result = self.client.get("/api/task/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 304)
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server that accepts every email, to test the outbox.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost")
+        while line := self.rfile.readline().decode().strip():
+            command = line[:4].upper()
+            if command == "EHLO":
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (line := self.rfile.readline().decode()) != ".\r\n":
+                    data.append(line)
+                self.server.messages.append("".join(data))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("Relay unavailable")
+
+
+class ResetPasswordOutboxTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="test", email="test@test.com", password="test1234"
+        )
+
+    def request(self):
+        return self.client.post(
+            "/api/reset-password/", {"email": "test@test.com"}, format="json"
+        )
+
+    def test_enqueued(self):
+        result = self.request()
+        self.assertEqual(result.status_code, 204)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.recipient, "test@test.com")
+
+        call_command("drain_outbox", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@test.com"])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.SENT)
+        self.assertIsNotNone(email.sent)
+
+    def test_retry(self):
+        self.request()
+        drainer = OutboxDrainer(
+            max_attempts=2, connection=FailingEmailBackend(), retry_delay=60
+        )
+        self.assertEqual(drainer.drain(), {"sent": 0, "failed": 1})
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("Relay unavailable", email.last_error)
+        self.assertGreater(email.next_attempt, timezone.now())
+
+        # Not ready to be sent again yet
+        self.assertEqual(drainer.drain(), {"sent": 0, "failed": 0})
+        OutboxEmail.objects.update(next_attempt=timezone.now())
+        drainer.drain()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    def test_smtp_connection_reused(self):
+        for i in range(5):
+            enqueue_email("Subject", f"Body {i}", f"user{i}@test.com")
+        server = SMTPStandIn()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        connection = get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1",
+            port=server.server_address[1],
+            use_tls=False,
+            username="",
+            password="",
+        )
+        result = OutboxDrainer(batch_size=10, connection=connection).drain()
+        self.assertEqual(result, {"sent": 5, "failed": 0})
+        self.assertEqual(len(server.messages), 5)
+        self.assertEqual(server.connections, 1)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+
+class AsyncTaskTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(title="test", description="-", user=self.user)
+
+    async def test_list_and_create(self):
+        result = await self.async_client.get("/api/async/task/", headers=self.headers)
+        self.assertEqual(result.status_code, 200)
+        sync_result = await sync_to_async(self.client.get)(
+            "/api/task/", HTTP_AUTHORIZATION=self.headers["Authorization"]
+        )
+        self.assertEqual(result.content, sync_result.content)
+
+        result = await self.async_client.post(
+            "/api/async/task/",
+            {"title": "new", "description": "-"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(await Task.objects.filter(user=self.user).acount(), 2)
+
+        result = await self.async_client.post(
+            "/api/async/task/",
+            {"title": "new"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("description", result.json())
+
+    async def test_filters(self):
+        await Task.objects.acreate(
+            title="done", description="-", user=self.user, completed=True
+        )
+        result = await self.async_client.get(
+            "/api/async/task/", {"completed": "true"}, headers=self.headers
+        )
+        self.assertEqual([task["title"] for task in result.json()], ["done"])
+        result = await self.async_client.get(
+            "/api/async/task/", {"page_size": 1}, headers=self.headers
+        )
+        self.assertEqual(len(result.json()["results"]), 1)
+        self.assertIsNotNone(result.json()["next"])
+
+    async def test_detail(self):
+        url = f"/api/async/task/{self.task.pk}/"
+        result = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(result.json()["title"], "test")
+        self.assertEqual(result["ETag"], '"1"')
+
+        result = await self.async_client.patch(
+            url, {"title": "edited"}, content_type="application/json", headers=self.headers
+        )
+        self.assertEqual(result.json()["title"], "edited")
+        self.assertEqual(result["ETag"], '"2"')
+
+        result = await self.async_client.delete(url, headers=self.headers)
+        self.assertEqual(result.status_code, 204)
+        result = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(result.status_code, 404)
+
+    async def test_complete(self):
+        url = f"/api/async/task/{self.task.pk}/complete/"
+        result = await self.async_client.put(url, headers=self.headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.json()["completed"])
+
+        result = await self.async_client.put(
+            f"/api/async/task/{self.task.pk}/incomplete/",
+            headers={**self.headers, "If-Match": '"1"'},
+        )
+        self.assertEqual(result.status_code, 412)
+        result = await self.async_client.put(
+            url, headers={**self.headers, "If-Match": 'W/"2"'}
+        )
+        self.assertEqual(result.status_code, 412)
+        result = await self.async_client.put(
+            f"/api/async/task/{'9' * 23}/complete/", headers=self.headers
+        )
+        self.assertEqual(result.status_code, 404)
+
+    async def test_unauthorized(self):
+        result = await self.async_client.get("/api/async/task/")
+        self.assertEqual(result.status_code, 401)
+        other = await sync_to_async(User.objects.create_user)(
+            username="other", email="other@test.com", password="test1234"
+        )
+        token = TokenSerializer.get_token(other).access_token
+        result = await self.async_client.get(
+            f"/api/async/task/{self.task.pk}/",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(result.status_code, 404)
+
+
+class LoggingPipelineTestCase(APITestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+
+    def configure(self, **kwargs):
+        logging.config.dictConfig(
+            get_logging_config(
+                mode="async",
+                stream=self.stream,
+                filename=os.path.join(self.folder.name, "info.log"),
+                **kwargs,
+            )
+        )
+
+    def records(self) -> list:
+        # Stopping the handlers writes the records left in the queue.
+        logging.config.dictConfig(get_logging_config(stream=StringIO()))
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_async_json(self):
+        self.configure()
+        logger = logging.getLogger("api.views")
+        logger.info("Task %s completed.", 1)
+        logger.debug("Not created.")
+        records = self.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["message"], "Task 1 completed.")
+        self.assertEqual(records[0]["logger"], "api.views")
+        self.assertEqual(records[0]["level"], "INFO")
+
+    def test_sampling(self):
+        self.configure(sample_rates={"api": 0, "api.cache": 1})
+        logging.getLogger("api.views").info("Dropped.")
+        logging.getLogger("api.views").warning("Kept.")
+        logging.getLogger("api.cache.task").info("Kept too.")
+        messages = [record["message"] for record in self.records()]
+        self.assertEqual(messages, ["Kept.", "Kept too."])
+
+    def test_full_queue(self):
+        handler = AsyncHandler(handlers=[], queue_size=1)
+        record = logging.makeLogRecord({"msg": "test"})
+        handler.enqueue(record)
+        handler.enqueue(record)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_parse_rates(self):
+        self.assertEqual(
+            parse_rates(" api=0.1, django.request=1,"),
+            {"api": 0.1, "django.request": 1.0},
+        )
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.create(title="test", description="-", user=self.user)
+
+    def test_server_timing(self):
+        result = self.client.get("/api/task/")
+        self.assertEqual(result.status_code, 200)
+        timing = result["Server-Timing"]
+        for metric in ["total;dur=", 'desc="1 queries"', "auth;dur=", "serialize;dur="]:
+            self.assertIn(metric, timing)
+        self.assertIn("render;dur=", timing)
+
+    async def test_async_server_timing(self):
+        result = await self.async_client.get("/api/async/task/", headers=self.headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertIn('desc="1 queries"', result["Server-Timing"])
+        self.assertIn("render;dur=", result["Server-Timing"])
+
+    def test_metrics(self):
+        self.client.get("/api/task/")
+        result = self.client.get("/api/metrics/")
+        self.assertEqual(result.status_code, 200)
+        content = result.content.decode()
+        self.assertIn(
+            'api_request_duration_seconds_count{view="TaskViewSet",action="list",'
+            'method="GET",status="200"}',
+            content,
+        )
+        self.assertIn(
+            'api_request_queries_bucket{view="TaskViewSet",action="list",le="1"}',
+            content,
+        )
+
+        result = self.client.get("/api/metrics/", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(result.status_code, 404)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        result = self.client.get("/api/task/")
+        self.assertNotIn("Server-Timing", result)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 404)
+
+
+class SeedCommandTestCase(APITestCase):
+    def test_seed(self):
+        out = StringIO()
+        call_command(
+            "seed",
+            users=5,
+            tasks=50,
+            distribution="constant",
+            completed=0,
+            days=10,
+            seed=1,
+            stdout=out,
+        )
+        self.assertIn("5 users and 50 tasks created", out.getvalue())
+        users = User.objects.filter(username__startswith="seed")
+        self.assertEqual(users.count(), 5)
+        for user in users:
+            self.assertEqual(user.task_set.count(), 10)
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+        self.assertFalse(
+            Task.objects.filter(
+                created__lt=timezone.now() - timedelta(days=10)
+            ).exists()
+        )
+
+        # The seeded users can log in and search their tasks.
+        result = self.client.post(
+            "/api/token/", {"username": "seed0", "password": "seed1234"}, format="json"
+        )
+        self.assertEqual(result.status_code, 200)
+        task = users.get(username="seed0").task_set.first()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {result.data['access']}")
+        result = self.client.get(
+            "/api/task/", {"search": task.title.split()[0]}, format="json"
+        )
+        self.assertIn(task.pk, [item["pk"] for item in result.data])
+
+    def test_existing_prefix(self):
+        call_command("seed", users=1, tasks=0, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("seed", users=1, tasks=0, stdout=StringIO())
+
+
+class FastSerializationTestCase(AuthenticatedTestCase):
+    texts = [
+        "Tarea común",
+        'Comillas " y barra \\ invertida',
+        "Control \x00\x01\x1f\x7f \t\n\r\b\f",
+        "Separadores     y emoji \U0001f600",
+        "</script><script>alert(1)</script>",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        for i, text in enumerate(self.texts):
+            Task.objects.create(
+                title=text[:100], description=text, user=self.user, completed=i % 2
+            )
+
+    def serialize(self, tasks) -> bytes:
+        return JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+
+    def test_list_bytes(self):
+        tasks = Task.objects.filter(user=self.user)
+        result = self.client.get("/api/task/")
+        self.assertEqual(result.content, self.serialize(tasks))
+
+        result = self.client.get("/api/task/", {"page_size": 2})
+        page = json.loads(result.content)
+        self.assertEqual(
+            JSONRenderer().render(page["results"]),
+            self.serialize(Task.objects.order_by("created", "pk")[:2]),
+        )
+        result = self.client.get(page["next"])
+        self.assertEqual(
+            json.loads(result.content)["results"],
+            json.loads(self.serialize(Task.objects.order_by("created", "pk")[2:4])),
+        )
+
+    def test_search_bytes(self):
+        result = self.client.get("/api/task/", {"search": "tarea"})
+        self.assertEqual(
+            result.content, self.serialize(Task.objects.filter(title="Tarea común"))
+        )
+
+    def test_renderer(self):
+        data = {
+            "texts": self.texts,
+            "numbers": [0, -1, 2**63 - 1, 1.5, True, None],
+            "date": timezone.now(),
+            "decimal": Decimal("1.25"),
+            "lazy": gettext_lazy("Contraseña inválida."),
+            1: "int key",
+            "nested": [{"a": [{}]}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        big = {"big": 2**64}
+        self.assertEqual(FastJSONRenderer().render(big), JSONRenderer().render(big))
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+
+class ContentNegotiationTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(
+            title="Tarea", description="Descripción", user=self.user
+        )
+
+    def test_msgpack_response(self):
+        json_result = self.client.get("/api/task/", {"page_size": 10})
+        result = self.client.get(
+            "/api/task/", {"page_size": 10}, HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result["Content-Type"], "application/msgpack")
+        self.assertIn("Accept", result["Vary"])
+        self.assertEqual(msgpack.unpackb(result.content), json_result.json())
+        self.assertLess(len(result.content), len(json_result.content))
+
+        result = self.client.get(f"/api/task/{self.task.pk}/", {"format": "msgpack"})
+        self.assertEqual(msgpack.unpackb(result.content)["title"], "Tarea")
+
+    def test_msgpack_request(self):
+        result = self.client.post(
+            "/api/task/",
+            msgpack.packb({"title": "Nueva", "description": "Binaria"}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(msgpack.unpackb(result.content)["description"], "Binaria")
+
+        result = self.client.post(
+            "/api/user/",
+            msgpack.packb(
+                {
+                    "username": "binary",
+                    "email": "binary@test.com",
+                    "password": "binary1234",
+                    "password_confirmation": "binary1234",
+                }
+            ),
+            content_type="application/msgpack",
+        )
+        self.assertEqual(result.status_code, 201)
+        self.assertTrue(User.objects.filter(username="binary").exists())
+
+        result = self.client.post(
+            "/api/task/", b"\xc1", content_type="application/msgpack"
+        )
+        self.assertEqual(result.status_code, 400)
+
+    def test_json_parser(self):
+        for content in [
+            b'{"a": [1, 1.5, "\\u00e1", null, true], "b": {}}',
+            b'{"big": 18446744073709551616}',
+        ]:
+            self.assertEqual(
+                FastJSONParser().parse(BytesIO(content)),
+                JSONParser().parse(BytesIO(content)),
+            )
+        result = self.client.post(
+            "/api/task/", b'{"title": ', content_type="application/json"
+        )
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("JSON parse error", result.json()["detail"])
+
+    def test_schema(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        operation = schema["paths"]["/api/task/"]["post"]
+        for content in [
+            operation["requestBody"]["content"],
+            operation["responses"]["201"]["content"],
+        ]:
+            self.assertEqual(
+                content["application/msgpack"], content["application/json"]
+            )
+        self.assertNotIn(
+            "application/msgpack",
+            schema["paths"]["/api/token/"]["post"]["requestBody"]["content"],
+        )
+
+    def test_schema_security(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        self.assertEqual(
+            schema["components"]["securitySchemes"]["jwtAuth"],
+            {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"},
+        )
+        self.assertIn(
+            {"jwtAuth": []}, schema["paths"]["/api/task/"]["get"]["security"]
+        )
+
+
+class SparseFieldsTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [
+            Task.objects.create(
+                title=f"Tarea {i}", description="Descripción " * 100, user=self.user
+            )
+            for i in range(3)
+        ]
+
+    def get(self, path: str, params: dict):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.get(path, params)
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        return result, selects
+
+    def test_list(self):
+        result, selects = self.get("/api/task/", {"fields": "pk,title"})
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual([list(task) for task in result.json()], [["pk", "title"]] * 3)
+        self.assertNotIn('"description"', selects[-1])
+
+        result, selects = self.get("/api/task/", {"exclude": "description"})
+        self.assertEqual(
+            list(result.json()[0]), ["pk", "completed", "title", "created"]
+        )
+        self.assertNotIn('"description"', selects[-1])
+
+        result, _ = self.get("/api/task/", {"fields": "title", "search": "tarea"})
+        self.assertEqual(result.json()[0], {"title": "Tarea 0"})
+
+    def test_pages(self):
+        result, _ = self.get("/api/task/", {"fields": "title", "page_size": 2})
+        page = result.json()
+        self.assertEqual(page["results"], [{"title": "Tarea 0"}, {"title": "Tarea 1"}])
+        result = self.client.get(page["next"])
+        self.assertEqual(result.json()["results"], [{"title": "Tarea 2"}])
+
+    def test_retrieve(self):
+        task = self.tasks[0]
+        result, selects = self.get(f"/api/task/{task.pk}/", {"fields": "completed"})
+        self.assertEqual(result.json(), {"completed": False})
+        self.assertEqual(result["ETag"], task.etag)
+        self.assertNotIn('"description"', selects[-1])
+
+    def test_invalid(self):
+        result = self.client.get("/api/task/", {"fields": "title,user,password"})
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("user, password", result.json()["fields"][0])
+
+        result = self.client.get(
+            f"/api/task/{self.tasks[0].pk}/", {"exclude": "pk,completed,title"}
+        )
+        self.assertEqual(result.status_code, 200)
+        result = self.client.get("/api/task/", {"fields": "title", "exclude": "title"})
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("exclude", result.json())
+
+
+class TaskStatsTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+
+    def create(self, title: str) -> int:
+        result = self.client.post(
+            "/api/task/", {"title": title, "description": "-"}, format="json"
+        )
+        return result.json()["pk"]
+
+    def assertVerified(self):
+        self.assertFalse(any(verify_stats().values()))
+
+    def test_writes(self):
+        pks = [self.create(f"Tarea {i}") for i in range(5)]
+        self.client.put(f"/api/task/{pks[0]}/complete/")
+        self.client.patch(f"/api/task/{pks[1]}/", {"completed": True}, format="json")
+        self.client.patch("/api/task/bulk/complete/", {"pks": pks[2:4]}, format="json")
+        self.client.put(f"/api/task/{pks[3]}/incomplete/")
+        self.client.post(
+            "/api/task/bulk/",
+            [{"title": "A", "description": "-"}, {"title": "B", "description": "-"}],
+            format="json",
+        )
+        self.client.delete(f"/api/task/{pks[0]}/")
+        self.client.delete("/api/task/bulk/", {"pks": pks[3:]}, format="json")
+        Task.objects.create(title="Otra", description="-", user=self.other)
+        day = Task.objects.create(title="Vieja", description="-", user=self.user)
+        Task.objects.filter(pk=day.pk).update(
+            created=timezone.now() - timedelta(days=3)
+        )
+        self.assertVerified()
+
+        result = self.client.get("/api/task/stats/")
+        self.assertEqual(result.status_code, 200)
+        stats = result.json()
+        self.assertEqual(
+            [stats["total"], stats["completed"], stats["pending"]], [5, 2, 3]
+        )
+        today = timezone.now().date().isoformat()
+        self.assertEqual(stats["created_per_day"][-1], {"day": today, "created": 4})
+        self.assertEqual(len(stats["created_per_day"]), 2)
+        result = self.client.get("/api/task/stats/", {"days": 1})
+        self.assertEqual(
+            result.json()["created_per_day"], [{"day": today, "created": 4}]
+        )
+        self.assertEqual(
+            self.client.get("/api/task/stats/", {"days": "0"}).status_code, 400
+        )
+
+        self.other.delete()
+        self.assertVerified()
+
+    def test_constant_reads(self):
+        self.create("Tarea")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/task/stats/")
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('"api_task"' in query["sql"] for query in queries))
+
+    def test_command(self):
+        self.create("Tarea")
+        TaskStats.objects.update(total=10)
+        with self.assertRaises(CommandError):
+            call_command("task_stats", verify_only=True, stderr=StringIO())
+        call_command("task_stats", stdout=StringIO())
+        self.assertEqual(TaskStats.objects.get(user=self.user).total, 1)
+        self.assertVerified()
+
+
+class TaskExportTestCase(AuthenticatedTestCase):
+    def insert_tasks(self, count: int) -> None:
+        """
+        Inserts count tasks of the user with a single query, indexed at the
+        end like the seed command does.
+        """
+
+        created = connection.ops.adapt_datetimefield_value(timezone.now())
+        search = get_search_backend() or BaseSearchBackend()
+        with search.bulk_load(), get_stats_backend().bulk_load():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'WITH RECURSIVE "n"("i") AS (SELECT 1 UNION ALL '
+                    'SELECT "i" + 1 FROM "n" WHERE "i" < %s) '
+                    'INSERT INTO "api_task" ("title", "description", "completed", '
+                    '"user_id", "created", "updated", "version") '
+                    'SELECT %s || "i", %s, "i" %% 2 = 0, %s, %s, %s, 1 FROM "n"',
+                    [count, "Tarea ", "Descripción, con coma", self.user.pk]
+                    + [created] * 2,
+                )
+
+    def export(self, params: dict = None, **headers):
+        result = self.client.get("/api/task/export/", params, **headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.streaming)
+        return result
+
+    def test_ndjson(self):
+        self.insert_tasks(5)
+        Task.objects.filter(title="Tarea 3").update(description='Línea\n"dos"')
+        result = self.export()
+        self.assertEqual(result["Content-Type"], "application/x-ndjson")
+        tasks = [json.loads(line) for line in result.getvalue().splitlines()]
+        self.assertEqual(tasks, self.client.get("/api/task/").json())
+
+        result = self.export(
+            {"completed": "true", "ordering": "-created", "fields": "title"}
+        )
+        self.assertEqual(
+            result.getvalue(), b'{"title":"Tarea 4"}\n{"title":"Tarea 2"}\n'
+        )
+        result = self.export({"search": "tarea 3"})
+        self.assertEqual(len(result.getvalue().splitlines()), 1)
+
+    def test_csv(self):
+        self.insert_tasks(3)
+        result = self.export(HTTP_ACCEPT="text/csv")
+        self.assertEqual(result["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("tasks.csv", result["Content-Disposition"])
+        rows = list(csv.reader(StringIO(result.getvalue().decode())))
+        self.assertEqual(rows[0], TaskSerializer.Meta.fields)
+        self.assertEqual(rows[1][1:4], ["False", "Descripción, con coma", "Tarea 1"])
+        self.assertEqual(len(rows), 4)
+
+        result = self.client.get("/api/task/export/", {"format": "csv", "fields": "x"})
+        self.assertEqual(result.status_code, 400)
+        self.assertTrue(result.content.startswith(b'fields,"Campos desconocidos'))
+
+    async def test_asgi(self):
+        # Under ASGI the chunks are streamed instead of read whole into memory.
+        await sync_to_async(self.insert_tasks)(5)
+        result = await self.async_client.get(
+            "/api/task/export/", {"format": "csv"}, headers=self.headers
+        )
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.is_async)
+        content = b"".join([chunk async for chunk in result.streaming_content])
+        export = await sync_to_async(
+            lambda: self.export({"format": "csv"}).getvalue()
+        )()
+        self.assertEqual(content, export)
+        self.assertEqual(len(content.splitlines()), 6)
+
+    def assert_memory(self, count: int) -> None:
+        """
+        Exports count tasks in each format and checks the peak of the memory
+        allocated while the response is read.
+        """
+
+        self.insert_tasks(count)
+        for params in [{}, {"format": "csv"}]:
+            result = self.export(params)
+            lines = 0
+            tracemalloc.start()
+            try:
+                for content in result.streaming_content:
+                    lines += content.count(b"\n")
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(lines, count + bool(params))
+            self.assertLess(peak, 8 * 1024 * 1024)
+
+    def test_memory(self):
+        # The whole list of 50000 tasks would take several times the limit.
+        self.assert_memory(50_000)
+
+    @tag("slow")
+    @skipUnless(os.environ.get("SLOW_TESTS"), "SLOW_TESTS isn't set.")
+    def test_memory_million(self):
+        # The same limit as with 50000 tasks. It takes a few minutes.
+        self.assert_memory(1_000_000)
+
+
+class TaskImportTestCase(AuthenticatedTestCase):
+    def upload(self, content: bytes, content_type: str):
+        return self.client.generic(
+            "POST", "/api/task/import/", content, content_type=content_type
+        )
+
+    def test_ndjson(self):
+        content = (
+            b'{"title": "Uno", "description": "Primera", "completed": true}\n'
+            b"\n"
+            b'{"title": "Dos", "description": "Segunda", "user": 999}\n'
+            b'{"description": "Sin t\xc3\xadtulo"}\n'
+            b"{no es JSON}\n"
+            b'["lista"]\n'
+        )
+        result = self.upload(content, "application/x-ndjson")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data["created"], 2)
+        self.assertEqual(result.data["failed"], 3)
+        self.assertEqual([error["line"] for error in result.data["errors"]], [4, 5, 6])
+        self.assertIn("title", result.data["errors"][0]["errors"])
+        self.assertIn("non_field_errors", result.data["errors"][1]["errors"])
+        # The user is the one of the request, like in the creation of a task.
+        tasks = Task.objects.order_by("pk")
+        self.assertEqual(
+            list(tasks.values_list("title", "completed", "user")),
+            [("Uno", True, self.user.pk), ("Dos", False, self.user.pk)],
+        )
+        self.assertEqual(self.client.get("/api/task/stats/").data["total"], 2)
+
+    def test_csv(self):
+        content = (
+            "\ufefftitle,description,completed,pk\n"
+            'Uno,"Con coma, y\nsalto",True,5\n'
+            ",Sin título,False,6\n"
+            "Tres,Tercera,False,7\n"
+        ).encode()
+        result = self.upload(content, "text/csv")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data["created"], 2)
+        self.assertEqual(result.data["errors"][0]["line"], 4)
+        self.assertEqual(
+            Task.objects.get(title="Uno").description, "Con coma, y\nsalto"
+        )
+
+        # An export can be imported again.
+        export = self.client.get("/api/task/export/", {"format": "csv"})
+        result = self.upload(export.getvalue(), "text/csv")
+        self.assertEqual(result.data, {"created": 2, "failed": 0, "errors": []})
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 4)
+
+    def test_chunks(self):
+        chunk_size = TaskViewSet.import_chunk_size
+        TaskViewSet.import_chunk_size = 2
+        self.addCleanup(setattr, TaskViewSet, "import_chunk_size", chunk_size)
+        rows = [f'{{"title": "{i}", "description": "x"}}\n' for i in range(5)]
+        content = "".join(rows).encode()
+        result = self.upload(content, "application/x-ndjson")
+        self.assertEqual(result.data["created"], 5)
+        self.assertEqual(Task.objects.count(), 5)
+
+        # A malformed upload creates no task, not even the chunks before it.
+        content = b"title,description\n" + b"a,b\n" * 4 + b"\xff,c\n"
+        result = self.upload(content, "text/csv")
+        self.assertEqual(result.status_code, 400)
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertEqual(self.upload(b"", "text/csv").data["created"], 0)
+        result = self.upload(b'[{"title": "a"}]', "application/json")
+        self.assertEqual(result.status_code, 415)
+
+
+class TaskChangesTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [
+            Task.objects.create(title=str(i), description="x", user=self.user)
+            for i in range(3)
+        ]
+
+    def changes(self, since: str = None, **params) -> dict:
+        if since is not None:
+            params["since"] = since
+        result = self.client.get("/api/task/changes/", params)
+        self.assertEqual(result.status_code, 200)
+        return result.json()
+
+    def without_delay(self) -> None:
+        delay = TaskViewSet.changes_delay
+        TaskViewSet.changes_delay = timedelta(0)
+        self.addCleanup(setattr, TaskViewSet, "changes_delay", delay)
+
+    def test_changes(self):
+        # The changes of the last seconds are left for the next sync.
+        data = self.changes()
+        self.assertEqual(
+            data, {"cursor": None, "has_more": False, "results": [], "deleted": []}
+        )
+
+        self.without_delay()
+        data = self.changes()
+        self.assertEqual([task["title"] for task in data["results"]], ["0", "1", "2"])
+        self.assertFalse(data["has_more"])
+        cursor = data["cursor"]
+
+        first, second, third = [task.pk for task in self.tasks]
+        self.client.put(f"/api/task/{first}/complete/")
+        self.client.delete(f"/api/task/{second}/")
+        self.client.post("/api/task/", {"title": "3", "description": "x"})
+        self.client.delete("/api/task/bulk/", {"pks": [third]}, format="json")
+        other = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+        Task.objects.create(title="other", description="x", user=other).delete()
+
+        data = self.changes(cursor)
+        self.assertEqual(
+            [(task["title"], task["completed"]) for task in data["results"]],
+            [("0", True), ("3", False)],
+        )
+        self.assertEqual(data["deleted"], [second, third])
+        self.assertEqual(self.changes(data["cursor"])["cursor"], data["cursor"])
+
+        data = self.changes(cursor, fields="pk")
+        self.assertEqual(data["results"], [{"pk": first}, {"pk": first + 3}])
+
+    def test_pages(self):
+        self.without_delay()
+        pks = [task.pk for task in self.tasks]
+        for task in self.tasks[:2]:
+            task.delete()
+        seen, cursor = [], None
+        while True:
+            data = self.changes(cursor, page_size=2)
+            self.assertLessEqual(len(data["results"]) + len(data["deleted"]), 2)
+            seen += [task["pk"] for task in data["results"]] + data["deleted"]
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                break
+        # The tombstones keep the pk of the task and the date of its deletion.
+        self.assertEqual(seen, [pks[2], pks[0], pks[1]])
+
+    def test_expired(self):
+        self.without_delay()
+        old = timezone.now() - timedelta(days=settings.TASK_TOMBSTONE_RETENTION + 1)
+        cursor = TaskChangesPagination().encode_cursor((old, 0))
+        result = self.client.get("/api/task/changes/", {"since": cursor})
+        self.assertEqual(result.status_code, 410)
+        result = self.client.get("/api/task/changes/", {"since": "x"})
+        self.assertEqual(result.status_code, 404)
+
+        pks = [task.pk for task in self.tasks]
+        self.tasks[0].delete()
+        self.tasks[1].delete()
+        TaskTombstone.objects.filter(pk=pks[0]).update(deleted=old)
+        output = StringIO()
+        call_command("compact_tombstones", batch_size=1, stdout=output)
+        self.assertIn("1 tombstones deleted", output.getvalue())
+        self.assertEqual(
+            list(TaskTombstone.objects.values_list("pk", flat=True)), [pks[1]]
+        )
+
+        # The tasks of a deleted user don't leave tombstones.
+        self.user.delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+
+
+class NotifyRecorder(PostgresBroker):
+    """
+    PostgresBroker whose notifications are recorded, with the same kind of
+    database access as pg_notify.
+    """
+
+    notifications = []
+
+    def notify(self, payload: str) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute("SELECT %s", [payload])
+        self.notifications.append(json.loads(payload))
+
+
+class TaskEventsTestCase(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            username="other", email="other@test.com", password="test1234"
+        )
+
+    async def subscribe(self, headers: dict):
+        result = await self.async_client.get("/api/async/task/events/", headers=headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result["Content-Type"], "text/event-stream")
+        content = aiter(result.streaming_content)
+        # The subscription is taken before the first comment.
+        self.assertEqual(await anext(content), b": connected\n\n")
+        return content
+
+    @staticmethod
+    async def disconnect(content) -> None:
+        # The ASGI handler cancels the response when the client disconnects.
+        waiting = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with suppress(asyncio.CancelledError, StopAsyncIteration):
+            await waiting
+
+    async def receive(self, content) -> tuple:
+        event = await asyncio.wait_for(anext(content), 1)
+        name, data = event.decode().split("\n")[:2]
+        return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    async def test_stream(self):
+        content = await self.subscribe(self.headers)
+        other = await self.subscribe(self.get_headers(self.other))
+        result = await self.async_client.post(
+            "/api/async/task/",
+            {"title": "a", "description": "b"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        name, event = await self.receive(content)
+        self.assertEqual(name, "created")
+        self.assertEqual(event, {"type": "created", "data": result.json()})
+
+        url = f"/api/async/task/{result.json()['pk']}/"
+        await self.async_client.put(f"{url}complete/", headers=self.headers)
+        name, event = await self.receive(content)
+        self.assertTrue(event["data"]["completed"])
+        await self.async_client.delete(url, headers=self.headers)
+        name, event = await self.receive(content)
+        self.assertEqual(event["data"], {"pk": result.json()["pk"]})
+
+        # The events of a user don't reach the others.
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(other), 0.1)
+        await self.disconnect(content)
+        await self.disconnect(other)
+        self.assertEqual(get_broker().subscriptions, {})
+
+        result = await self.async_client.get("/api/async/task/events/")
+        self.assertEqual(result.status_code, 401)
+        result = await sync_to_async(self.client.get)("/api/async/task/events/")
+        self.assertEqual(result.status_code, 501)
+
+    @override_settings(TASK_EVENTS_BROKER="api.tests.NotifyRecorder")
+    async def test_postgres_broker(self):
+        result = await self.async_client.post(
+            "/api/async/task/",
+            {"title": "a", "description": "b"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(
+            NotifyRecorder.notifications[-1],
+            {"user": self.user.pk, "event": {"type": "created", "data": result.json()}},
+        )
+
+    def test_view_events(self):
+        # The events of TaskViewSet are published when the transaction commits.
+        with self.captureOnCommitCallbacks() as callbacks:
+            pk = self.client.post(
+                "/api/task/", {"title": "a", "description": "b"}
+            ).data["pk"]
+            self.client.patch(f"/api/task/{pk}/", {"title": "c"})
+            self.client.put(f"/api/task/{pk}/complete/")
+            self.client.patch(
+                "/api/task/bulk/incomplete/", {"pks": [pk]}, format="json"
+            )
+            self.client.delete(f"/api/task/{pk}/")
+        events = [
+            (callback.args[0], callback.args[1]["type"], callback.args[1].get("data"))
+            for callback in callbacks
+        ]
+        self.assertEqual(
+            [(user_pk, event_type) for user_pk, event_type, _ in events],
+            [
+                (self.user.pk, event_type)
+                for event_type in ["created", "updated", "updated", "changed"]
+            ]
+            + [(self.user.pk, "deleted")],
+        )
+        self.assertEqual(events[1][2]["title"], "c")
+        self.assertEqual(events[2][2]["completed"], True)
+        self.assertIsNone(events[3][2])
+        self.assertEqual(events[4][2], {"pk": pk})
+
+    @override_settings(TASK_EVENTS_BROKER="api.tests.NotifyRecorder")
+    def test_bulk_notifications(self):
+        # A bulk action notifies once, whatever the number of tasks.
+        pks = [
+            Task.objects.create(title=str(i), description="a", user=self.user).pk
+            for i in range(20)
+        ]
+        for method, path in [
+            ("patch", "/api/task/bulk/complete/"),
+            ("patch", "/api/task/bulk/incomplete/"),
+            ("delete", "/api/task/bulk/"),
+        ]:
+            NotifyRecorder.notifications.clear()
+            with self.captureOnCommitCallbacks(execute=True):
+                result = getattr(self.client, method)(path, {"pks": pks}, format="json")
+            self.assertEqual(result.status_code, 204)
+            self.assertEqual(
+                NotifyRecorder.notifications,
+                [{"user": self.user.pk, "event": {"type": "changed"}}],
+            )
+        self.assertFalse(Task.objects.filter(pk__in=pks).exists())
+
+    async def test_idle_subscribers(self):
+        # Thousands of clients wait for events on the event loop of the test.
+        count = 2000
+        headers = [self.headers, self.get_headers(self.other)]
+        streams = [await self.subscribe(headers[i % 2]) for i in range(count)]
+        broker = get_broker()
+        self.assertEqual(len(broker.subscriptions[self.user.pk]), count // 2)
+
+        await broker.apublish(self.user.pk, {"type": "changed"})
+        for content in streams[::2]:
+            self.assertEqual(
+                await self.receive(content), ("changed", {"type": "changed"})
+            )
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(streams[1]), 0.1)
+
+        for content in streams:
+            await self.disconnect(content)
+        self.assertEqual(broker.subscriptions, {})
+
+
+class FrozenThrottle(IPTokenBucketThrottle):
+    """
+    Throttle whose clock only moves when the test moves it.
+    """
+
+    time = 10**12
+
+    def now(self) -> int:
+        return self.time
+
+
+class ThrottledView:
+    throttle_scope = "test"
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {
+            "token_ip": "3/min",
+            "token_username": "2/min",
+            "user_create_ip": "1/min",
+            "reset_password_ip": "",
+            "reset_password_username": "1/hour",
+            "test_ip": "50/hour",
+        },
+    }
+)
+class ThrottlingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="test", email="test@test.com", password="test1234"
+        )
+
+    def sign_in(self, username="test", address="127.0.0.1"):
+        return self.client.post(
+            "/api/token/",
+            {"username": username, "password": "test1234"},
+            format="json",
+            REMOTE_ADDR=address,
+        )
+
+    def test_token_username(self):
+        self.assertEqual(self.sign_in(address="10.0.0.1").status_code, 200)
+        # Same bucket, from another address
+        self.assertEqual(self.sign_in("TEST ", "10.0.0.2").status_code, 401)
+        with CaptureQueriesContext(connection) as queries:
+            result = self.sign_in(address="10.0.0.3")
+        self.assertEqual(result.status_code, 429)
+        # Neither the user was read nor the password hashed
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(1 <= int(result["Retry-After"]) <= 30)
+
+        self.assertEqual(self.sign_in("other", "10.0.0.4").status_code, 401)
+
+    def test_token_address(self):
+        for username in ["test", "other", "another"]:
+            self.assertNotEqual(self.sign_in(username).status_code, 429)
+        result = self.sign_in("last")
+        self.assertEqual(result.status_code, 429)
+        self.assertTrue(1 <= int(result["Retry-After"]) <= 20)
+        self.assertEqual(self.sign_in("last", "10.0.0.1").status_code, 401)
+
+    def test_sign_up(self):
+        form = {
+            "username": "new",
+            "email": "new@test.com",
+            "password": "test1234",
+            "password_confirmation": "test1234",
+        }
+        result = self.client.post("/api/user/", form, format="json")
+        self.assertEqual(result.status_code, 201)
+        form.update(username="new2", email="new2@test.com")
+        result = self.client.post("/api/user/", form, format="json")
+        self.assertEqual(result.status_code, 429)
+        self.assertIn("Retry-After", result)
+        self.assertFalse(User.objects.filter(username="new2").exists())
+
+        # The other actions aren't throttled
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/user/").status_code, 200)
+
+    def test_reset_password(self):
+        def request(email):
+            return self.client.post(
+                "/api/reset-password/", {"email": email}, format="json"
+            )
+
+        self.assertEqual(request("test@test.com").status_code, 204)
+        result = request("TEST@test.com")
+        self.assertEqual(result.status_code, 429)
+        self.assertTrue(3500 <= int(result["Retry-After"]) <= 3600)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        # The rate of the addresses is disabled
+        self.assertNotEqual(request("other@test.com").status_code, 429)
+
+    def test_bucket(self):
+        throttle = FrozenThrottle()
+        request = APIRequestFactory().post("/")
+        view = ThrottledView()
+
+        def allowed(count):
+            return [throttle.allow_request(request, view) for _ in range(count)]
+
+        # 50 per hour, one every 72 seconds
+        self.assertEqual(allowed(51), [True] * 50 + [False])
+        self.assertEqual(throttle.wait(), 72)
+        throttle.time += 72_000
+        self.assertEqual(allowed(2), [True, False])
+        # The bucket refills up to its capacity
+        throttle.time += 10 * 3_600_000
+        self.assertEqual(allowed(51), [True] * 50 + [False])
+
+    def test_refill(self):
+        throttle = FrozenThrottle()
+        other = FrozenThrottle()
+        request = APIRequestFactory().post("/")
+        view = ThrottledView()
+        store = caches[throttle.alias]
+        incr = store.incr
+
+        def interleaved(*args, **kwargs):
+            # Another process takes a request of the bucket right after the
+            # first incr of the throttle.
+            value = incr(*args, **kwargs)
+            del store.incr
+            self.assertTrue(other.allow_request(request, view))
+            return value
+
+        self.assertTrue(throttle.allow_request(request, view))
+        # The bucket is full again since half a second ago
+        throttle.time = other.time = throttle.time + 72_500
+        store.incr = interleaved
+        self.addCleanup(store.__dict__.pop, "incr", None)
+        self.assertTrue(throttle.allow_request(request, view))
+        self.assertNotIn("incr", store.__dict__)
+        # Both requests took their place in the bucket
+        results = [throttle.allow_request(request, view) for _ in range(49)]
+        self.assertEqual(results, [True] * 48 + [False])
+
+    def test_parse_rates(self):
+        self.assertEqual(
+            parse_throttle_rates(" token_ip=60/min, token_username=,"),
+            {"token_ip": "60/min", "token_username": ""},
+        )
+        for value in ["token_ip", "=60/min", "token_ip=60", "token_ip=5/week"]:
+            with self.assertRaisesMessage(ValueError, "Invalid throttle rate"):
+                parse_throttle_rates(value)
+
+    def test_concurrent(self):
+        request = APIRequestFactory().post("/")
+        results = []
+
+        def run():
+            throttle = FrozenThrottle()
+            results.extend(
+                throttle.allow_request(request, ThrottledView()) for _ in range(40)
+            )
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(results.count(False), 270)
+
+
+class HashingPoolTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="test", email="test@test.com", password="test1234"
+        )
+
+    def sign_in(self):
+        return self.client.post(
+            "/api/token/",
+            {"username": "test", "password": "test1234"},
+            format="json",
+        )
+
+    def block(self, pool: HashingPool, count: int):
+        """
+        Fills count places of the pool until the returned function is called.
+        """
+
+        event = threading.Event()
+        threads = [
+            threading.Thread(target=pool.run, args=(event.wait,)) for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+
+        def release():
+            event.set()
+            for thread in threads:
+                thread.join()
+
+        self.addCleanup(release)
+        while pool.pending < count or pool.running < min(count, pool.workers):
+            time.sleep(0.001)
+        return release
+
+    def test_sign_in(self):
+        completed = hashing_pool.completed
+        self.assertEqual(self.sign_in().status_code, 200)
+        self.assertGreater(hashing_pool.completed, completed)
+        self.assertEqual(hashing_pool.pending, 0)
+
+    def test_queue(self):
+        pool = HashingPool(workers=1, queue_size=1)
+        release = self.block(pool, 2)
+        self.assertEqual((pool.running, pool.queued), (1, 1))
+        with self.assertRaises(HashingBusy) as context:
+            pool.run(lambda: None)
+        self.assertGreaterEqual(context.exception.wait, 1)
+        self.assertEqual(pool.rejected, 1)
+
+        release()
+        self.assertEqual(pool.run(lambda: "hash"), "hash")
+        self.assertEqual(pool.completed, 3)
+        self.assertEqual(pool.pending, 0)
+
+    def test_busy(self):
+        full = hashing_pool.workers + hashing_pool.queue_size
+        self.block(hashing_pool, full)
+        result = self.sign_in()
+        self.assertEqual(result.status_code, 503)
+        self.assertIn("Retry-After", result)
+        self.assertEqual(
+            result.data["detail"],
+            "El servidor está ocupado, intente de nuevo en unos segundos.",
+        )
+        self.assertIn(
+            f"api_password_hash_queue_depth {hashing_pool.queue_size}",
+            render_metrics(),
+        )
+
+    def test_rehash(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        with override_settings(PASSWORD_HASHERS=settings.PASSWORD_HASHERS[::-1]):
+            self.assertEqual(self.sign_in().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith("scrypt$16384$"))
+            self.assertEqual(self.sign_in().status_code, 200)
+        # The old hasher still verifies the new hashes
+        self.assertEqual(self.sign_in().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    @override_settings(SCRYPT_BLOCK_SIZE=16)
+    def test_scrypt_settings(self):
+        with override_settings(PASSWORD_HASHERS=settings.PASSWORD_HASHERS[::-1]):
+            self.assertEqual(self.sign_in().status_code, 200)
+            self.user.refresh_from_db()
+            # 129 characters, more than the 128 of the default parameters
+            self.assertIn("$16$1$", self.user.password)
+            self.assertEqual(len(self.user.password), 129)
+            self.assertEqual(self.sign_in().status_code, 200)
+
+
+class MigrationsTestCase(APITransactionTestCase):
+    def migrate(self, target: str):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("api", target)])
+
+    def get_password_column(self):
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(
+                cursor, User._meta.db_table
+            )
+        return next(column for column in columns if column.name == "password")
+
+    def test_password(self):
+        # 0003 left the password without max_length, which only PostgreSQL
+        # can create, so migrating a new database failed on the others.
+        self.addCleanup(call_command, "migrate", verbosity=0)
+        latest = MigrationLoader(connection).graph.leaf_nodes("api")[0][1]
+        self.migrate("0002_alter_task_created")
+        self.migrate("0003_alter_user_email_alter_user_password_and_more")
+        self.migrate(latest)
+        column = self.get_password_column()
+        self.assertEqual(column.internal_size or column.display_size, 256)
+        self.assertFalse(column.null_ok)
+
+        user = User.objects.create_user(
+            username="test", email="test@test.com", password="test1234"
+        )
+        user.password = "x" * 256
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(len(user.password), 256)
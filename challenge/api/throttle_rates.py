@@ -0,0 +1,46 @@
+"""
+Parsing of the throttle rates. It doesn't import DRF, whose throttling module
+reads the settings on import, so the settings can use it.
+"""
+
+
+def parse_rate(rate: str) -> tuple:
+    """
+    Returns the capacity of the bucket and the milliseconds it takes to
+    refill a request, of a rate like "10/min".
+    """
+
+    capacity, period = rate.split("/")
+    capacity = int(capacity)
+    duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period.strip()[0]]
+    return capacity, max(duration * 1000 // capacity, 1)
+
+
+def parse_rates(value: str) -> dict:
+    """
+    Returns the rates of a "<scope>_<kind>=<rate>,..." string, like the
+    THROTTLE_RATES environment variable. An empty rate disables a bucket.
+
+    Raises:
+        ValueError: If an item isn't "<name>=<rate>" or its rate isn't like
+            "10/min".
+    """
+
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, separator, rate = (part.strip() for part in item.partition("="))
+        if not name or not separator:
+            raise ValueError(
+                f'Invalid throttle rate "{item}", expected '
+                '"<scope>_<kind>=<rate>", like "token_ip=60/min".'
+            )
+        if rate:
+            try:
+                parse_rate(rate)
+            except (KeyError, IndexError, ValueError, ZeroDivisionError):
+                raise ValueError(
+                    f'Invalid throttle rate "{rate}" of {name}, expected '
+                    '"<requests>/<s|min|hour|day>", like "60/min".'
+                ) from None
+        rates[name] = rate
+    return rates
@@ -0,0 +1,149 @@
+import logging
+import math
+import time
+from hashlib import md5
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .throttle_rates import parse_rate
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle, shared by the processes through the cache.
+    A bucket holds as many requests as the rate and refills at the rate, so
+    "10/min" allows bursts of 10 requests and then one every 6 seconds. The
+    throttles run before the handler of the view, so a throttled request
+    never reaches the hashing of the password or the email.
+
+    The views opt in with a throttle_scope attribute. The rate of a view is
+    the one of "<throttle_scope>_<kind>" in the DEFAULT_THROTTLE_RATES
+    setting, and a scope without a rate, or with an empty one, isn't
+    throttled.
+
+    A bucket is stored as the time, in milliseconds, at which it will be full
+    again. Each request moves that time forward with the incr of the cache,
+    and a request that doesn't fit in the bucket gives its time back with
+    decr, so concurrent requests never overwrite each other. That needs a
+    cache shared by all the processes whose incr is atomic, Redis or
+    memcached: the local memory cache belongs to each process, so each one
+    would have its own buckets, and the incr of the database cache isn't
+    atomic.
+
+    Atributes:
+        kind (str): Suffix of the scope of the view, which is the key.
+        alias (str): Alias of the cache in the CACHES setting.
+        prefix (str): Prefix of all the keys.
+    """
+
+    kind = None
+    alias = "default"
+    prefix = "api:throttle"
+
+    def __init__(self) -> None:
+        self.duration = None
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def now() -> int:
+        return time.time_ns() // 1_000_000
+
+    def get_rate(self, view) -> str | None:
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return None
+        return api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}_{self.kind}") or None
+
+    def get_key(self, request, view) -> str | None:
+        """
+        Returns what identifies the bucket of the request, or None if the
+        request isn't throttled. Must be overridden.
+        """
+
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        ident = self.get_key(request, view)
+        if ident is None:
+            return True
+        capacity, interval = parse_rate(rate)
+        key = (
+            f"{self.prefix}:{view.throttle_scope}:{self.kind}:"
+            f"{md5(ident.encode()).hexdigest()}"
+        )
+        now = self.now()
+
+        try:
+            full_at = self.cache.incr(key, interval)
+        except ValueError:
+            # There is no bucket, or it expired because it was full.
+            if self.cache.add(key, now + interval, math.ceil(interval / 1000)):
+                return True
+            full_at = self.cache.incr(key, interval)
+        if full_at - interval < now:
+            # The bucket was full, and it can't hold more than the capacity,
+            # so its time moves forward to now. It's an incr too, because a
+            # set would drop the requests that other processes added to the
+            # bucket meanwhile. Concurrent refills move it twice, which only
+            # throttles a bit sooner: the key expires about when it's full.
+            full_at = self.cache.incr(key, now - (full_at - interval))
+            self.cache.touch(key, math.ceil((full_at - now) / 1000))
+            return True
+        if full_at - now <= capacity * interval:
+            # Keeps the bucket until it's full again.
+            self.cache.touch(key, math.ceil((full_at - now) / 1000))
+            return True
+
+        self.cache.decr(key, interval)
+        self.duration = (full_at - capacity * interval - now) / 1000
+        logger.info(
+            "%s allow_request -> Request throttled for %.1f s in %s.",
+            self.__class__.__name__,
+            self.duration,
+            view.throttle_scope,
+        )
+        return False
+
+    def wait(self) -> float | None:
+        return self.duration
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Token bucket of each client address, see TokenBucketThrottle.
+    """
+
+    kind = "ip"
+
+    def get_key(self, request, view) -> str | None:
+        return self.get_ident(request)
+
+
+class UsernameTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Token bucket of each username of the requests, see TokenBucketThrottle.
+    The username is the field of the data named by the throttle_username
+    attribute of the view, "username" by default. It's compared in lower
+    case, so the variants of a username share the bucket.
+    """
+
+    kind = "username"
+
+    def get_key(self, request, view) -> str | None:
+        field = getattr(view, "throttle_username", "username")
+        data = request.data
+        value = data.get(field) if hasattr(data, "get") else None
+        # Same values that a CharField accepts.
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        return str(value).strip().lower() or None
@@ -5,9 +5,16 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import ResetPasswordView, TaskViewSet, UserViewSet
+from .async_views import (
+    AsyncTaskCompleteView,
+    AsyncTaskDetailView,
+    AsyncTaskEventsView,
+    AsyncTaskListView,
+)
+from .metrics import metrics_view
+from .views import ResetPasswordView, TaskViewSet, TokenView, UserViewSet
 
 router = DefaultRouter()
 
@@ -18,7 +25,22 @@ urlpatterns = [
     path("", include(router.urls)),
     path("reset-password/<b64pk>/<token>", ResetPasswordView.as_view(), name="reset_password"),
     path("reset-password/", ResetPasswordView.as_view(), name="reset_password"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    # Asynchronous task API, for the ASGI application.
+    path("async/task/", AsyncTaskListView.as_view(), name="async_task_list"),
+    path("async/task/events/", AsyncTaskEventsView.as_view(), name="async_task_events"),
+    path("async/task/<pk>/", AsyncTaskDetailView.as_view(), name="async_task_detail"),
+    path(
+        "async/task/<pk>/complete/",
+        AsyncTaskCompleteView.as_view(completed=True),
+        name="async_task_complete",
+    ),
+    path(
+        "async/task/<pk>/incomplete/",
+        AsyncTaskCompleteView.as_view(completed=False),
+        name="async_task_incomplete",
+    ),
+    path("metrics/", metrics_view, name="metrics"),
+    path("token/", TokenView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
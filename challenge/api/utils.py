@@ -1,4 +1,18 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 
 
 password_reset_token_generator = PasswordResetTokenGenerator()
+
+
+async def aiterate(iterator):
+    """
+    Iterates a synchronous iterator from the event loop, one item at a time.
+    The items are read in the thread of the sync views, whose database
+    connection the iterator may be reading from.
+    """
+
+    end = object()
+    next_item = sync_to_async(next, thread_sensitive=True)
+    while (item := await next_item(iterator, end)) is not end:
+        yield item
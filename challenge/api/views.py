@@ -1,39 +1,97 @@
 import logging
+from datetime import timedelta
+from hashlib import md5
+from itertools import islice
 
-from django.core.mail import send_mail
+from django.core.handlers.asgi import ASGIRequest
 from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.encoding import force_bytes, force_str
-from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    urlsafe_base64_decode,
+    urlsafe_base64_encode,
+)
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from dotenv import load_dotenv
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import _positive_int
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_200_OK,
+    HTTP_201_CREATED,
     HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
+    HTTP_410_GONE,
+    HTTP_412_PRECONDITION_FAILED,
 )
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from challenge.settings import (
     FRONT_HOST,
-    EMAIL_HOST_USER,
-    EMAIL_HOST_PASSWORD,
     DEFAULT_FROM_EMAIL,
+    TASK_TOMBSTONE_RETENTION,
 )
 
+from .cache import TaskCache, TaskCacheMixin, cached_response
+from .events import publish_task_event
 from .filters import TaskFilter
-from .models import Task, User
-from .serializers import TaskSerializer, UserSerializer
-from .utils import password_reset_token_generator
+from .metrics import timer
+from .models import Task, TaskTombstone, User
+from .outbox import enqueue_email
+from .pagination import TaskChangesPagination, TaskCursorPagination
+from .parsers import CSVParser, FastJSONParser, MessagePackParser, NDJSONParser
+from .renderers import (
+    CSVRenderer,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    NDJSONRenderer,
+)
+from .search import TaskSearchFilter
+from .serializers import (
+    TaskImportListSerializer,
+    TaskBulkSerializer,
+    TaskSerializer,
+    TaskStatsSerializer,
+    UserSerializer,
+)
+from .stats import get_task_stats
+from .utils import aiterate, password_reset_token_generator
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# The API clients choose JSON or MessagePack with the Accept and Content-Type
+# headers.
+RENDERER_CLASSES = [FastJSONRenderer, MessagePackRenderer, BrowsableAPIRenderer]
+PARSER_CLASSES = [FastJSONParser, MessagePackParser, FormParser, MultiPartParser]
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        TaskSerializer.fields_query_param,
+        description="Fields to include, comma separated: "
+        f"{', '.join(TaskSerializer.Meta.fields)}.",
+    ),
+    OpenApiParameter(
+        TaskSerializer.exclude_query_param,
+        description="Fields to leave out, comma separated.",
+    ),
+]
+
 
 class UserViewSet(ModelViewSet):
     """
@@ -44,16 +102,29 @@ class UserViewSet(ModelViewSet):
         queryset (QuerySet): QuerySet of the User model.
         serializer_class (rest_framework.serializers.ModelSerializer): Serializer of the User model.
         action_permissions (dict): Dictionary that contains the permissions for each action.
+        throttle_scope (str): Scope of the rates of the sign ups (see api.throttling).
     """
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    renderer_classes = RENDERER_CLASSES
+    parser_classes = PARSER_CLASSES
     action_permissions = {
         "retrieve": [IsAuthenticated],
         "list": [IsAuthenticated],
         "destroy": [IsAuthenticated],
         "update": [IsAuthenticated],
     }
+    throttle_scope = "user_create"
+
+    def get_throttles(self):
+        """
+        Only the sign ups are throttled, they hash the password.
+        """
+
+        if self.action != "create":
+            return []
+        return super().get_throttles()
 
     def get_queryset(self):
         """
@@ -72,7 +143,7 @@ class UserViewSet(ModelViewSet):
         the super create method.
         """
 
-        logger.info(f'UserViewSet create -> User {request.data["username"]}.')
+        logger.info("UserViewSet create -> User %s.", request.data["username"])
         adapted_data = {
             "username": request.data["username"]
             if "username" in request.data
@@ -99,7 +170,7 @@ class UserViewSet(ModelViewSet):
         si hay nueva contrsaseña -> compararla con su confirmación
         """
 
-        logger.info(f'UserViewSet update -> {request.data["username"]}.')
+        logger.info("UserViewSet update -> %s.", request.data["username"])
         adapted_data = {
             "email": request.data.get("email")
             or request.data.get("new_email")
@@ -132,24 +203,42 @@ class UserViewSet(ModelViewSet):
             )
 
 
-class TaskViewSet(ModelViewSet):
+class TaskViewSet(TaskCacheMixin, ModelViewSet):
     """
     ViewSet for Task model. It allows to create, retrieve, update and delete the task.
     Only authenticated users can execute all actions on tasks.
+    The list and retrieve responses are cached per user until the next write.
 
     Atributes:
         queryset (QuerySet): QuerySet of the Task model.
         serializer_class (rest_framework.serializers.ModelSerializer): Serializer of the Task model.
         action_permissions (dict): Dictionary that contains the permissions for each action.
+        bulk_max_items (int): Maximum number of tasks of a bulk action.
+        export_chunk_size (int): Tasks read from the database cursor and
+            written to an export at once.
+        import_chunk_size (int): Tasks of an import validated and inserted
+            at once.
+        import_max_errors (int): Maximum number of invalid tasks of an
+            import reported with their errors.
+        changes_delay (datetime.timedelta): Age of the newest changes
+            returned by the changes feed.
     """
 
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    renderer_classes = RENDERER_CLASSES
+    parser_classes = PARSER_CLASSES
+    bulk_max_items = 1000
+    export_chunk_size = 2000
+    import_chunk_size = 1000
+    import_max_errors = 100
+    changes_delay = timedelta(seconds=2)
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, OrderingFilter]
     search_fields = ["description", "title"]
     filterset_class = TaskFilter
     ordering_fields = ["created"]
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         """
@@ -158,8 +247,26 @@ class TaskViewSet(ModelViewSet):
         """
 
         if not self.request.user.is_superuser:
-            return self.queryset.filter(user=self.request.user.pk)
-        return super().get_queryset()
+            queryset = self.queryset.filter(user=self.request.user.pk)
+        else:
+            queryset = super().get_queryset()
+        fields = self.get_sparse_fields() if self.action == "retrieve" else None
+        if fields is not None:
+            # The unrequested columns, like a long description, aren't read.
+            queryset = queryset.only(*fields, "updated", "version")
+        return queryset
+
+    def get_sparse_fields(self) -> list | None:
+        """
+        Returns the fields of the tasks requested with the fields and exclude
+        query parameters, or None for all the fields.
+        """
+
+        return TaskSerializer.get_sparse_fields(self.request.query_params)
+
+    def filter_queryset(self, queryset):
+        with timer("filter"):
+            return super().filter_queryset(queryset)
 
     def perform_create(self, serializer) -> None:
         """
@@ -167,9 +274,184 @@ class TaskViewSet(ModelViewSet):
         """
 
         logger.info(
-            f"TaskViewSet perform_create -> Task created by {self.request.user.username}"
+            "TaskViewSet perform_create -> Task created by %s",
+            self.request.user.username,
+        )
+        serializer.save(user_id=self.request.user.pk)
+        publish_task_event(serializer.instance.user_id, "created", serializer.data)
+
+    def perform_update(self, serializer) -> None:
+        super().perform_update(serializer)
+        publish_task_event(serializer.instance.user_id, "updated", serializer.data)
+
+    def perform_destroy(self, instance) -> None:
+        pk = instance.pk
+        super().perform_destroy(instance)
+        publish_task_event(instance.user_id, "deleted", {"pk": pk})
+
+    @staticmethod
+    def publish_events(event_type: str, tasks: list, data: list) -> None:
+        """
+        Publishes an event of each task, with its data, to the owner of the
+        task.
+        """
+
+        for task, item in zip(tasks, data):
+            publish_task_event(task.user_id, event_type, item)
+
+    @staticmethod
+    def publish_changed(user_pks) -> None:
+        """
+        Publishes a single "changed" event to each owner of the tasks of a
+        bulk action, instead of an event of each task. The clients read the
+        changes from the changes feed.
+        """
+
+        for user_pk in set(user_pks):
+            publish_task_event(user_pk, "changed")
+
+    @extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+    @cached_response
+    def list(self, request, *args, **kwargs) -> Response:
+        """
+        Returns the tasks of the user, from the cache when possible.
+        The ETag of the list changes with the last change and the number of
+        the tasks that match the filters, so a client with the current list
+        gets a 304 response without the tasks being read or serialized.
+        The ETag of a page is the one of its tasks instead, so paginating
+        never counts all the tasks: a client with the current page gets a
+        304 response after the page is read, without it being serialized.
+        The tasks are read as values() rows, without building the model
+        instances, and serialized by TaskSerializer.serialize_values. Only
+        the columns of the fields requested with the fields and exclude
+        query parameters are read.
+        """
+
+        fields = self.get_sparse_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = None
+        if "If-None-Match" in request.headers and not self.paginator.is_requested(
+            request
+        ):
+            validators = queryset.order_by().aggregate(
+                updated=Max("updated"), count=Count("pk")
+            )
+            etag = self.get_list_etag(request, validators)
+            not_modified = get_conditional_response(request._request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return not_modified
+
+        queryset = self.get_values_queryset(queryset, fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            etag = self.get_page_etag(request, page, self.paginator.has_next)
+            not_modified = get_conditional_response(request._request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return not_modified
+            response = self.get_paginated_response(
+                TaskSerializer.serialize_values(page, fields)
+            )
+        else:
+            # The whole list is read, so its validators don't need a query.
+            tasks = list(queryset)
+            if etag is None:
+                etag = self.get_list_etag(
+                    request,
+                    {
+                        "updated": max(
+                            (task["updated"] for task in tasks), default=None
+                        ),
+                        "count": len(tasks),
+                    },
+                )
+            response = Response(TaskSerializer.serialize_values(tasks, fields))
+        response["ETag"] = etag
+        return response
+
+    @staticmethod
+    def get_values_queryset(queryset, fields: list = None):
+        """
+        Returns the queryset as values() rows of the fields of TaskSerializer,
+        the keys of the cursor pagination and the date of their last change.
+
+        Args:
+            fields (list): Fields of TaskSerializer to read, all by default.
+        """
+
+        if fields is None:
+            fields = TaskSerializer.Meta.fields
+        return queryset.values(*dict.fromkeys([*fields, "pk", "created", "updated"]))
+
+    @staticmethod
+    def get_list_etag(request, validators: dict) -> str:
+        """
+        Returns a weak ETag of the tasks that match the request, from the
+        date of their last change and their number.
+
+        Args:
+            validators (dict): Last change (updated) and number (count) of the
+                tasks.
+        """
+
+        value = (
+            f"{request.user.pk}:{TaskCache.normalize_params(request.query_params)}:"
+            f"{validators['updated'] and validators['updated'].isoformat()}:"
+            f"{validators['count']}"
+        )
+        return f'W/"{md5(value.encode()).hexdigest()}"'
+
+    @staticmethod
+    def get_page_etag(request, page: list, has_next: bool) -> str:
+        """
+        Returns a weak ETag of a page of tasks, from the keys and the last
+        change of its tasks.
+
+        Args:
+            page (list): values() rows of the tasks of the page.
+            has_next (bool): Whether there is a next page.
+        """
+
+        value = ":".join(
+            [
+                str(request.user.pk),
+                TaskCache.normalize_params(request.query_params),
+                str(has_next),
+                *(f"{task['pk']}@{task['updated'].isoformat()}" for task in page),
+            ]
         )
-        serializer.save(user=self.request.user)
+        return f'W/"{md5(value.encode()).hexdigest()}"'
+
+    @extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+    @cached_response
+    def retrieve(self, request, *args, **kwargs) -> Response:
+        """
+        Returns the task data with its version as ETag, which can be sent as
+        If-Match to complete or incomplete it, and its last change as
+        Last-Modified. Conditional requests get a 304 response without the
+        task being serialized. The fields and exclude query parameters
+        choose the fields of the task that are read and returned.
+        """
+
+        task = self.get_object()
+        headers = self.get_task_headers(task)
+        # Last-Modified has a precision of seconds.
+        not_modified = get_conditional_response(
+            request._request,
+            etag=task.etag,
+            last_modified=int(task.updated.timestamp()),
+        )
+        if not_modified is not None:
+            for name, value in headers.items():
+                not_modified[name] = value
+            return not_modified
+        serializer = self.get_serializer(task, fields=self.get_sparse_fields())
+        return Response(serializer.data, headers=headers)
+
+    @staticmethod
+    def get_task_headers(task) -> dict:
+        return {"ETag": task.etag, "Last-Modified": http_date(task.updated.timestamp())}
 
     @action(detail=True, methods=["put", "patch"])
     def complete(self, request, pk=None) -> Response:
@@ -179,12 +461,11 @@ class TaskViewSet(ModelViewSet):
         """
 
         logger.info(
-            f"TaskViewSet complete -> Task {pk} from user {self.request.user.username} completed"
+            "TaskViewSet complete -> Task %s from user %s completed",
+            pk,
+            self.request.user.username,
         )
-        task = self.get_object()
-        serializer = self.get_serializer(task)
-        task.complete()
-        return Response(serializer.data, 200)
+        return self.set_completed(request, pk, True)
 
     @action(detail=True, methods=["put", "patch"])
     def incomplete(self, request, pk=None) -> Response:
@@ -194,21 +475,409 @@ class TaskViewSet(ModelViewSet):
         """
 
         logger.info(
-            f"TaskViewSet incomplete -> Task {pk} from user {self.request.user.username} incomplete"
+            "TaskViewSet incomplete -> Task %s from user %s incomplete",
+            pk,
+            self.request.user.username,
+        )
+        return self.set_completed(request, pk, False)
+
+    def set_completed(self, request, pk, completed: bool) -> Response:
+        """
+        Marks the task as complete or incomplete with a single conditional
+        update that returns the new task data, without reading it first.
+        If the request has an If-Match header, the task is only updated if it
+        still is in one of those versions.
+        """
+
+        try:
+            queryset = self.get_queryset().filter(pk=int(pk))
+        except ValueError:
+            raise NotFound
+        versions = self.get_if_match_versions(request)
+        if versions is not None:
+            queryset = queryset.filter(version__in=versions)
+
+        if versions == ():
+            # No ETag of the If-Match header, like a weak one, is a version.
+            tasks = []
+        else:
+            tasks = queryset.complete() if completed else queryset.incomplete()
+        if not tasks:
+            if versions is not None and self.get_queryset().filter(pk=pk).exists():
+                return Response(
+                    status=HTTP_412_PRECONDITION_FAILED,
+                    data={"detail": "La tarea fue modificada."},
+                )
+            raise NotFound
+        serializer = self.get_serializer(tasks[0])
+        publish_task_event(tasks[0].user_id, "updated", serializer.data)
+        return Response(
+            serializer.data, HTTP_200_OK, headers=self.get_task_headers(tasks[0])
+        )
+
+    @staticmethod
+    def get_if_match_versions(request) -> tuple | None:
+        """
+        Returns the versions of the If-Match header, or None if the request
+        doesn't have one or it matches any version. The weak and the invalid
+        ETags never match, so they aren't included.
+        """
+
+        header = request.headers.get("If-Match")
+        if header is None:
+            return None
+        etags = parse_etags(header)
+        if etags == ["*"]:
+            return None
+        return tuple(
+            int(etag[1:-1])
+            for etag in etags
+            if etag.startswith('"') and etag[1:-1].isdigit()
+        )
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        """
+        Returns the list serializer used by the bulk actions.
+        """
+
+        return self.get_serializer(
+            *args,
+            many=True,
+            allow_empty=False,
+            max_length=self.bulk_max_items,
+            **kwargs,
+        )
+
+    def get_bulk_queryset(self, request):
+        """
+        Validates the primary keys of a bulk action and returns the queryset of
+        their tasks. Fails with the position of every task that doesn't exist.
+        """
+
+        serializer = TaskBulkSerializer(
+            data=request.data, max_length=self.bulk_max_items
+        )
+        serializer.is_valid(raise_exception=True)
+        queryset = self.get_queryset().filter(pk__in=serializer.validated_data["pks"])
+        found = set(queryset.select_for_update().values_list("pk", flat=True))
+        errors = {
+            index: ["Tarea inexistente."]
+            for index, pk in enumerate(serializer.validated_data["pks"])
+            if pk not in found
+        }
+        if errors:
+            raise ValidationError({"pks": errors})
+        return queryset
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request) -> Response:
+        """
+        Allows to create many tasks at once.
+        It receives a list of tasks and creates all of them or, if any of them
+        is invalid, none, returning the errors of each task.
+        """
+
+        logger.info(
+            "TaskViewSet bulk create -> Tasks created by %s", self.request.user.username
+        )
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(user_id=self.request.user.pk)
+            self.publish_events("created", serializer.instance, serializer.data)
+        return Response(serializer.data, HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request) -> Response:
+        """
+        Allows to partially update many tasks at once.
+        It receives a list of tasks with their pk and the fields to update and
+        updates all of them or, if any of them is invalid, none, returning the
+        errors of each task.
+        """
+
+        logger.info(
+            "TaskViewSet bulk update -> Tasks updated by %s", self.request.user.username
+        )
+        data = request.data if isinstance(request.data, list) else []
+        # Any pk that isn't an integer, like a list or a boolean, is missing.
+        pks = [item.get("pk") if isinstance(item, dict) else None for item in data]
+        pks = [pk if type(pk) is int else None for pk in pks]
+        with transaction.atomic():
+            tasks = (
+                self.get_queryset()
+                .select_for_update()
+                .in_bulk([pk for pk in pks if pk is not None])
+            )
+            serializer = self.get_bulk_serializer(
+                [tasks.get(pk) for pk in pks], data=request.data, partial=True
+            )
+            if not serializer.is_valid() and not isinstance(serializer.errors, list):
+                raise ValidationError(serializer.errors)
+            errors = serializer.errors or [{} for _ in data]
+            seen = set()
+            for index, pk in enumerate(pks):
+                if pk not in tasks:
+                    errors[index] = {**errors[index], "pk": ["Tarea inexistente."]}
+                elif pk in seen:
+                    errors[index] = {**errors[index], "pk": ["Tarea repetida."]}
+                seen.add(pk)
+            if any(errors):
+                raise ValidationError(errors)
+            serializer.save()
+            self.publish_events("updated", serializer.instance, serializer.data)
+        return Response(serializer.data, HTTP_200_OK)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request) -> Response:
+        """
+        Allows to delete many tasks at once.
+        It receives the pks of the tasks and deletes all of them or, if any of
+        them doesn't exist, none.
+        """
+
+        logger.info(
+            "TaskViewSet bulk destroy -> Tasks deleted by %s",
+            self.request.user.username,
+        )
+        with transaction.atomic():
+            queryset = self.get_bulk_queryset(request)
+            self.publish_changed(queryset.values_list("user_id", flat=True).distinct())
+            queryset.delete()
+        return Response(status=HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["put", "patch"], url_path="bulk/complete")
+    def bulk_complete(self, request) -> Response:
+        """
+        Allows to mark many tasks as complete with a single update.
+        It receives the pks of the tasks and marks all of them or, if any of
+        them doesn't exist, none.
+        """
+
+        logger.info(
+            "TaskViewSet bulk complete -> Tasks completed by %s",
+            self.request.user.username,
+        )
+        with transaction.atomic():
+            tasks = self.get_bulk_queryset(request).complete()
+            self.publish_changed(task.user_id for task in tasks)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["put", "patch"], url_path="bulk/incomplete")
+    def bulk_incomplete(self, request) -> Response:
+        """
+        Allows to mark many tasks as incomplete with a single update.
+        It receives the pks of the tasks and marks all of them or, if any of
+        them doesn't exist, none.
+        """
+
+        logger.info(
+            "TaskViewSet bulk incomplete -> Tasks incomplete by %s",
+            self.request.user.username,
+        )
+        with transaction.atomic():
+            tasks = self.get_bulk_queryset(request).incomplete()
+            self.publish_changed(task.user_id for task in tasks)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "days",
+                int,
+                description="Limits created_per_day to the last days.",
+            )
+        ]
+    )
+    @action(
+        detail=False,
+        serializer_class=TaskStatsSerializer,
+        filter_backends=[],
+        pagination_class=None,
+    )
+    def stats(self, request) -> Response:
+        """
+        Returns the number of tasks of the user, completed and pending, and
+        the number of tasks created on each day (UTC). They are read from the
+        counters of the user, which the database updates on every write, so
+        the cost doesn't grow with the number of tasks.
+        """
+
+        days = request.query_params.get("days")
+        if days is not None:
+            try:
+                days = _positive_int(days, strict=True)
+            except ValueError:
+                raise ValidationError(
+                    {"days": ["Debe ser un número entero positivo."]}
+                )
+        serializer = self.get_serializer(get_task_stats(request.user.pk, days))
+        return Response(serializer.data)
+
+    @extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+    @action(
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request) -> StreamingHttpResponse:
+        """
+        Streams the tasks of the user that match the filters and the search,
+        in the requested ordering (by creation by default), as NDJSON or CSV.
+        The format is chosen with the Accept header or the format query
+        parameter. The tasks are read from a server-side cursor and written
+        in chunks of export_chunk_size, so the memory doesn't grow with the
+        number of tasks. Under ASGI the chunks are streamed by an asynchronous
+        iterator, because Django reads a synchronous one whole into memory
+        before sending it.
+        """
+
+        fields = self.get_sparse_fields() or TaskSerializer.Meta.fields
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            queryset = queryset.order_by("created", "pk")
+        # Only the exported columns are read.
+        rows = queryset.values(*fields).iterator(chunk_size=self.export_chunk_size)
+
+        def chunks():
+            while chunk := list(islice(rows, self.export_chunk_size)):
+                yield TaskSerializer.serialize_values(chunk, fields)
+
+        renderer = request.accepted_renderer
+        logger.info(
+            "TaskViewSet export -> Tasks of %s exported as %s",
+            request.user.username,
+            renderer.format,
+        )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        content = renderer.stream(chunks(), fields)
+        if isinstance(request._request, ASGIRequest):
+            content = aiterate(content)
+        return StreamingHttpResponse(
+            content,
+            content_type=content_type,
+            headers={
+                "Content-Disposition": (
+                    f'attachment; filename="tasks.{renderer.format}"'
+                )
+            },
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[NDJSONParser, CSVParser],
+    )
+    def import_tasks(self, request) -> Response:
+        """
+        Creates the tasks of an NDJSON or CSV upload, chosen with the
+        Content-Type header, for the migrations from other tools.
+        The upload is parsed as it's read and its tasks are validated and
+        created in chunks of import_chunk_size, with a single insert each,
+        so the memory doesn't grow with the number of tasks. The invalid
+        tasks are skipped and reported with the line they start on; a
+        malformed upload creates none.
+        """
+
+        logger.info(
+            "TaskViewSet import_tasks -> Tasks imported by %s",
+            self.request.user.username,
+        )
+        # An empty body has no parser, so its data isn't an iterator.
+        rows = iter(()) if isinstance(request.data, dict) else request.data
+        created = failed = 0
+        errors = []
+        with transaction.atomic():
+            while chunk := list(islice(rows, self.import_chunk_size)):
+                lines, data = zip(*chunk)
+                serializer = TaskImportListSerializer(
+                    child=self.get_serializer_class()(),
+                    data=list(data),
+                    context=self.get_serializer_context(),
+                )
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user_id=self.request.user.pk)
+                created += len(serializer.validated_data)
+                failed += len(serializer.row_errors)
+                errors += [
+                    {"line": lines[index], "errors": detail}
+                    for index, detail in serializer.row_errors.items()
+                ][: self.import_max_errors - len(errors)]
+            if created:
+                # The clients read the new tasks from the changes feed.
+                publish_task_event(self.request.user.pk, "changed")
+        return Response(
+            {"created": created, "failed": failed, "errors": errors}, HTTP_200_OK
+        )
+
+    @extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+    @action(detail=False, filter_backends=[], pagination_class=TaskChangesPagination)
+    def changes(self, request) -> Response:
+        """
+        Returns the tasks created or changed (edited, completed...) and the
+        primary keys of the tasks deleted after the cursor of the since query
+        parameter, for the clients that keep a copy of their tasks, with the
+        cursor of their next sync. The tasks and the tombstones are read from
+        indexes on (user, date of the change), so the cost depends on the
+        number of changes and not on the number of tasks.
+        The changes younger than changes_delay are left for the next sync, so
+        that the ones of a transaction that is still running aren't skipped.
+        After TASK_TOMBSTONE_RETENTION days the tombstones are compacted, so
+        an older cursor may have missed deletions and the client has to
+        download its tasks again.
+        """
+
+        paginator = self.paginator
+        position = paginator.decode_cursor(request)
+        now = timezone.now()
+        if position is not None and position[0] < now - timedelta(
+            days=TASK_TOMBSTONE_RETENTION
+        ):
+            return Response(
+                {"detail": "El cursor expiró, vuelva a descargar las tareas."},
+                HTTP_410_GONE,
+            )
+
+        fields = self.get_sparse_fields()
+        cutoff = now - self.changes_delay
+        tasks = self.get_values_queryset(
+            self.get_queryset().filter(updated__lte=cutoff), fields
+        )
+        tombstones = TaskTombstone.objects.all()
+        if not request.user.is_superuser:
+            tombstones = tombstones.filter(user=request.user.pk)
+        tombstones = (
+            tombstones.annotate(updated=F("deleted"))
+            .filter(updated__lte=cutoff)
+            .values("pk", "updated", "deleted")
+        )
+        page = paginator.paginate_changes(tasks, tombstones, request, self)
+        logger.info(
+            "TaskViewSet changes -> %s changes of %s", len(page), request.user.username
+        )
+        return paginator.get_paginated_response(
+            {
+                "results": TaskSerializer.serialize_values(
+                    [row for row in page if "deleted" not in row], fields
+                ),
+                "deleted": [row["pk"] for row in page if "deleted" in row],
+            }
         )
-        task = self.get_object()
-        serializer = self.get_serializer(task)
-        task.incomplete()
-        return Response(serializer.data, 200)
 
 
 class ResetPasswordView(APIView):
     """
     View for reset password. It allows to send an email to the user with the reset
     password link.
+    The requests are throttled per address and per email (see api.throttling).
     """
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_scope = "reset_password"
+    throttle_username = "email"
 
     def get(self, request: dict, b64pk: bytes | str, token: str) -> Response:
         """
@@ -226,12 +895,13 @@ class ResetPasswordView(APIView):
         except User.DoesNotExist:
             return Response(status=HTTP_404_NOT_FOUND)
 
-        logger.info(f"ResetPasswordView get -> Token for {user.username} is valid.")
+        logger.info("ResetPasswordView get -> Token for %s is valid.", user.username)
         return Response(status=HTTP_200_OK)
 
     def post(self, request: dict) -> Response:
         """
-        Sends an email with the reset password link to the email address provided.
+        Enqueues an email with the reset password link to the email address
+        provided.
         """
 
         email = request.data.get("email")
@@ -258,16 +928,11 @@ class ResetPasswordView(APIView):
             f"Saludos\nToDo"
         )
 
-        send_mail(
-            subject,
-            body,
-            recipient_list=[user.email],
-            from_email=DEFAULT_FROM_EMAIL,
-            auth_user=EMAIL_HOST_USER,
-            auth_password=EMAIL_HOST_PASSWORD,
-        )
+        # The drain_outbox command sends it, so the request doesn't wait for
+        # the SMTP server.
+        enqueue_email(subject, body, user.email, DEFAULT_FROM_EMAIL)
 
-        logger.info(f"ResetPasswordView post -> Email {email} sent.")
+        logger.info("ResetPasswordView post -> Email %s enqueued.", email)
         return Response(status=HTTP_204_NO_CONTENT)
 
     def patch(self, request, b64pk: bytes | str, token: str) -> Response:
@@ -306,6 +971,20 @@ class ResetPasswordView(APIView):
             )
 
         logger.info(
-            f"ResetPasswordView patch -> Password for {user.username} has reset."
+            "ResetPasswordView patch -> Password for %s has reset.", user.username
         )
         return Response(status=HTTP_204_NO_CONTENT)
+
+
+class TokenView(TokenObtainPairView):
+    """
+    View that signs in the user with the username and the password and
+    returns the access and refresh tokens.
+    The requests are throttled per address and per username before the
+    password is hashed (see api.throttling).
+
+    Atributes:
+        throttle_scope (str): Scope of the rates of the sign ins.
+    """
+
+    throttle_scope = "token"
@@ -0,0 +1,104 @@
+"""
+Compares the synchronous task API served by a WSGI worker (gunicorn) with
+the asynchronous one served by an ASGI worker (uvicorn) under many
+concurrent connections from slow clients.
+
+Each client connects at a random moment of the ramp-up period, sends the
+request headers in two parts with a pause between them, like a client on a
+slow network, and reads the whole response. A synchronous worker is blocked
+during the pause, while an asynchronous one serves other clients. The
+servers run against a throwaway SQLite database.
+
+Usage (from the "challenge" folder):
+    python -m benchmarks.concurrency --connections 1000 --delay 0.05 --ramp 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .utils import free_port, http_load, prepare_database, server, setup
+
+SERVERS = {
+    "wsgi": {
+        "command": [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "challenge.wsgi:application",
+            "--workers",
+            "{workers}",
+            "--bind",
+            "127.0.0.1:{port}",
+            "--backlog",
+            "4096",
+            "--log-level",
+            "warning",
+        ],
+        "path": "/api/task/",
+    },
+    "asgi": {
+        "command": [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "challenge.asgi:application",
+            "--workers",
+            "{workers}",
+            "--port",
+            "{port}",
+            "--backlog",
+            "4096",
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        "path": "/api/async/task/",
+    },
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2, help="Per connection.")
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds.")
+    parser.add_argument("--ramp", type=float, default=2, help="Seconds.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ.update(
+            {
+                "SQL_ENGINE": "django.db.backends.sqlite3",
+                "SQL_DATABASE": os.path.join(folder, "db.sqlite3"),
+            }
+        )
+        setup()
+        token = prepare_database(args.tasks)
+
+        for name in args.servers:
+            port = free_port()
+            command = [
+                part.format(port=port, workers=args.workers)
+                for part in SERVERS[name]["command"]
+            ]
+            with server(command, port):
+                result = http_load(
+                    port,
+                    SERVERS[name]["path"],
+                    token,
+                    args.connections,
+                    args.requests,
+                    args.delay,
+                    args.ramp,
+                )
+            print(name, json.dumps(result, indent=2), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measures the sign in throughput of /api/token/ for several sizes of the
+password hashing pool (see api.hashers).
+
+A single gunicorn process with many threads serves the sign ins, so every
+hash goes through the same pool and the pool, not the server, bounds how
+many are computed at once. Each client signs in repeatedly with the same
+user. A pool larger than the cores can't compute more hashes per second,
+it only makes each sign in slower; the rejected sign ins (503) count as
+errors. The throttles of the sign ins are disabled.
+
+Usage (from the "challenge" folder):
+    python -m benchmarks.hashing --connections 32 --requests 4 --pool-sizes 1 2 4
+    python -m benchmarks.hashing --hasher scrypt
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .utils import free_port, http_load, prepare_database, server, setup
+
+COMMAND = [
+    sys.executable,
+    "-m",
+    "gunicorn",
+    "challenge.wsgi:application",
+    "--worker-class",
+    "gthread",
+    "--workers",
+    "1",
+    "--threads",
+    "{threads}",
+    "--bind",
+    "127.0.0.1:{port}",
+    "--log-level",
+    "warning",
+]
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4, help="Per connection.")
+    parser.add_argument(
+        "--pool-sizes",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, cores, 2 * cores}),
+        help="Threads of the hashing pool of each run.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="Hashes that can wait for the pool. By default all the clients.",
+    )
+    parser.add_argument("--hasher", choices=["pbkdf2", "scrypt"], default="pbkdf2")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ.update(
+            {
+                "SQL_ENGINE": "django.db.backends.sqlite3",
+                "SQL_DATABASE": os.path.join(folder, "db.sqlite3"),
+                "PASSWORD_HASHER": args.hasher,
+                "THROTTLE_RATES": "token_ip=,token_username=",
+            }
+        )
+        setup()
+        prepare_database(0)
+
+        def sign_in():
+            return {
+                "method": "POST",
+                "path": "/api/token/",
+                "body": {"username": "benchmark", "password": "benchmark1"},
+            }
+
+        for size in args.pool_sizes:
+            port = free_port()
+            command = [
+                part.format(port=port, threads=args.connections + 4) for part in COMMAND
+            ]
+            env = {
+                **os.environ,
+                "HASHING_WORKERS": str(size),
+                "HASHING_QUEUE_SIZE": str(
+                    args.queue_size if args.queue_size is not None else args.connections
+                ),
+            }
+            with server(command, port, env):
+                # Rehashes the password with the hasher, if it's another one.
+                http_load(port, None, None, 1, 1, make_request=sign_in)
+                result = http_load(
+                    port,
+                    None,
+                    None,
+                    args.connections,
+                    args.requests,
+                    make_request=sign_in,
+                )
+            print(
+                f"pool of {size}",
+                json.dumps({"cores": cores, **result}, indent=2),
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Load test of the real API endpoints, served by one of the server profiles of
+benchmarks.production over a seeded database.
+
+The database is seeded by the seed command at the chosen scale, with its
+default distributions: the tasks are spread unevenly among the users, have
+words of a vocabulary in the title and the description, and were created
+along the last year. The seed makes the data and the requests
+reproducible, so the JSON reports of different commits can be compared.
+Everything runs offline, against SQLite or a local PostgreSQL configured
+with the SQL_* variables.
+
+Usage (from the "challenge" folder):
+    python -m benchmarks.loadtest --scale small --concurrency 50
+    python -m benchmarks.loadtest --scale large --sqlite-path /tmp/large.sqlite3 \\
+        --output report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+
+from .production import PROFILES
+from .utils import free_port, http_load, server, setup
+
+SCALES = {
+    "small": {"users": 100, "tasks": 1_000},
+    "medium": {"users": 1_000, "tasks": 100_000},
+    "large": {"users": 10_000, "tasks": 1_000_000},
+    "xlarge": {"users": 100_000, "tasks": 10_000_000},
+}
+
+PASSWORD = "loadtest1"
+
+USERNAME_PREFIX = "loadtest"
+
+
+def prepare(users: int, tasks: int, seed_value: int, sample: int = 1000) -> dict:
+    """
+    Migrates and seeds the database if needed and returns the tokens and
+    the tasks of a sample of the users, for the requests.
+    """
+
+    from django.core.management import call_command
+
+    from api.models import Task, User
+    from api.serializers import TokenSerializer
+
+    call_command("migrate", verbosity=0)
+    seeded = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    if not seeded:
+        print(f"Seeding {users} users and {tasks} tasks...", file=sys.stderr)
+        call_command(
+            "seed",
+            users=users,
+            tasks=tasks,
+            prefix=USERNAME_PREFIX,
+            password=PASSWORD,
+            seed=seed_value,
+            stdout=sys.stderr,
+        )
+    elif seeded != users:
+        raise SystemExit(
+            f"The database has {seeded} load test users instead of {users}, "
+            "use an empty database."
+        )
+
+    rng = random.Random(seed_value)
+    pks = sorted(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).values_list(
+            "pk", flat=True
+        )
+    )
+    sample_users = User.objects.filter(pk__in=rng.sample(pks, min(sample, len(pks))))
+    tokens = {
+        user.pk: str(TokenSerializer.get_token(user).access_token)
+        for user in sample_users
+    }
+    owned = list(
+        Task.objects.filter(user_id__in=list(tokens)).values_list("pk", "user_id")[
+            : sample * 10
+        ]
+    )
+    return {
+        "usernames": [user.username for user in sample_users],
+        "tokens": list(tokens.values()),
+        "owned": [(pk, tokens[user_pk]) for pk, user_pk in owned],
+    }
+
+
+def get_scenarios(data: dict, rng: random.Random) -> dict:
+    """
+    Returns the functions that build the requests of each scenario.
+    """
+
+    from api.seed import WORDS
+
+    tokens = data["tokens"]
+
+    def token():
+        return {
+            "method": "POST",
+            "path": "/api/token/",
+            "body": {"username": rng.choice(data["usernames"]), "password": PASSWORD},
+        }
+
+    def get(query: str = ""):
+        return lambda: {
+            "path": f"/api/task/?page_size=50{query() if callable(query) else query}",
+            "token": rng.choice(tokens),
+        }
+
+    def create():
+        return {
+            "method": "POST",
+            "path": "/api/task/",
+            "token": rng.choice(tokens),
+            "body": {
+                "title": " ".join(rng.choices(WORDS, k=3)),
+                "description": " ".join(rng.choices(WORDS, k=8)),
+            },
+        }
+
+    def complete():
+        pk, token = rng.choice(data["owned"])
+        return {"method": "PUT", "path": f"/api/task/{pk}/complete/", "token": token}
+
+    def user():
+        return {"path": "/api/user/", "token": rng.choice(tokens)}
+
+    return {
+        "token": token,
+        "list": get(),
+        "filter": get("&completed=true"),
+        "search": get(lambda: f"&search={rng.choice(WORDS)}"),
+        "order": get("&ordering=-created"),
+        "create": create,
+        "complete": complete,
+        "user": user,
+    }
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int, help="Overrides the scale.")
+    parser.add_argument("--tasks", type=int, help="Overrides the scale.")
+    parser.add_argument("--database", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument(
+        "--sqlite-path",
+        help="SQLite file, reused by the next runs. A temporary one by default.",
+    )
+    parser.add_argument("--profile", choices=PROFILES, default="production")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20, help="Per client.")
+    parser.add_argument("--scenarios", nargs="+")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="File of the JSON report.")
+    args = parser.parse_args()
+
+    users = args.users or SCALES[args.scale]["users"]
+    tasks = args.tasks if args.tasks is not None else SCALES[args.scale]["tasks"]
+
+    with tempfile.TemporaryDirectory() as folder:
+        if args.database == "sqlite":
+            os.environ.update(
+                {
+                    "SQL_ENGINE": "django.db.backends.sqlite3",
+                    "SQL_DATABASE": args.sqlite_path
+                    or os.path.join(folder, "db.sqlite3"),
+                }
+            )
+        else:
+            os.environ["SQL_ENGINE"] = "django.db.backends.postgresql"
+        # Every client signs in from 127.0.0.1, the throttles would reject
+        # most of the sign ins that are measured.
+        os.environ.setdefault("THROTTLE_RATES", "token_ip=,token_username=")
+        setup()
+        data = prepare(users, tasks, args.seed)
+        scenarios = get_scenarios(data, random.Random(args.seed))
+
+        report = {
+            "meta": {
+                "commit": get_commit(),
+                "database": args.database,
+                "profile": args.profile,
+                "users": users,
+                "tasks": tasks,
+                "concurrency": args.concurrency,
+                "requests_per_client": args.requests,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            "scenarios": {},
+        }
+        profile = PROFILES[args.profile]
+        port = free_port()
+        command = [part.format(port=port) for part in profile["command"]]
+        with server(command, port, {**os.environ, **profile["env"]}):
+            # Warms up the workers and their database connections.
+            http_load(
+                port, None, None, args.concurrency, 1, make_request=scenarios["list"]
+            )
+            for name in args.scenarios or scenarios:
+                result = http_load(
+                    port,
+                    None,
+                    None,
+                    args.concurrency,
+                    args.requests,
+                    make_request=scenarios[name],
+                )
+                report["scenarios"][name] = {
+                    key: round(value, 2) if isinstance(value, float) else value
+                    for key, value in result.items()
+                }
+                print(name, report["scenarios"][name], file=sys.stderr, flush=True)
+
+    content = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(content + "\n")
+    print(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the latency of a request that logs, PUT /api/task/<pk>/complete/,
+with logging disabled and with each mode of the logging pipeline. The
+console and the log file are written to a temporary folder.
+
+Usage:
+    python -m benchmarks.logging_pipeline [--repeat 2000]
+"""
+
+import argparse
+import json
+import logging
+import logging.config
+import os
+import tempfile
+
+from .utils import measure, setup, summary, test_database
+
+PIPELINES = {
+    "disabled": None,
+    "sync": {"mode": "sync"},
+    "async": {"mode": "async"},
+    "async sampled": {"mode": "async", "sample_rates": {"api": 0.1}},
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.log import get_logging_config
+    from api.models import Task, User
+    from api.views import TaskViewSet
+
+    with test_database(), tempfile.TemporaryDirectory() as folder:
+        user = User.objects.create_user(
+            username="bench", email="bench@bench.com", password="bench1234"
+        )
+        task = Task.objects.create(title="bench", description="-", user=user)
+        factory = APIRequestFactory()
+        views = {
+            completed: TaskViewSet.as_view({"put": action})
+            for completed, action in [(True, "complete"), (False, "incomplete")]
+        }
+        state = {"completed": False}
+
+        def request():
+            state["completed"] = not state["completed"]
+            request = factory.put(f"/api/task/{task.pk}/")
+            force_authenticate(request, user=user)
+            response = views[state["completed"]](request, pk=task.pk)
+            response.render()
+
+        results = {}
+        with open(os.path.join(folder, "console.log"), "w") as console:
+            for name, options in PIPELINES.items():
+                if options is None:
+                    logging.disable(logging.INFO)
+                else:
+                    logging.disable(logging.NOTSET)
+                    logging.config.dictConfig(
+                        get_logging_config(
+                            **options,
+                            filename=os.path.join(folder, "info.log"),
+                            stream=console,
+                        )
+                    )
+                measure(request, args.repeat // 10)
+                results[name] = summary(measure(request, args.repeat))
+                # Stops the writer threads before the next pipeline.
+                logging.config.dictConfig(settings.LOGGING)
+                logging.disable(logging.INFO)
+
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
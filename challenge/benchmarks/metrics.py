@@ -0,0 +1,54 @@
+"""
+Measures the overhead of the request instrumentation on GET /api/task/, with
+METRICS_ENABLED off and on.
+
+Usage:
+    python -m benchmarks.metrics [--tasks 50] [--repeat 2000]
+"""
+
+import argparse
+import json
+
+from .utils import measure, setup, summary, test_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+
+    from api.models import Task, User
+    from api.serializers import TokenSerializer
+
+    with test_database():
+        user = User.objects.create_user(
+            username="bench", email="bench@bench.com", password="bench1234"
+        )
+        Task.objects.bulk_create(
+            Task(title=f"task {i}", description="-", user=user)
+            for i in range(args.tasks)
+        )
+        token = TokenSerializer.get_token(user).access_token
+
+        results = {}
+        for enabled in [False, True]:
+            with override_settings(METRICS_ENABLED=enabled):
+                # The middleware is loaded by the first request of the client.
+                client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+                response = client.get("/api/task/")
+                measure(lambda: client.get("/api/task/"), args.repeat // 10)
+                name = "enabled" if enabled else "disabled"
+                results[name] = summary(
+                    measure(lambda: client.get("/api/task/"), args.repeat)
+                )
+                results[name]["server_timing"] = response.get("Server-Timing")
+
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
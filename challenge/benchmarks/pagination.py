@@ -0,0 +1,86 @@
+"""
+Compares the latency of the keyset pagination of GET /api/task/ against an
+OFFSET based pagination, from the first page to a deep page.
+
+Usage:
+    python -m benchmarks.pagination [--tasks 60000] [--page-size 50]
+"""
+
+import argparse
+from urllib.parse import urlsplit
+
+from .utils import measure, setup, summary, test_database
+
+
+def seed(user, count: int, chunk: int = 5000) -> None:
+    from api.models import Task
+
+    for start in range(0, count, chunk):
+        Task.objects.bulk_create(
+            Task(title=f"task {i}", description=f"description {i}", user=user)
+            for i in range(start, min(start + chunk, count))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=60000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", default="1,10,100,500,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    pages = [int(page) for page in args.pages.split(",")]
+    if max(pages) * args.page_size > args.tasks:
+        parser.error("--tasks is too small for the deepest page.")
+
+    setup()
+    from rest_framework.pagination import LimitOffsetPagination
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.models import User
+    from api.views import TaskViewSet
+
+    with test_database():
+        user = User.objects.create_user(
+            username="bench", email="bench@bench.com", password="bench1234"
+        )
+        seed(user, args.tasks)
+
+        factory = APIRequestFactory()
+        keyset_view = TaskViewSet.as_view({"get": "list"})
+        offset_view = TaskViewSet.as_view(
+            {"get": "list"}, pagination_class=LimitOffsetPagination
+        )
+
+        def get(view, url: str):
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        # Walk the cursors to find the url of each measured page.
+        keyset_urls = {}
+        url = f"/api/task/?page_size={args.page_size}"
+        for page in range(1, max(pages) + 1):
+            if page in pages:
+                keyset_urls[page] = url
+            next_link = get(keyset_view, url).data["next"]
+            parts = urlsplit(next_link)
+            url = f"{parts.path}?{parts.query}"
+
+        print(f"{'page':>6} {'keyset p50 (ms)':>16} {'offset p50 (ms)':>16}")
+        for page in pages:
+            offset_url = (
+                f"/api/task/?ordering=created&limit={args.page_size}"
+                f"&offset={(page - 1) * args.page_size}"
+            )
+            keyset = summary(
+                measure(lambda: get(keyset_view, keyset_urls[page]), args.repeat)
+            )
+            offset = summary(measure(lambda: get(offset_view, offset_url), args.repeat))
+            print(f"{page:>6} {keyset['p50']:>16.2f} {offset['p50']:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
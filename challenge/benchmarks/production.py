@@ -0,0 +1,80 @@
+"""
+Load test of the development server profile (runserver, DEBUG, a new
+database connection per request) against the production one (pre-forked
+gunicorn workers sized to the cores, persistent database connections).
+
+Usage (from the "challenge" folder):
+    python -m benchmarks.production --connections 100 --requests 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .utils import free_port, http_load, prepare_database, server, setup
+
+PROFILES = {
+    "development": {
+        "command": [
+            sys.executable,
+            "manage.py",
+            "runserver",
+            "127.0.0.1:{port}",
+            "--noreload",
+        ],
+        "env": {"DEBUG": "1", "CONN_MAX_AGE": "0"},
+    },
+    "production": {
+        "command": [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "challenge.wsgi:application",
+            "--config",
+            "compose/production/django/gunicorn.conf.py",
+            "--bind",
+            "127.0.0.1:{port}",
+        ],
+        "env": {
+            "DEBUG": "0",
+            "CONN_MAX_AGE": "60",
+            "GUNICORN_ACCESSLOG": "/dev/null",
+            "GUNICORN_LOGLEVEL": "warning",
+        },
+    },
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="Per connection.")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ.update(
+            {
+                "SQL_ENGINE": "django.db.backends.sqlite3",
+                "SQL_DATABASE": os.path.join(folder, "db.sqlite3"),
+            }
+        )
+        setup()
+        token = prepare_database(args.tasks)
+
+        for name in args.profiles:
+            port = free_port()
+            profile = PROFILES[name]
+            command = [part.format(port=port) for part in profile["command"]]
+            with server(command, port, {**os.environ, **profile["env"]}):
+                result = http_load(
+                    port, "/api/task/", token, args.connections, args.requests
+                )
+            print(name, json.dumps(result, indent=2), flush=True)
+
+
+if __name__ == "__main__":
+    main()
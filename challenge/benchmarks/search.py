@@ -0,0 +1,127 @@
+"""
+Compares the latency of a page of GET /api/task/?search= with DRF's icontains
+SearchFilter against the full-text TaskSearchFilter, for a rare and a common
+term, over a seeded table. It also times the query of the whole result ranked
+by relevance.
+
+Usage:
+    python -m benchmarks.search [--tasks 1000000] [--repeat 10]
+"""
+
+import argparse
+import random
+
+from .utils import measure, setup, summary, test_database
+
+WORDS = [
+    "comprar",
+    "llamar",
+    "pagar",
+    "revisar",
+    "enviar",
+    "limpiar",
+    "estudiar",
+    "preparar",
+    "leer",
+    "escribir",
+    "cocina",
+    "oficina",
+    "banco",
+    "factura",
+    "correo",
+    "informe",
+    "reunión",
+    "médico",
+    "auto",
+    "casa",
+]
+COMMON_TERM = "tarea"
+RARE_TERM = "zanahoria"
+
+
+def seed(user, count: int, chunk: int = 10000) -> None:
+    from api.models import Task
+
+    generator = random.Random(0)
+    for start in range(0, count, chunk):
+        tasks = []
+        for i in range(start, min(start + chunk, count)):
+            words = generator.choices(WORDS, k=30)
+            if i % 2 == 0:
+                words.append(COMMON_TERM)
+            if i % (count // 10 or 1) == 0:
+                words.append(RARE_TERM)
+            tasks.append(
+                Task(
+                    title=" ".join(words[:4]),
+                    description=" ".join(words[4:]),
+                    user=user,
+                )
+            )
+        Task.objects.bulk_create(tasks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django_filters.rest_framework import DjangoFilterBackend
+    from rest_framework.filters import OrderingFilter, SearchFilter
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.models import Task, User
+    from api.search import get_search_backend
+    from api.views import TaskViewSet
+
+    with test_database():
+        user = User.objects.create_user(
+            username="bench", email="bench@bench.com", password="bench1234"
+        )
+        seed(user, args.tasks)
+
+        factory = APIRequestFactory()
+        views = {
+            "icontains": TaskViewSet.as_view(
+                {"get": "list"},
+                filter_backends=[DjangoFilterBackend, SearchFilter, OrderingFilter],
+            ),
+            "full-text": TaskViewSet.as_view({"get": "list"}),
+        }
+
+        def get(view, params: dict):
+            request = factory.get("/api/task/", params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        backend = get_search_backend()
+        print(f"backend: {type(backend).__name__}, tasks: {args.tasks}")
+        print(f"{'term':>10} {'matches':>8} {'filter':>10} {'p50 (ms)':>10}")
+        for term in [RARE_TERM, COMMON_TERM]:
+            matches = backend.search(Task.objects.all(), [term]).count()
+            for name, view in views.items():
+                # First page of results, as the clients request it.
+                params = {"search": term, "page_size": args.page_size}
+                timings = measure(lambda: get(view, params), args.repeat)
+                print(
+                    f"{term:>10} {matches:>8} {name:>10} "
+                    f"{summary(timings)['p50']:>10.2f}"
+                )
+
+            # Whole result ranked by relevance.
+            def ranked():
+                return list(backend.rank(Task.objects.all(), [term]))
+
+            timings = measure(ranked, args.repeat)
+            print(
+                f"{term:>10} {matches:>8} {'ranked':>10} {summary(timings)['p50']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the model serialization path of the task list (model instances,
+TaskSerializer and the json module) with the fast one (values() rows,
+TaskSerializer.serialize_values and orjson), from the query to the bytes
+of the response, at several list sizes. The fast path is also measured
+with the MessagePack renderer, with the size of both encodings.
+
+Usage:
+    python -m benchmarks.serialization [--sizes 100,1000,10000]
+"""
+
+import argparse
+
+from .utils import measure, setup, summary, test_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from api.models import Task, User
+    from api.renderers import FastJSONRenderer, MessagePackRenderer
+    from api.seed import Seeder
+    from api.serializers import TaskSerializer
+    from api.views import TaskViewSet
+
+    with test_database():
+        Seeder(seed=1).seed(1, max(sizes))
+        user = User.objects.get()
+
+        def model_path(size: int) -> bytes:
+            tasks = list(Task.objects.filter(user=user)[:size])
+            return JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+
+        def fast_path(size: int, renderer=FastJSONRenderer) -> bytes:
+            queryset = TaskViewSet.get_values_queryset(Task.objects.filter(user=user))
+            tasks = list(queryset[:size])
+            return renderer().render(TaskSerializer.serialize_values(tasks))
+
+        print(
+            f"{'rows':>6} {'model p50 (ms)':>15} {'fast p50 (ms)':>14} {'speedup':>8} "
+            f"{'msgpack p50 (ms)':>17} {'JSON (KB)':>10} {'msgpack (KB)':>13}"
+        )
+        for size in sizes:
+            content = fast_path(size)
+            if model_path(size) != content:
+                raise RuntimeError(f"The paths return different bytes for {size} rows.")
+            packed = fast_path(size, MessagePackRenderer)
+            model = summary(measure(lambda: model_path(size), args.repeat))
+            fast = summary(measure(lambda: fast_path(size), args.repeat))
+            binary = summary(
+                measure(lambda: fast_path(size, MessagePackRenderer), args.repeat)
+            )
+            print(
+                f"{size:>6} {model['p50']:>15.2f} {fast['p50']:>14.2f} "
+                f"{model['p50'] / fast['p50']:>7.1f}x {binary['p50']:>17.2f} "
+                f"{len(content) / 1024:>10.1f} {len(packed) / 1024:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Helpers shared by the benchmarks.
+The benchmarks are run from the "challenge" folder as modules, for example
+"python -m benchmarks.pagination", and use a throwaway test database created
+from the configured DATABASES setting.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def setup() -> None:
+    """
+    Configures Django for a standalone benchmark script.
+    """
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "challenge.settings")
+    import django
+
+    django.setup()
+    # The benchmarks measure the request work, not the console output.
+    logging.disable(logging.INFO)
+
+
+@contextmanager
+def test_database(keepdb: bool = False):
+    """
+    Creates the test database, runs the migrations and destroys it on exit.
+    """
+
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def measure(function, repeat: int) -> list[float]:
+    """
+    Calls the function repeat times and returns the timings in milliseconds.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summary(timings: list[float]) -> dict:
+    """
+    Returns the median and the p95/p99 percentiles of the timings.
+    """
+
+    timings = sorted(timings)
+
+    def percentile(p: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+    return {
+        "count": len(timings),
+        "p50": statistics.median(timings),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
+
+
+def prepare_database(tasks: int) -> str:
+    """
+    Migrates the configured database, creates a user with tasks and returns
+    its access token.
+    """
+
+    from django.core.management import call_command
+
+    from api.models import Task, User
+    from api.serializers import TokenSerializer
+
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user(
+        username="benchmark", email="benchmark@test.com", password="benchmark1"
+    )
+    Task.objects.bulk_create(
+        Task(title=f"Tarea {i}", description="Benchmark", user=user)
+        for i in range(tasks)
+    )
+    return str(TokenSerializer.get_token(user).access_token)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(command: list[str], port: int, env: dict = None):
+    """
+    Runs a server process, from the "challenge" folder, until it accepts
+    connections on the port, and stops it on exit.
+    """
+
+    # The request logs of the server would slow it down and hide the results.
+    process = subprocess.Popen(
+        command,
+        env=env or os.environ.copy(),
+        cwd=Path(__file__).parent.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"The server didn't start: {command}")
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def request(
+    port: int,
+    path: str,
+    token: str = None,
+    delay: float = 0,
+    method: str = "GET",
+    body: dict = None,
+) -> float:
+    """
+    Sends a request and returns its latency in milliseconds. With a delay,
+    the request headers are sent in two parts with a pause between them,
+    like a client on a slow network. A body is sent as JSON.
+    """
+
+    content = b"" if body is None else json.dumps(body).encode()
+    headers = ""
+    if token:
+        headers += f"Authorization: Bearer {token}\r\n"
+    if body is not None:
+        headers += (
+            f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+        )
+
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n".encode())
+        if delay:
+            await writer.drain()
+            await asyncio.sleep(delay)
+        writer.write(f"{headers}Connection: close\r\n\r\n".encode() + content)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    if not response.startswith(b"HTTP/1.1 2"):
+        raise RuntimeError(response[:100])
+    return (time.perf_counter() - start) * 1000
+
+
+def http_load(
+    port: int,
+    path: str,
+    token: str,
+    connections: int,
+    requests: int,
+    delay: float = 0,
+    ramp: float = 0,
+    make_request=None,
+) -> dict:
+    """
+    Sends requests from concurrent clients and returns the summary of their
+    latencies, the errors and the throughput.
+
+    Args:
+        connections (int): Number of concurrent clients.
+        requests (int): Requests sent by each client, one after the other.
+        delay (float): Seconds of the pause in the middle of each request.
+        ramp (float): Seconds over which the clients start.
+        make_request (callable): Returns the keyword arguments of request for
+            each request, instead of a GET of path with token.
+    """
+
+    timings = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        await asyncio.sleep(random.uniform(0, ramp))
+        for _ in range(requests):
+            kwargs = (
+                make_request()
+                if make_request
+                else {"path": path, "token": token, "delay": delay}
+            )
+            try:
+                timings.append(await request(port, **kwargs))
+            except (OSError, RuntimeError):
+                errors += 1
+
+    async def run():
+        await asyncio.gather(*(client() for _ in range(connections)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    return {
+        **summary(timings or [0]),
+        "errors": errors,
+        "requests_per_second": len(timings) / elapsed,
+    }
@@ -1,7 +1,10 @@
-from os import getenv, environ, path
+from os import cpu_count, getenv, environ, path
 from dotenv import load_dotenv
 from pathlib import Path
 
+from api.log import get_logging_config, parse_rates
+from api.throttle_rates import parse_rates as parse_throttle_rates
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,7 +20,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = getenv("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = getenv("DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = ["*"]
 
@@ -38,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,9 +83,48 @@ DATABASES = {
         "PASSWORD": environ.get("SQL_PASSWORD", "password"),
         "HOST": environ.get("SQL_HOST", "localhost"),
         "PORT": environ.get("SQL_PORT", "5432"),
+        # Seconds that each worker keeps its connection open for the next
+        # requests, instead of connecting on every request. 0 disables it.
+        "CONN_MAX_AGE": int(environ.get("CONN_MAX_AGE", 60)),
+        # Checks that a persistent connection still works before reusing it.
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Use Redis or Memcached when running more than one process, so that all of
+# them see the same cached responses and throttle buckets. The default local
+# memory cache belongs to each process, and the database cache can't
+# increment atomically, which the throttles need (see api.throttling).
+
+CACHES = {
+    "default": {
+        "BACKEND": environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": environ.get("CACHE_LOCATION", ""),
     }
 }
 
+# METRICS_ENABLED adds the Server-Timing header to the responses and serves
+# the metrics of each process at /api/metrics/ to the INTERNAL_IPS.
+METRICS_ENABLED = getenv("METRICS_ENABLED", "0") == "1"
+INTERNAL_IPS = getenv("INTERNAL_IPS", "127.0.0.1").split(",")
+
+# Seconds that the task responses of each user are cached. 0 disables it.
+TASK_CACHE_TIMEOUT = int(getenv("TASK_CACHE_TIMEOUT", 0))
+
+# Days that the deleted tasks are kept for the changes feed. A client that
+# didn't sync for longer has to download its tasks again.
+TASK_TOMBSTONE_RETENTION = int(getenv("TASK_TOMBSTONE_RETENTION", 30))
+
+# Broker of the task events of /api/async/task/events/ (see api.events). The
+# default one only reaches the clients of the same process, with several
+# workers use "api.events.PostgresBroker".
+TASK_EVENTS_BROKER = getenv("TASK_EVENTS_BROKER", "api.events.InProcessBroker")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -101,6 +144,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (see api.hashers). The first hasher hashes the new
+# passwords and the other one verifies the old hashes, which are rehashed
+# with the first one on the next sign in of each user. PASSWORD_HASHER=scrypt
+# uses scrypt, memory-hard, instead of PBKDF2.
+PASSWORD_HASHERS = [
+    "api.hashers.PBKDF2PasswordHasher",
+    "api.hashers.ScryptPasswordHasher",
+]
+if getenv("PASSWORD_HASHER", "pbkdf2") == "scrypt":
+    PASSWORD_HASHERS.reverse()
+
+# Parameters of scrypt: each hash takes 128 * block size * work factor bytes.
+SCRYPT_WORK_FACTOR = int(getenv("SCRYPT_WORK_FACTOR", 2**14))
+SCRYPT_BLOCK_SIZE = int(getenv("SCRYPT_BLOCK_SIZE", 8))
+SCRYPT_PARALLELISM = int(getenv("SCRYPT_PARALLELISM", 1))
+
+# Threads of each process that compute the hashes, by default one per core,
+# and hashes that can wait for them before the requests are answered with
+# 503 (by default 4 per thread).
+HASHING_WORKERS = int(getenv("HASHING_WORKERS", 0)) or cpu_count()
+HASHING_QUEUE_SIZE = int(getenv("HASHING_QUEUE_SIZE", 4 * HASHING_WORKERS))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -126,40 +191,53 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Logging configuration
 
-LOGGING = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-        },
-        "file": {
-            "level": "INFO",
-            "class": "logging.FileHandler",
-            "filename": "info.log",
-        },
-    },
-    "root": {
-        "handlers": ["console"],
-        "level": "INFO",
-    },
-    "loggers": {
-        "django": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
-            "propagate": True,
-        },
-    },
-}
+# LOG_MODE "sync" writes the records in the thread that logs them, "async"
+# formats them as JSON lines in a background thread. LOG_SAMPLE_RATES keeps a
+# fraction of the records of each logger in the async mode, for example
+# "api=0.1,django.request=1".
+
+LOGGING = get_logging_config(
+    mode=getenv("LOG_MODE", "sync"),
+    level=getenv("LOG_LEVEL", "INFO"),
+    sample_rates=parse_rates(getenv("LOG_SAMPLE_RATES", "")),
+)
 
 # Django REST Framework configuration
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
+    ],
+    # Same output as the JSONRenderer of DRF, encoded with orjson.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Token buckets of the views with a throttle_scope, per client address
+    # and per username (see api.throttling). The buckets are stored in the
+    # default cache, which must be Redis or Memcached with several processes.
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.IPTokenBucketThrottle",
+        "api.throttling.UsernameTokenBucketThrottle",
+    ],
+    # Rates of each scope, "<scope>_ip" and "<scope>_username". They can be
+    # changed with THROTTLE_RATES="token_ip=60/min,token_username=5/min", and
+    # an empty rate disables a bucket.
+    "DEFAULT_THROTTLE_RATES": {
+        "token_ip": "30/min",
+        "token_username": "20/min",
+        "user_create_ip": "20/min",
+        "reset_password_ip": "10/min",
+        "reset_password_username": "5/min",
+        **parse_throttle_rates(getenv("THROTTLE_RATES", "")),
+    },
 }
 
 # Spectacular settings for swagger
@@ -187,16 +265,24 @@ AUTH_USER_MODEL = "api.User"
 SIMPLE_JWT = {
     # It will work instead of the default serializer(TokenObtainPairSerializer).
     "TOKEN_OBTAIN_SERIALIZER": "api.serializers.TokenSerializer",
+    # The requests are authenticated with the claims of the token.
+    "TOKEN_USER_CLASS": "api.authentication.ClaimsUser",
 }
 
+# Seconds that the full user of a token is cached when a view needs it.
+# 0 disables the cache.
+TOKEN_USER_CACHE_TIMEOUT = int(getenv("TOKEN_USER_CACHE_TIMEOUT", 0))
+
 # Email settings
 
 EMAIL_HOST = getenv("EMAIL_HOST")
 EMAIL_HOST_USER = getenv("EMAIL_HOST_USER")
 DEFAULT_FROM_EMAIL = getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = getenv("EMAIL_HOST_PASSWORD")
-EMAIL_USE_TLS = True
-EMAIL_PORT = 587
+EMAIL_USE_TLS = getenv("EMAIL_USE_TLS", "1") == "1"
+EMAIL_PORT = int(getenv("EMAIL_PORT", 587))
+# Seconds to wait for the SMTP server before the drain_outbox command retries.
+EMAIL_TIMEOUT = 30
 
 # EMAIL_HOST: La dirección del servidor SMTP que utilizarás para enviar correos electrónicos. Deberías obtener esta información de tu proveedor de correo electrónico.
 
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings of the production profile.
+Every value can be overridden with an environment variable.
+"""
+
+import multiprocessing
+from os import getenv
+
+bind = getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Pre-forked workers sized to the cores. The default is the usual
+# "2 x cores + 1" for synchronous workers, which spend part of each request
+# waiting for the database.
+workers = int(getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# "uvicorn.workers.UvicornWorker" serves the ASGI application instead, with
+# "challenge.asgi:application" as the application.
+worker_class = getenv("GUNICORN_WORKER_CLASS", "sync")
+
+# The application is loaded once in the master and shared by the forked
+# workers. No database connection is opened while it loads.
+preload_app = True
+
+# Restarts each worker after this many requests, with some jitter so they
+# don't restart at once, to bound the memory growth.
+max_requests = int(getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(getenv("GUNICORN_KEEPALIVE", 5))
+
+accesslog = getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = getenv("GUNICORN_LOGLEVEL", "info")